@@ -1,5 +1,6 @@
 import subprocess
 import os
+import json
 import logging
 import time
 import shutil
@@ -26,6 +27,8 @@ file_mode = stat.S_IMODE(os.stat(log_file).st_mode)
 if file_mode != 0o777:
     os.chmod(log_file, 0o777)
 logging.basicConfig(filename=log_file, level=logging.INFO, format='%(asctime)s - %(message)s')
+# Written by integrity_watcher.py whenever its watches or polled subtrees change.
+watch_status_file = os.path.join(log_dir, "integrity_watch_status.json")
 
 def deploy_monitoring(send_to_output):
     if os.path.exists(SERVICE_FILE):
@@ -80,6 +83,7 @@ def check_deployment_status(send_to_output):
 
             if active_output == "active":
                 send_to_output(_("Monitor service status: Deployed, enabled, and running"))
+                report_watch_status(send_to_output)
                 return 'active'
             elif active_output == "inactive":
                 send_to_output(_("Monitor service status: Deployed and enabled, but not running"))
@@ -99,6 +103,26 @@ def check_deployment_status(send_to_output):
         send_to_output(_("Monitoring status: Unable to determine service status, error: {e}").format(e=str(e)))
         return 'unknown'
 
+def report_watch_status(send_to_output):
+    try:
+        with open(watch_status_file, "r") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return
+    send_to_output(_("inotify coverage: {coverage:.1%} ({watched} directories watched of a budget of {budget}, system limit {limit})").format(
+        coverage=status["inotify_coverage"], watched=status["watched_directories"],
+        budget=status["watch_budget"], limit=status["max_user_watches"]))
+    if status["watch_limit_reached"]:
+        send_to_output(_("The system inotify watch limit was reached; raise fs.inotify.max_user_watches for full coverage."))
+    if status["polled_trees"]:
+        send_to_output(_("Polled fallback: {directories} directories in {trees} subtrees").format(
+            directories=status["polled_directories"], trees=len(status["polled_trees"])))
+        for tree in status["polled_trees"]:
+            send_to_output(_("  {path}: {directories} directories, every {interval}s, last pass {seconds}s, changes in {changes} of {polls} polls").format(
+                path=tree["path"], directories=tree["directories"], interval=tree["interval_seconds"],
+                seconds=tree["last_poll_seconds"], changes=tree["polls_with_changes"], polls=tree["polls"]))
+    send_to_output(_("Watch status updated: {time}").format(time=status["updated"]))
+
 def monitor_changes(send_to_output):
     send_to_output(_("File monitoring started..."))
     
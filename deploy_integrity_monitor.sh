@@ -11,12 +11,6 @@ MONITOR_DIRS=(
   "/home/unitx/unitx_data"
 )
 
-VERSION_FILES=(
-  "/home/unitx/cortex/cortex_src/version.txt"
-  "/home/unitx/prod/production_src/version.txt"
-  "/home/unitx/optix/optix_src/version.txt"
-)
-
 current_dir=$(dirname "$(readlink -f "$0")")
 logs_dir="$current_dir/logs"
 mkdir -p "$logs_dir"
@@ -79,84 +73,6 @@ initialize_git() {
   fi
 }
 
-declare -A previous_versions
-read_versions() {
-  for version_file in "${VERSION_FILES[@]}"; do
-    if [ -f "$version_file" ]; then
-      current_version=$(cat "$version_file")
-
-      if [ -z "${previous_versions[$version_file]}" ]; then
-        previous_versions["$version_file"]="$current_version"
-      fi
-    else
-      echo "$(current_time) - version file does not exist: $version_file" >> $LOG_FILE
-    fi
-  done
-}
-
-check_and_commit_changes() {
-  if git diff --quiet; then
-    return 0
-  else
-    changed_files=$(git diff --name-only)
-    detailed_changes=$(git diff)
-
-
-    git commit -a -m "Automatically commit: monitored directories have changed"
-    echo "$(current_time) - Commit changes completed" >> $LOG_FILE
-
-    commit_time=$(git log -1 --format=%cd)
-
-    echo -e "[$commit_time]:\n$detailed_changes" > /tmp/file_diff.log
-
-    echo "Commit time: $commit_time" >> "$LOG_FILE"
-    echo "Changed files:" >> "$LOG_FILE"
-    echo "$changed_files" >> "$LOG_FILE"
-    echo "Changes:" >> "$LOG_FILE"
-    echo "$detailed_changes" >> "$LOG_FILE"
-    echo "------------------------------------------------------------" >> "$LOG_FILE"
-
-    notify-send -t 10000 "File changes" "View change details: /tmp/file_diff.log"
-  fi
-}
-
-check_version_changes() {
-  local all_versions=()
-  local consistent_version=""
-  local version_changed=false
-
-  for version_file in "${VERSION_FILES[@]}"; do
-    if [ -f "$version_file" ]; then
-      current_version=$(cat "$version_file")
-      all_versions+=("$current_version")
-
-      if [ -n "${previous_versions[$version_file]}" ]; then
-        if [ "${previous_versions[$version_file]}" != "$current_version" ]; then
-          version_changed=true
-        fi
-      fi
-
-      previous_versions["$version_file"]="$current_version"
-    else
-      echo "$(current_time) - version file does not exist: $version_file" >> $LOG_FILE
-    fi
-  done
-
-  consistent_version=$(echo "${all_versions[@]}" | tr ' ' '\n' | sort -u | wc -l)
-
-  if [ "$version_changed" = true ] && [ "$consistent_version" -eq 1 ]; then
-    echo "$(current_time) - version number changes and is consistent: ${all_versions[0]}" >> "$LOG_FILE"
-
-    git add . >> $LOG_FILE 2>&1
-    git commit -m "Automatically commit: version number updated to ${all_versions[0]}" >> $LOG_FILE 2>&1
-
-    commit_time=$(git log -1 --format=%cd)
-
-    echo "Commit time: $commit_time" >> "$LOG_FILE"
-    echo "------------------------------------------------------------" >> "$LOG_FILE"
-  fi
-}
-
 add_untracked_dir() {
   local dir=$1
   if ! git ls-files --error-unmatch "$dir" &>/dev/null; then
@@ -175,28 +91,26 @@ process_unitx_data() {
   fi
 }
 
-monitor_changes() {
-  while true; do
-    read_versions
-
-    for dir in "${MONITOR_DIRS[@]}"; do
-      if [ "$dir" == "/home/unitx/unitx_data" ]; then
-        real_dir=$(readlink -f "$dir")
-        if [[ -z "${processed_paths[$real_dir]}" ]]; then
-          process_unitx_data "$real_dir"
-          processed_paths["$real_dir"]=1
-        fi
-      else
-        add_untracked_dir "$dir"
+track_monitored_dirs() {
+  for dir in "${MONITOR_DIRS[@]}"; do
+    if [ "$dir" == "/home/unitx/unitx_data" ]; then
+      real_dir=$(readlink -f "$dir")
+      if [[ -z "${processed_paths[$real_dir]}" ]]; then
+        process_unitx_data "$real_dir"
+        processed_paths["$real_dir"]=1
       fi
-    done
-
-    check_and_commit_changes
+    else
+      add_untracked_dir "$dir"
+    fi
+  done
+}
 
-    check_version_changes
+# Changes are picked up by the inotify watcher instead of polling git every
+# 30 seconds; it commits only the paths that changed.
+monitor_changes() {
+  track_monitored_dirs
 
-    sleep 30
-  done
+  exec python3 "$current_dir/integrity_watcher.py"
 }
 
 main() {
@@ -4,11 +4,65 @@ CURRENT_LANG=$(echo $LANG | cut -d_ -f1)
 SCRIPT_DIR=$(dirname "$0")
 LOG_DIR="$SCRIPT_DIR/logs"
 LOG_FILE="$LOG_DIR/disk_space_check.log"
+SCAN_SCRIPT="$SCRIPT_DIR/large_file_scan.py"
+INODE_SCRIPT="$SCRIPT_DIR/inode_hotspots.py"
 
 if [ ! -d "$LOG_DIR" ]; then
     mkdir -p "$LOG_DIR"
 fi
 
+# One report per mount point, overwritten by the next scan. A partition that
+# stays full is rescanned at most every REPORT_INTERVAL_MINUTES, and scans run
+# in the background one at a time, so the check itself never waits for them.
+REPORT_INTERVAL_MINUTES=360
+REPORT_TIMEOUT=600
+REPORT_LOCK="$LOG_DIR/disk_reports.lock"
+
+report_is_recent() {
+    [ -n "$(find "$1" -maxdepth 0 -mmin -$REPORT_INTERVAL_MINUTES 2>/dev/null)" ]
+}
+
+# Runs the rest of the arguments as a scan writing to $report.tmp, and moves
+# it into place once it completes.
+run_report_scan() {
+    local report=$1 label=$2
+    shift 2
+    (
+        flock 9
+        report_is_recent "$report" && exit 0
+        if timeout $REPORT_TIMEOUT "$@" --output "$report.tmp" 2>/dev/null && mv "$report.tmp" "$report"; then
+            echo "$(date) - $label: $report" >> $LOG_FILE
+        else
+            rm -f "$report.tmp"
+        fi
+    ) 9>"$REPORT_LOCK" &
+}
+
+# Scans a full partition headlessly and records where its report was written,
+# so the alert comes with the largest files and directories attached.
+attach_large_file_report() {
+    local mount_point=$1
+    local report="$LOG_DIR/large_files$(echo "$mount_point" | tr '/' '_').json"
+    if report_is_recent "$report"; then
+        echo "$(date) - Large file report for $mount_point (recent): $report" >> $LOG_FILE
+        return
+    fi
+    run_report_scan "$report" "Large file report for $mount_point" \
+        python3 "$SCAN_SCRIPT" --path "$mount_point" --one-filesystem --min-size 1G --top 20
+}
+
+# Same for inode exhaustion: which directories hold the most entries.
+attach_inode_report() {
+    local mount_point=$1
+    local report="$LOG_DIR/inode_hotspots$(echo "$mount_point" | tr '/' '_').json"
+    if report_is_recent "$report"; then
+        echo "$(date) - Inode hotspot report for $mount_point (recent): $report" >> $LOG_FILE
+        return
+    fi
+    run_report_scan "$report" "Inode hotspot report for $mount_point" \
+        python3 "$INODE_SCRIPT" --path "$mount_point" --json
+}
+
 SPACE_USAGE=$(df -hPTl -x tmpfs -x efivarfs | sort | tail -n +2)
 INODE_USAGE=$(df -iPTl -x tmpfs -x efivarfs | grep -v "vfat" | sort | tail -n +2)
 
@@ -16,6 +70,7 @@ echo "$SPACE_USAGE" | while read line; do
     PARTITION=$(echo $line | awk '{print $1}')
     SPACE_USAGE_PERCENT=$(echo $line | awk '{print $6}' | sed -e 's/%//g')
     AVAILABLE_SPACE=$(echo $line | awk '{print $5}')
+    MOUNT_POINT=$(echo $line | awk '{print $7}')
 
     if [ $SPACE_USAGE_PERCENT -ge 95 ]; then
 	if [ "$CURRENT_LANG" == "zh" ]; then
@@ -27,6 +82,7 @@ echo "$SPACE_USAGE" | while read line; do
 	    #zenity --info --title="Disk Usage Critical" --text="The disk usage of partition $PARTITION is $SPACE_USAGE_PERCENT%, with $AVAILABLE_SPACE of space remaining, which has exceeded the 95% threshold." --icon-name="dialog-warning"
 	    notify-send "Disk Usage Critical" "Disk usage on $PARTITION is at $SPACE_USAGE_PERCENT%, remaining space is $AVAILABLE_SPACE, which is above the 95% threshold." --urgency=critical
 	fi
+	attach_large_file_report "$MOUNT_POINT"
     elif [[ $SPACE_USAGE_PERCENT -ge 85 && $SPACE_USAGE_PERCENT -lt 95 ]]; then
 	if [ "$CURRENT_LANG" == "zh" ]; then
 	    echo "$(date) - 警告: 分区 $PARTITION 的磁盘使用率为 $SPACE_USAGE_PERCENT%，剩余空间为 $AVAILABLE_SPACE。" >> $LOG_FILE
@@ -35,6 +91,7 @@ echo "$SPACE_USAGE" | while read line; do
   	    echo "$(date) - WARNING: Disk usage on $PARTITION is at $SPACE_USAGE_PERCENT%, remaining space is $AVAILABLE_SPACE." >> $LOG_FILE
             notify-send "Disk Usage Warning" "Disk usage on $PARTITION is at $SPACE_USAGE_PERCENT%, remaining space is $AVAILABLE_SPACE, which is between 85% and 95%." --urgency=normal
 	fi
+	attach_large_file_report "$MOUNT_POINT"
     fi
 done
 
@@ -42,6 +99,7 @@ echo "$INODE_USAGE" | while read line; do
     PARTITION=$(echo $line | awk '{print $1}')
     INODE_USAGE_PERCENT=$(echo $line | awk '{print $6}' | sed -e 's/%//g')
     AVAILABLE_INODES=$(echo $line | awk '{print $5}')
+    MOUNT_POINT=$(echo $line | awk '{print $7}')
 
     if [ $INODE_USAGE_PERCENT -ge 95 ]; then
 	if [ "$CURRENT_LANG" == "zh" ]; then
@@ -51,6 +109,7 @@ echo "$INODE_USAGE" | while read line; do
 	    echo "$(date) - CRITICAL: Inode usage on $PARTITION is at $INODE_USAGE_PERCENT%, remaining inodes are $AVAILABLE_INODES." >> $LOG_FILE
             notify-send "Inode Usage Critical" "Inode usage on $PARTITION is at $INODE_USAGE_PERCENT%, remaining inodes are $AVAILABLE_INODES, which is above the 95% threshold." --urgency=critical
 	fi
+	attach_inode_report "$MOUNT_POINT"
     elif [[ $INODE_USAGE_PERCENT -ge 85 && $INODE_USAGE_PERCENT -lt 95 ]]; then
 	if [ "$CURRENT_LANG" == "zh" ]; then
 	    echo "$(date) - 警告: 分区 $PARTITION 的inode使用率为 $INODE_USAGE_PERCENT%，剩余inode为 $AVAILABLE_INODES。" >> $LOG_FILE
@@ -59,6 +118,7 @@ echo "$INODE_USAGE" | while read line; do
 	    echo "$(date) - WARNING: Inode usage on $PARTITION is at $INODE_USAGE_PERCENT%, remaining inodes are $AVAILABLE_INODES." >> $LOG_FILE
             notify-send "Inode Usage Warning" "Inode usage on $PARTITION is at $INODE_USAGE_PERCENT%, remaining inodes are $AVAILABLE_INODES, which is between 85% and 95%." --urgency=normal
 	fi
+	attach_inode_report "$MOUNT_POINT"
     fi
 done
 
@@ -0,0 +1,86 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from file_size_index import KIND_FILE, KIND_LINK_FIRST
+
+EDGE_SIZE = 64 * 1024
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+DEFAULT_MIN_DUPLICATE_SIZE = 1024 * 1024
+
+def default_hash_workers():
+    # hashlib releases the GIL for large updates, so a few threads per core keep
+    # both the disk queue and the CPUs busy.
+    return min(16, (os.cpu_count() or 1) * 2)
+
+def group_by_size(index, min_size=DEFAULT_MIN_DUPLICATE_SIZE):
+    # Only sizes shared by at least two distinct inodes can hold duplicates;
+    # extra hardlinks of an inode are not reclaimable and are skipped.
+    groups = {}
+    kinds = index.kinds
+    sizes = index.sizes
+    for node_id in range(len(index)):
+        kind = kinds[node_id]
+        if (kind == KIND_FILE or kind == KIND_LINK_FIRST) and sizes[node_id] >= min_size:
+            groups.setdefault(sizes[node_id], []).append(node_id)
+    return {size: [index.path(node_id) for node_id in node_ids]
+            for size, node_ids in groups.items() if len(node_ids) > 1}
+
+def edge_hash(path, size):
+    # First and last EDGE_SIZE bytes: checkpoints and images that differ
+    # usually do so in their headers or trailing metadata. A file of at most
+    # 2 * EDGE_SIZE is read whole, so its edge hash is a full comparison.
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb", buffering=0) as f:
+        digest.update(f.read(EDGE_SIZE))
+        if size > 2 * EDGE_SIZE:
+            f.seek(size - EDGE_SIZE)
+            digest.update(f.read(EDGE_SIZE))
+        elif size > EDGE_SIZE:
+            digest.update(f.read())
+    return digest.digest()
+
+def full_hash(path, size):
+    digest = hashlib.blake2b()
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.digest()
+
+def split_groups(executor, groups, hash_function, is_running):
+    # Hashes every candidate of every group and keeps the sub-groups whose
+    # digests still collide. Unreadable files simply drop out.
+    jobs = [(size, path) for size, paths in groups for path in paths]
+
+    def hash_job(job):
+        if not is_running():
+            return None
+        size, path = job
+        try:
+            return hash_function(path, size)
+        except OSError:
+            return None
+
+    buckets = {}
+    for (size, path), digest in zip(jobs, executor.map(hash_job, jobs)):
+        if digest is not None:
+            buckets.setdefault((size, digest), []).append(path)
+    return [(size, paths) for (size, _digest), paths in buckets.items() if len(paths) > 1]
+
+def find_duplicates(size_groups, workers=None, is_running=lambda: True):
+    # Returns [(size, [paths])] of identical files, most reclaimable space first.
+    groups = list(size_groups.items())
+    with ThreadPoolExecutor(max_workers=workers or default_hash_workers()) as executor:
+        # Files no larger than the two edges were read whole by edge_hash.
+        groups = split_groups(executor, groups, edge_hash, is_running)
+        small = [(size, paths) for size, paths in groups if size <= 2 * EDGE_SIZE]
+        large = [(size, paths) for size, paths in groups if size > 2 * EDGE_SIZE]
+        groups = small + split_groups(executor, large, full_hash, is_running)
+    return sorted(groups, key=lambda group: group[0] * (len(group[1]) - 1), reverse=True)
+
+def reclaimable_bytes(duplicates):
+    return sum(size * (len(paths) - 1) for size, paths in duplicates)
@@ -1,12 +1,15 @@
 import sys
 import logging
 from PySide2.QtCore import Qt, QThread, Signal
-from PySide2.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QLabel, QTextEdit, QHBoxLayout, QSizePolicy, QMessageBox
+from PySide2.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QLabel, QTextEdit, QHBoxLayout, QSizePolicy, QMessageBox, QListWidget, QListWidgetItem, QLineEdit, QComboBox
 from PySide2.QtGui import QFontMetrics
 import os
 import time
+from datetime import datetime, timedelta
 import subprocess
 import deploy_integrity_monitor as monitor
+from integrity_events import DiffCache, connect, query_events, format_event, DEFAULT_PAGE_SIZE
+from integrity_watcher import GIT_ROOT
 from language_resources import language_resources
 from localization import setup_locale, _
 
@@ -73,6 +76,21 @@ class ShellCommandThread(QThread):
         logging.info(message)
 
 
+HISTORY_SPANS = [("All time", None), ("Last day", timedelta(days=1)), ("Last week", timedelta(days=7)),
+                 ("Last month", timedelta(days=30))]
+
+class DiffThread(QThread):
+    diff_ready = Signal(object, list)
+
+    def __init__(self, diff_cache, record, parent=None):
+        super().__init__(parent)
+        self.diff_cache = diff_cache
+        self.record = record
+
+    def run(self):
+        self.diff_ready.emit(self.record, self.diff_cache.pages(self.record))
+
+
 class FileIntegrityMonitor(QWidget):
     def __init__(self):
         super().__init__()
@@ -145,9 +163,144 @@ class FileIntegrityMonitor(QWidget):
         self.right_layout.addWidget(self.output_area_remove)
 
         self.layout.addLayout(self.right_layout)
+
+        # Change events are paged out of the integrity journal; a diff is only
+        # computed when an event is opened.
+        self.events_layout = QVBoxLayout()
+
+        self.events_label = QLabel(_("Change history"), self)
+        self.events_layout.addWidget(self.events_label)
+
+        self.events_filter_layout = QHBoxLayout()
+        self.path_filter = QLineEdit(self)
+        self.path_filter.setPlaceholderText(_("Under path, e.g. prod or /home/unitx/prod"))
+        self.path_filter.returnPressed.connect(self.load_events)
+        self.events_filter_layout.addWidget(self.path_filter)
+        self.span_selector = QComboBox(self)
+        for label, _span in HISTORY_SPANS:
+            self.span_selector.addItem(_(label))
+        self.events_filter_layout.addWidget(self.span_selector)
+        self.refresh_events_button = QPushButton(_("Search"), self)
+        self.refresh_events_button.clicked.connect(self.load_events)
+        self.events_filter_layout.addWidget(self.refresh_events_button)
+        self.events_layout.addLayout(self.events_filter_layout)
+
+        self.events_list = QListWidget(self)
+        self.events_list.currentItemChanged.connect(self.open_event)
+        self.events_layout.addWidget(self.events_list)
+
+        self.history_page_layout = QHBoxLayout()
+        self.newer_events_button = QPushButton(_("Newer"), self)
+        self.newer_events_button.clicked.connect(self.show_newer_events)
+        self.history_page_layout.addWidget(self.newer_events_button)
+        self.history_page_label = QLabel("", self)
+        self.history_page_label.setAlignment(Qt.AlignCenter)
+        self.history_page_layout.addWidget(self.history_page_label)
+        self.older_events_button = QPushButton(_("Older"), self)
+        self.older_events_button.clicked.connect(self.show_older_events)
+        self.history_page_layout.addWidget(self.older_events_button)
+        self.events_layout.addLayout(self.history_page_layout)
+
+        self.diff_area = QTextEdit(self)
+        self.diff_area.setReadOnly(True)
+        self.diff_area.setLineWrapMode(QTextEdit.NoWrap)
+        self.diff_area.setPlaceholderText(_('Select a change event to view its diff...'))
+        self.events_layout.addWidget(self.diff_area)
+
+        self.page_layout = QHBoxLayout()
+        self.previous_page_button = QPushButton(_("Previous page"), self)
+        self.previous_page_button.clicked.connect(lambda: self.show_diff_page(self.diff_page - 1))
+        self.page_layout.addWidget(self.previous_page_button)
+        self.page_label = QLabel("", self)
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.page_layout.addWidget(self.page_label)
+        self.next_page_button = QPushButton(_("Next page"), self)
+        self.next_page_button.clicked.connect(lambda: self.show_diff_page(self.diff_page + 1))
+        self.page_layout.addWidget(self.next_page_button)
+        self.events_layout.addLayout(self.page_layout)
+
+        self.layout.addLayout(self.events_layout)
         self.setLayout(self.layout)
 
         self.monitoring_thread = None
+        self.diff_cache = DiffCache(GIT_ROOT)
+        self.journal = None
+        # Each history page starts below the id where the previous one ended.
+        self.history_pages = [None]
+        self.diff_pages = []
+        self.diff_page = 0
+        self.events_loaded = False
+        self.show_diff_pages([])
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.events_loaded:
+            self.load_events()
+
+    def load_events(self):
+        self.history_pages = [None]
+        self.show_history_page()
+
+    def show_older_events(self):
+        if self.events_list.count():
+            self.history_pages.append(self.events_list.item(self.events_list.count() - 1).data(Qt.UserRole)["id"])
+            self.show_history_page()
+
+    def show_newer_events(self):
+        if len(self.history_pages) > 1:
+            self.history_pages.pop()
+            self.show_history_page()
+
+    def show_history_page(self):
+        self.events_loaded = True
+        if self.journal is None:
+            self.journal = connect()
+        under = self.path_filter.text().strip()
+        span = HISTORY_SPANS[self.span_selector.currentIndex()][1]
+        records = query_events(self.journal, os.path.realpath(os.path.join(GIT_ROOT, under)) if under else None,
+                               datetime.now() - span if span else None, before_id=self.history_pages[-1])
+        self.events_list.clear()
+        for record in records:
+            item = QListWidgetItem(format_event(record))
+            item.setData(Qt.UserRole, record)
+            self.events_list.addItem(item)
+        self.history_page_label.setText(_("Page {page}").format(page=len(self.history_pages)))
+        self.newer_events_button.setEnabled(len(self.history_pages) > 1)
+        self.older_events_button.setEnabled(len(records) == DEFAULT_PAGE_SIZE)
+
+    def open_event(self, item, _previous=None):
+        if item is None:
+            return
+        self.diff_area.setPlainText(_("Computing diff..."))
+        # Owned by the widget until it finishes, so opening another event while
+        # a diff is still running does not destroy the running thread.
+        thread = DiffThread(self.diff_cache, item.data(Qt.UserRole), self)
+        thread.diff_ready.connect(self.diff_ready)
+        thread.finished.connect(thread.deleteLater)
+        thread.start()
+
+    def diff_ready(self, record, pages):
+        # A slower diff for an event that is no longer selected is dropped.
+        item = self.events_list.currentItem()
+        if item is not None and item.data(Qt.UserRole) == record:
+            self.show_diff_pages(pages)
+
+    def show_diff_pages(self, pages):
+        self.diff_pages = pages
+        self.show_diff_page(0)
+
+    def show_diff_page(self, page):
+        if not self.diff_pages:
+            self.diff_page = 0
+            self.page_label.setText("")
+            self.previous_page_button.setEnabled(False)
+            self.next_page_button.setEnabled(False)
+            return
+        self.diff_page = max(0, min(page, len(self.diff_pages) - 1))
+        self.diff_area.setPlainText(self.diff_pages[self.diff_page])
+        self.page_label.setText(_("Page {page} of {pages}").format(page=self.diff_page + 1, pages=len(self.diff_pages)))
+        self.previous_page_button.setEnabled(self.diff_page > 0)
+        self.next_page_button.setEnabled(self.diff_page < len(self.diff_pages) - 1)
     def set_button_width(self, button):
         font_metrics = QFontMetrics(button.font())
         text_width = font_metrics.horizontalAdvance(button.text())
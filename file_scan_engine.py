@@ -0,0 +1,321 @@
+import heapq
+import os
+import re
+import threading
+from collections import deque
+from localization import _
+from file_size_index import KIND_FILE, KIND_DIR, KIND_LINK_FIRST, KIND_LINK_DUPLICATE
+
+# Kernel pseudo filesystems, the only subtrees headless and inode scans skip.
+PSEUDO_FILESYSTEM_PATHS = {'/proc', '/sys', '/dev', '/run'}
+# Absolute subtrees the interactive scan never descends into, and bare names
+# skipped wherever they occur.
+DEFAULT_EXCLUDE_PATHS = PSEUDO_FILESYSTEM_PATHS | {'/tmp', '/var', '/lib', '/snap'}
+DEFAULT_EXCLUDE_NAMES = {'lost+found'}
+# Filesystem types a scan may cross into when it is not kept on one device.
+# Network and pseudo filesystems (sshfs, cifs, nfs, tmpfs, overlay, ...) are
+# never entered unless their mount point is allowed explicitly.
+LOCAL_FILESYSTEMS = {'ext2', 'ext3', 'ext4', 'xfs', 'btrfs', 'f2fs', 'vfat', 'exfat', 'ntfs', 'ntfs3', 'fuseblk'}
+MOUNTINFO_FILE = "/proc/self/mountinfo"
+DEFAULT_TOP_FILES = 50
+
+def default_worker_count():
+    # Directory reads and lstat() release the GIL; more threads than cores keeps
+    # the NVMe queue busy while others wait on the kernel.
+    return min(32, (os.cpu_count() or 1) * 4)
+
+def read_mountinfo(mountinfo_file=MOUNTINFO_FILE):
+    # Returns {mount point: filesystem type}. The type follows the " - "
+    # separator (proc(5)); the kernel writes space, tab, newline and backslash
+    # in mount points as octal escapes and every other byte as is.
+    mounts = {}
+    try:
+        with open(mountinfo_file, "rb") as f:
+            for line in f:
+                fields, _separator, tail = line.partition(b" - ")
+                fields = fields.split()
+                if len(fields) < 5 or not tail:
+                    continue
+                mount_point = os.fsdecode(re.sub(rb"\\([0-7]{3})", lambda match: bytes([int(match.group(1), 8)]), fields[4]))
+                mounts[mount_point] = tail.split()[0].decode(errors="replace")
+    except OSError:
+        pass
+    return mounts
+
+
+class TraversalPolicy:
+    def __init__(self, one_filesystem=True, exclude_paths=None, exclude_names=None,
+                 allowed_mounts=None, allowed_fstypes=None, mounts=None):
+        self.one_filesystem = one_filesystem
+        self.exclude_paths = DEFAULT_EXCLUDE_PATHS if exclude_paths is None else {os.path.abspath(path) for path in exclude_paths}
+        self.exclude_names = DEFAULT_EXCLUDE_NAMES if exclude_names is None else set(exclude_names)
+        self.allowed_mounts = set(allowed_mounts or ())
+        self.allowed_fstypes = LOCAL_FILESYSTEMS if allowed_fstypes is None else set(allowed_fstypes)
+        self.mounts = read_mountinfo() if mounts is None else mounts
+
+    def excludes(self, path):
+        # Subtrees are pruned at their top directory, so a prefix only has to
+        # be compared against the directory that would start it.
+        return path in self.exclude_paths
+
+    def allows(self, path, name, device, parent_device):
+        if name in self.exclude_names or self.excludes(path):
+            return False
+        if device == parent_device:
+            return True
+        return self.may_cross(path)
+
+    def allows_without_stat(self, path, name):
+        # For passes that never stat(): mount points are recognised from
+        # mountinfo instead of by comparing st_dev.
+        if name in self.exclude_names or self.excludes(path):
+            return False
+        return path not in self.mounts or self.may_cross(path)
+
+    def may_cross(self, path):
+        if path in self.allowed_mounts:
+            return True
+        if self.one_filesystem:
+            return False
+        return self.mounts.get(path) in self.allowed_fstypes
+
+
+class ScanEngine:
+    def __init__(self, directory, min_size_bytes, policy=None, workers=None,
+                 on_file=None, on_progress=None, on_error=None, index=None, previous_index=None,
+                 top_files=DEFAULT_TOP_FILES):
+        self.directory = directory
+        self.min_size_bytes = min_size_bytes
+        self.policy = policy or TraversalPolicy()
+        self.workers = workers or default_worker_count()
+        self.on_file = on_file
+        self.on_progress = on_progress
+        self.on_error = on_error
+        # When an index is given every entry is recorded in it; directories
+        # whose inode and mtime match previous_index reuse its listing instead
+        # of being read. Their files are still lstat()ed: appending to a file
+        # does not touch its directory's mtime. That saves only the getdents
+        # calls, which a warm page cache answers for nearly nothing, so reuse
+        # is opt-in; grown_since() needs the previous index, not this.
+        self.index = index
+        self.previous_index = previous_index
+        self.reused_directories = 0
+        # Bounded min-heap of (size, path): the largest files seen regardless
+        # of min_size_bytes.
+        self.top_files_limit = top_files
+        self.top_files = []
+        self._top_lock = threading.Lock()
+        # (st_dev, st_ino) of multiply linked files already counted once.
+        self._seen_links = set()
+        self._links_lock = threading.Lock()
+
+        self.processed_files = 0
+        self._is_running = True
+        self._queues = []
+        self._pending = 0
+        self._idle = 0
+        self._condition = threading.Condition()
+
+    def stop(self):
+        self._is_running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def run(self):
+        # Each worker owns a deque of directories and works LIFO on it (depth
+        # first, good locality); an idle worker steals the oldest, usually
+        # largest, subtree from another worker's queue.
+        self._queues = [deque() for _ in range(self.workers)]
+        root_stat = os.lstat(self.directory)
+        root_id = previous_root_id = None
+        if self.index is not None:
+            root_id = self.index.add_root(root_stat)
+            if self.previous_index is not None and len(self.previous_index) and self.previous_index.root == self.directory:
+                previous_root_id = 0
+        self._queues[0].append((self.directory, root_stat.st_dev, root_id, previous_root_id))
+        self._pending = 1
+        self._idle = 0
+        threads = [threading.Thread(target=self._worker, args=(index,), daemon=True) for index in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self._is_running
+
+    def _next_directory(self, index):
+        own = self._queues[index]
+        try:
+            return own.pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.workers):
+            try:
+                return self._queues[(index + offset) % self.workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _worker(self, index):
+        own = self._queues[index]
+        while self._is_running:
+            directory = self._next_directory(index)
+            if directory is None:
+                with self._condition:
+                    if self._pending == 0 or not self._is_running:
+                        self._condition.notify_all()
+                        return
+                    self._idle += 1
+                    self._condition.wait(0.05)
+                    self._idle -= 1
+                continue
+
+            subdirectories = self.scan_directory(directory)
+            # Counted before they are queued: a thief could otherwise finish
+            # one and bring _pending to zero while this directory is still
+            # counted as the only one left.
+            with self._condition:
+                self._pending += len(subdirectories) - 1
+                own.extend(subdirectories)
+                if self._idle and (subdirectories or self._pending == 0):
+                    self._condition.notify_all()
+
+    def link_kind(self, device, inode):
+        key = (device, inode)
+        with self._links_lock:
+            if key in self._seen_links:
+                return KIND_LINK_DUPLICATE
+            self._seen_links.add(key)
+            return KIND_LINK_FIRST
+
+    def is_unchanged(self, node_id, previous_id):
+        if previous_id is None or node_id is None:
+            return False
+        previous = self.previous_index
+        return (previous.is_dir(previous_id)
+                and previous.inodes[previous_id] == self.index.inodes[node_id]
+                and previous.mtimes[previous_id] == self.index.mtimes[node_id])
+
+    def reuse_directory(self, directory, device, node_id, previous_id):
+        previous = self.previous_index
+        records = []
+        previous_ids = []
+        devices = []
+        file_count = 0
+        for name, child_id in previous.children(previous_id).items():
+            path = os.path.join(directory, os.fsdecode(name))
+            kind = previous.kinds[child_id]
+            if kind == KIND_DIR:
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if not self.policy.allows(path, os.fsdecode(name), st.st_dev, device):
+                    continue
+                records.append((name, KIND_DIR, 0, st.st_blocks * 512, st.st_mtime_ns, st.st_ino))
+                devices.append(st.st_dev)
+            else:
+                try:
+                    st = os.lstat(path)
+                except FileNotFoundError:
+                    continue
+                except PermissionError as e:
+                    self.report_error(_("Unable to access file {file}: {e}").format(file=path, e=str(e)))
+                    continue
+                if kind != KIND_FILE or st.st_nlink > 1:
+                    kind = KIND_FILE if st.st_nlink <= 1 else self.link_kind(st.st_dev, st.st_ino)
+                size = st.st_size
+                records.append((name, kind, size, st.st_blocks * 512, st.st_mtime_ns, st.st_ino))
+                devices.append(device)
+                file_count += 1
+                if kind != KIND_LINK_DUPLICATE:
+                    self.offer_file(path, size)
+            previous_ids.append(child_id)
+        subdirectories = []
+        for record, child_id, previous_child, child_device in zip(
+                records, self.index.add_entries(node_id, records), previous_ids, devices):
+            if record[1] == KIND_DIR:
+                subdirectories.append((os.path.join(directory, os.fsdecode(record[0])), child_device, child_id, previous_child))
+        with self._condition:
+            self.reused_directories += 1
+        return subdirectories, file_count
+
+    def scan_directory(self, item):
+        directory, device, node_id, previous_id = item
+        if self.is_unchanged(node_id, previous_id):
+            subdirectories, file_count = self.reuse_directory(directory, device, node_id, previous_id)
+            self.count_files(file_count)
+            return subdirectories
+
+        subdirectories = []
+        records = []
+        file_count = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not self._is_running:
+                        break
+                    try:
+                        # d_type from getdents answers is_dir()/is_file() without
+                        # a syscall; directories and regular files then get one
+                        # lstat() for their device, link count and sizes.
+                        if entry.is_dir(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            if self.policy.allows(entry.path, entry.name, st.st_dev, device):
+                                subdirectories.append((entry.path, st.st_dev))
+                                records.append((os.fsencode(entry.name), KIND_DIR, 0, st.st_blocks * 512, st.st_mtime_ns, st.st_ino))
+                        elif entry.is_file(follow_symlinks=False):
+                            file_count += 1
+                            st = entry.stat(follow_symlinks=False)
+                            # Hardlinked inodes are counted at the first path seen.
+                            kind = KIND_FILE if st.st_nlink <= 1 else self.link_kind(st.st_dev, st.st_ino)
+                            if kind != KIND_LINK_DUPLICATE:
+                                self.offer_file(entry.path, st.st_size)
+                            records.append((os.fsencode(entry.name), kind, st.st_size, st.st_blocks * 512, st.st_mtime_ns, st.st_ino))
+                    except (FileNotFoundError, PermissionError) as e:
+                        self.report_error(_("Unable to access file {file}: {e}").format(file=entry.path, e=str(e)))
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            pass
+        except OSError as e:
+            self.report_error(_("Scan error: {e}").format(e=str(e)))
+
+        self.count_files(file_count)
+        if self.index is None:
+            return [(path, child_device, None, None) for path, child_device in subdirectories]
+
+        previous_children = self.previous_index.children(previous_id) if previous_id is not None else {}
+        items = []
+        child_devices = iter(subdirectories)
+        for record, child_id in zip(records, self.index.add_entries(node_id, records)):
+            if record[1] == KIND_DIR:
+                path, child_device = next(child_devices)
+                items.append((path, child_device, child_id, previous_children.get(record[0])))
+        return items
+
+    def offer_file(self, path, size):
+        if size >= self.min_size_bytes and self.on_file:
+            self.on_file(path, size)
+        if self.top_files_limit and (len(self.top_files) < self.top_files_limit or size > self.top_files[0][0]):
+            with self._top_lock:
+                if len(self.top_files) < self.top_files_limit:
+                    heapq.heappush(self.top_files, (size, path))
+                elif size > self.top_files[0][0]:
+                    heapq.heapreplace(self.top_files, (size, path))
+
+    def largest_files(self):
+        return sorted(self.top_files, reverse=True)
+
+    def count_files(self, file_count):
+        if file_count:
+            with self._condition:
+                self.processed_files += file_count
+                processed_files = self.processed_files
+            if self.on_progress:
+                self.on_progress(processed_files)
+
+    def report_error(self, message):
+        if self.on_error:
+            self.on_error(message)
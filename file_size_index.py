@@ -0,0 +1,179 @@
+import heapq
+import json
+import os
+import threading
+from array import array
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "size_index")
+INDEX_MAGIC = b"SZIX2\n"
+NO_PARENT = -1
+
+KIND_FILE = 0
+KIND_DIR = 1
+# Files with st_nlink > 1: the first path seen for an inode is counted, later
+# paths keep their size for reference but are left out of every total.
+KIND_LINK_FIRST = 2
+KIND_LINK_DUPLICATE = 3
+
+
+def index_file_for(root):
+    name = "root" if root == os.sep else root.strip(os.sep).replace(os.sep, "_")
+    return os.path.join(INDEX_DIR, f"{name}.idx")
+
+
+class SizeIndex:
+    # One row per file or directory, stored column-wise in typed arrays so a
+    # few million entries cost tens of bytes each and load with one read per
+    # column. Rows refer to their directory through the parent column; names
+    # live in a single byte blob addressed by name_offsets.
+    COLUMNS = (("parents", "q"), ("sizes", "Q"), ("allocated", "Q"), ("mtimes", "q"), ("inodes", "Q"), ("kinds", "B"))
+
+    def __init__(self, root):
+        self.root = root
+        self.parents = array("q")
+        self.sizes = array("Q")
+        self.allocated = array("Q")
+        self.mtimes = array("q")
+        self.inodes = array("Q")
+        self.kinds = array("B")
+        self.name_offsets = array("Q", [0])
+        self.names = bytearray()
+        self._children = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_root(self, st):
+        return self.add_entries(NO_PARENT, [(os.fsencode(self.root), KIND_DIR, 0, st.st_blocks * 512, st.st_mtime_ns, st.st_ino)])[0]
+
+    def add_entries(self, parent_id, entries):
+        # entries: (name bytes, kind, size, allocated, mtime_ns, inode); returns the new row ids.
+        with self._lock:
+            first = len(self.parents)
+            for name, kind, size, allocated, mtime_ns, inode in entries:
+                self.parents.append(parent_id)
+                self.sizes.append(size)
+                self.allocated.append(allocated)
+                self.mtimes.append(mtime_ns)
+                self.inodes.append(inode)
+                self.kinds.append(kind)
+                self.names += name
+                self.name_offsets.append(len(self.names))
+            return list(range(first, len(self.parents)))
+
+    def is_dir(self, node_id):
+        return self.kinds[node_id] == KIND_DIR
+
+    def name(self, node_id):
+        return bytes(self.names[self.name_offsets[node_id]:self.name_offsets[node_id + 1]])
+
+    def path(self, node_id):
+        parts = []
+        while node_id != NO_PARENT:
+            parts.append(self.name(node_id))
+            node_id = self.parents[node_id]
+        return os.fsdecode(os.path.join(*reversed(parts)))
+
+    def children(self, node_id):
+        # Built once on first use; a dict per directory from child name to row.
+        if self._children is None:
+            with self._lock:
+                if self._children is None:
+                    children = {}
+                    for child_id, parent_id in enumerate(self.parents):
+                        if parent_id != NO_PARENT:
+                            children.setdefault(parent_id, {})[self.name(child_id)] = child_id
+                    self._children = children
+        return self._children.get(node_id, {})
+
+    def save(self, index_file):
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        header = json.dumps({"root": self.root, "count": len(self), "names": len(self.names)}).encode()
+        temp_file = f"{index_file}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for attribute, _typecode in self.COLUMNS:
+                getattr(self, attribute).tofile(f)
+            self.name_offsets.tofile(f)
+            f.write(self.names)
+        os.replace(temp_file, index_file)
+
+    @classmethod
+    def load(cls, index_file):
+        try:
+            with open(index_file, "rb") as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return None
+                header = json.loads(f.read(int.from_bytes(f.read(4), "little")))
+                index = cls(header["root"])
+                count = header["count"]
+                for attribute, _typecode in cls.COLUMNS:
+                    getattr(index, attribute).fromfile(f, count)
+                index.name_offsets = array("Q")
+                index.name_offsets.fromfile(f, count + 1)
+                index.names = bytearray(f.read(header["names"]))
+                return index
+        except (OSError, ValueError, EOFError, KeyError):
+            return None
+
+
+def grown_since(previous, current, top=20):
+    # Walks both trees side by side by name and returns the files that grew
+    # the most (new files count from zero) as (path, growth, size).
+    if not len(previous) or not len(current):
+        return []
+    growth = []
+    stack = [(0, 0)]
+    while stack:
+        current_id, previous_id = stack.pop()
+        previous_children = previous.children(previous_id) if previous_id is not None else {}
+        for name, child_id in current.children(current_id).items():
+            previous_child = previous_children.get(name)
+            if current.is_dir(child_id):
+                if previous_child is not None and not previous.is_dir(previous_child):
+                    previous_child = None
+                stack.append((child_id, previous_child))
+                continue
+            old_size = previous.sizes[previous_child] if previous_child is not None and not previous.is_dir(previous_child) else 0
+            delta = current.sizes[child_id] - old_size
+            if delta > 0:
+                growth.append((delta, child_id))
+    return [(current.path(child_id), delta, current.sizes[child_id])
+            for delta, child_id in heapq.nlargest(top, growth)]
+
+
+class DirectoryTotals:
+    # du-style subtree totals for every directory row of a SizeIndex. Rows are
+    # always appended after their parent, so one reverse pass over the parent
+    # column rolls every entry up into all of its ancestors.
+    def __init__(self, index):
+        count = len(index)
+        self.index = index
+        self.apparent = array("Q", bytes(8 * count))
+        self.allocated = array("Q", bytes(8 * count))
+        self.files = array("Q", bytes(8 * count))
+        parents = index.parents
+        for node_id in range(count - 1, -1, -1):
+            kind = index.kinds[node_id]
+            if kind != KIND_LINK_DUPLICATE:
+                self.apparent[node_id] += index.sizes[node_id]
+                self.allocated[node_id] += index.allocated[node_id]
+            if kind == KIND_FILE or kind == KIND_LINK_FIRST:
+                self.files[node_id] += 1
+            parent_id = parents[node_id]
+            if parent_id != NO_PARENT:
+                self.apparent[parent_id] += self.apparent[node_id]
+                self.allocated[parent_id] += self.allocated[node_id]
+                self.files[parent_id] += self.files[node_id]
+
+    def top_directories(self, top=20):
+        index = self.index
+        rows = (node_id for node_id in range(1, len(index)) if index.kinds[node_id] == KIND_DIR)
+        return [(index.path(node_id), self.apparent[node_id], self.allocated[node_id], self.files[node_id])
+                for node_id in heapq.nlargest(top, rows, key=self.allocated.__getitem__)]
+
+    def sorted_children(self, node_id):
+        return sorted(self.index.children(node_id).values(), key=self.allocated.__getitem__, reverse=True)
@@ -0,0 +1,158 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from localization import _
+from file_scan_engine import ScanEngine, TraversalPolicy, PSEUDO_FILESYSTEM_PATHS
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "inode_snapshots")
+# Directories with fewer direct entries are left out of snapshots to keep them
+# small. Growth is only reported for directories the previous snapshot holds,
+# so a directory crossing the floor is never compared against zero.
+SNAPSHOT_MIN_ENTRIES = 10
+# Pseudo filesystems only; unlike a size scan, /tmp and /var are often where
+# the inodes go.
+INODE_EXCLUDE_PATHS = PSEUDO_FILESYSTEM_PATHS
+DEFAULT_TOP = 20
+
+
+class InodeCountEngine(ScanEngine):
+    # Counts the entries of every directory from getdents alone: d_type tells
+    # directories apart, so no entry is ever stat()ed. The work-stealing pool
+    # of ScanEngine spreads the subtrees across threads.
+    def __init__(self, directory, policy=None, workers=None, on_progress=None, on_error=None):
+        super().__init__(directory, 0, policy=policy, workers=workers,
+                         on_progress=on_progress, on_error=on_error, top_files=0)
+        self.counts = {}
+
+    def scan_directory(self, item):
+        directory = item[0]
+        subdirectories = []
+        count = 0
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not self._is_running:
+                        break
+                    count += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False) and self.policy.allows_without_stat(entry.path, entry.name):
+                            subdirectories.append((entry.path, None, None, None))
+                    except OSError as e:
+                        self.report_error(_("Unable to access file {file}: {e}").format(file=entry.path, e=str(e)))
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            pass
+        except OSError as e:
+            self.report_error(_("Scan error: {e}").format(e=str(e)))
+        self.counts[directory] = count
+        self.count_files(count)
+        return subdirectories
+
+
+def subtree_totals(counts):
+    # Deepest directories first, so every count is complete before it is added
+    # to its parent.
+    totals = dict(counts)
+    for path in sorted(counts, key=lambda path: path.count(os.sep), reverse=True):
+        parent = os.path.dirname(path)
+        if parent != path and parent in totals:
+            totals[parent] += totals[path]
+    return totals
+
+def snapshot_file_for(root):
+    name = "root" if root == os.sep else root.strip(os.sep).replace(os.sep, "_")
+    return os.path.join(SNAPSHOT_DIR, f"{name}.json")
+
+def load_snapshot(root):
+    try:
+        with open(snapshot_file_for(root), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_snapshot(root, counts):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    snapshot = {
+        "root": root,
+        "taken_at": datetime.now().isoformat(timespec="seconds"),
+        "counts": {path: count for path, count in counts.items() if count >= SNAPSHOT_MIN_ENTRIES},
+    }
+    snapshot_file = snapshot_file_for(root)
+    with open(f"{snapshot_file}.tmp", "w") as f:
+        json.dump(snapshot, f)
+    os.replace(f"{snapshot_file}.tmp", snapshot_file)
+
+def find_hotspots(root, top=DEFAULT_TOP, one_filesystem=True, save=True, engine_ready=None, on_progress=None):
+    # Returns a dict with the directories holding the most entries directly,
+    # the largest subtrees, and the directories that grew most since the
+    # previous snapshot of the same root.
+    root = os.path.abspath(root)
+    previous = load_snapshot(root)
+    engine = InodeCountEngine(root, policy=TraversalPolicy(one_filesystem=one_filesystem, exclude_paths=INODE_EXCLUDE_PATHS), on_progress=on_progress)
+    if engine_ready:
+        engine_ready(engine)
+    started = time.monotonic()
+    if not engine.run():
+        return None
+    elapsed = time.monotonic() - started
+    counts = engine.counts
+    totals = subtree_totals(counts)
+
+    result = {
+        "path": root,
+        "scanned_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(elapsed, 3),
+        "directories": len(counts),
+        "entries": engine.processed_files,
+        "top_directories": [{"path": path, "entries": count, "subtree_entries": totals[path]}
+                            for path, count in heapq.nlargest(top, counts.items(), key=lambda item: item[1])],
+        "top_subtrees": [{"path": path, "subtree_entries": total}
+                         for path, total in heapq.nlargest(top, totals.items(), key=lambda item: item[1])],
+    }
+    if previous is not None:
+        previous_counts = previous.get("counts", {})
+        growth = ((count - previous_counts[path], path) for path, count in counts.items()
+                  if path in previous_counts)
+        result["previous_snapshot"] = previous.get("taken_at")
+        result["grown_directories"] = [{"path": path, "growth": delta, "entries": counts[path]}
+                                       for delta, path in heapq.nlargest(top, growth) if delta > 0]
+    if save:
+        save_snapshot(root, counts)
+    return result
+
+def format_report(result):
+    lines = [_("[Directories with the most entries]")]
+    for entry in result["top_directories"]:
+        lines.append(_("{path}: {entries} entries ({subtree} in subtree)").format(
+            path=entry["path"], entries=entry["entries"], subtree=entry["subtree_entries"]))
+    if result.get("grown_directories"):
+        lines.append(_("[Grown since {time}]").format(time=result["previous_snapshot"]))
+        for entry in result["grown_directories"]:
+            lines.append(_("{path}: +{growth} entries (now {entries})").format(
+                path=entry["path"], growth=entry["growth"], entries=entry["entries"]))
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the directories that hold the most inodes")
+    parser.add_argument("--path", default="/", help="Directory to scan")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of directories to list")
+    parser.add_argument("--cross-filesystems", action="store_true", help="Also descend into other local mounts")
+    parser.add_argument("--no-snapshot", action="store_true", help="Do not save this scan as the new growth baseline")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    parser.add_argument("--output", help="Write the result to this file instead of stdout")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.path):
+        print(_("Directory does not exist: {path}").format(path=args.path), file=sys.stderr)
+        exit(1)
+
+    result = find_hotspots(args.path, args.top, not args.cross_filesystems, not args.no_snapshot)
+    text = json.dumps(result, indent=2) if args.json else format_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
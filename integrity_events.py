@@ -0,0 +1,212 @@
+import argparse
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from localization import _
+from time_spans import parse_span
+
+# One compact row per changed file or version file, indexed by time and path;
+# diffs are only computed when an event is opened in the File Integrity
+# Monitor.
+JOURNAL_DB_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "logs", "integrity_journal.db")
+DEFAULT_MAX_EVENTS = 2000000
+DEFAULT_PAGE_SIZE = 200
+# Subtrees with at least this many events are paged by walking the newest rows
+# backwards instead of through the path index.
+DENSE_PATH_MATCHES = 5000
+
+# "git": old and new are blob ids in the integrity repository.
+# "hash": old and new are manifest digests, no content is kept.
+# "version": old and new are the contents of a version file.
+STORE_GIT = "git"
+STORE_HASH = "hash"
+STORE_VERSION = "version"
+VERSION_CHANGED = "version"
+
+DIFF_PAGE_LINES = 500
+DIFF_CACHE_SIZE = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    size_delta INTEGER,
+    old TEXT,
+    new TEXT,
+    store TEXT NOT NULL,
+    commit_id TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_path ON events (path, ts);
+"""
+COLUMNS = ("id", "ts", "kind", "path", "size", "size_delta", "old", "new", "store", "commit_id")
+
+def connect(db_file=JOURNAL_DB_FILE):
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def change_record(kind, path, old, new, store, commit_id=None, size=None, size_delta=None):
+    return {
+        "ts": time.time_ns(),
+        "kind": kind,
+        "path": path,
+        "size": size,
+        "size_delta": size_delta,
+        "old": old,
+        "new": new,
+        "store": store,
+        "commit_id": commit_id,
+    }
+
+def append_events(conn, records):
+    if not records:
+        return
+    with conn:
+        conn.executemany("INSERT INTO events (ts, kind, path, size, size_delta, old, new, store, commit_id) "
+                         "VALUES (:ts, :kind, :path, :size, :size_delta, :old, :new, :store, :commit_id)", records)
+
+def enforce_retention(conn, max_events=DEFAULT_MAX_EVENTS):
+    with conn:
+        removed = conn.execute("DELETE FROM events WHERE id <= (SELECT max(id) FROM events) - ?", (max_events,)).rowcount
+    return removed
+
+def to_epoch_ns(moment):
+    return int(moment.timestamp() * 1_000_000_000)
+
+def query_events(conn, under=None, start_time=None, end_time=None, kinds=None, before_id=None, limit=DEFAULT_PAGE_SIZE):
+    # Newest first. under matches the path itself and everything below it as
+    # an index range; before_id continues from the last row of a previous page.
+    clauses = []
+    params = []
+    table = "events"
+    if under:
+        under = under.rstrip(os.sep) or os.sep
+        prefix = under if under.endswith(os.sep) else under + os.sep
+        clauses.append("(path = ? OR (path >= ? AND path < ?))")
+        params += [under, prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+        # The path index has to sort every match by id, which is slow for a
+        # busy subtree; there a backwards walk fills the page almost at once.
+        matches = conn.execute(f"SELECT count(*) FROM (SELECT 1 FROM events WHERE {clauses[0]} LIMIT ?)",
+                               params + [DENSE_PATH_MATCHES]).fetchone()[0]
+        table = "events NOT INDEXED" if matches >= DENSE_PATH_MATCHES else "events INDEXED BY events_path"
+    if start_time is not None:
+        clauses.append("ts >= ?")
+        params.append(to_epoch_ns(start_time))
+    if end_time is not None:
+        clauses.append("ts <= ?")
+        params.append(to_epoch_ns(end_time))
+    if kinds:
+        clauses.append("kind IN ({})".format(",".join("?" * len(kinds))))
+        params.extend(kinds)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    query = "SELECT {} FROM {}".format(", ".join(COLUMNS), table)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    return [dict(zip(COLUMNS, row)) for row in conn.execute(query, params)]
+
+def format_size_delta(size_delta):
+    return f"{size_delta:+d} B" if size_delta else ""
+
+def format_event(record):
+    stamp = datetime.fromtimestamp(record["ts"] / 1_000_000_000).strftime("%Y-%m-%d %H:%M:%S")
+    text = f"{stamp}  {record['kind']}: {record['path']}"
+    if record["store"] == STORE_VERSION:
+        return f"{text}  {record['old'] or '-'} -> {record['new'] or '-'}"
+    return f"{text}  {format_size_delta(record['size_delta'])}".rstrip()
+
+
+class DiffCache:
+    # Diffs are computed on first request and kept for the DIFF_CACHE_SIZE
+    # most recently opened events, already split into pages. Several diff
+    # threads may share one cache; git runs outside the lock.
+    def __init__(self, git_root, size=DIFF_CACHE_SIZE, page_lines=DIFF_PAGE_LINES):
+        self.git_root = git_root
+        self.size = size
+        self.page_lines = page_lines
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pages(self, record):
+        key = (record["store"], record["path"], record["old"], record["new"])
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        lines = self.diff_lines(record)
+        pages = ["\n".join(lines[start:start + self.page_lines])
+                 for start in range(0, len(lines), self.page_lines)] or [""]
+        with self._lock:
+            self.cache[key] = pages
+            if len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return pages
+
+    def git(self, *args):
+        return subprocess.run(["git", "-C", self.git_root, *args], stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, text=True, errors="replace")
+
+    def blob_lines(self, blob, prefix):
+        result = self.git("cat-file", "blob", blob)
+        if result.returncode != 0:
+            return None
+        return [prefix + line for line in result.stdout.splitlines()]
+
+    def diff_lines(self, record):
+        old, new = record["old"], record["new"]
+        header = [format_event(record)]
+        if record["store"] == STORE_VERSION:
+            return header
+        if record["store"] == STORE_HASH:
+            return header + ["Tracked by hash only, no content is stored.",
+                             f"Old digest: {old or '-'}", f"New digest: {new or '-'}"]
+        if old and new:
+            result = self.git("diff", old, new)
+            lines = result.stdout.splitlines() if result.returncode == 0 else None
+        elif new:
+            lines = self.blob_lines(new, "+")
+        elif old:
+            lines = self.blob_lines(old, "-")
+        else:
+            lines = []
+        if lines is None:
+            return header + [f"Content is no longer in the git repository ({old or '-'} -> {new or '-'})."]
+        return header + lines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the file integrity change journal")
+    parser.add_argument("--under", help="Only changes to this file or below this directory")
+    parser.add_argument("--last", help="Only changes from the last span, e.g. 30m, 6h, 7d")
+    parser.add_argument("-t", nargs="+", help="Time range: start_time [end_time] (format: YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--kind", nargs="+", help="Only these kinds: added deleted modified touched version")
+    parser.add_argument("--limit", type=int, default=DEFAULT_PAGE_SIZE, help="Maximum number of results")
+    args = parser.parse_args()
+
+    start_time = end_time = None
+    try:
+        if args.last:
+            start_time = datetime.now() - parse_span(args.last)
+        elif args.t:
+            start_time = datetime.strptime(args.t[0], "%Y-%m-%d %H:%M:%S")
+            end_time = datetime.strptime(args.t[1], "%Y-%m-%d %H:%M:%S") if len(args.t) > 1 else None
+    except ValueError:
+        print(_("Invalid time format. Please use 'YYYY-MM-DD HH:MM:SS'."))
+        exit(1)
+    conn = connect()
+    under = os.path.realpath(args.under) if args.under else None
+    for record in reversed(query_events(conn, under, start_time, end_time, args.kind, limit=args.limit)):
+        print(format_event(record))
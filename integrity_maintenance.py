@@ -0,0 +1,161 @@
+import argparse
+import os
+import subprocess
+import time
+from datetime import datetime
+
+# Maintenance of the integrity git repository, run by the watcher between
+# batches: nothing else touches the repository then, so history can be
+# rewritten and unreachable objects pruned safely.
+MAINTENANCE_INTERVAL = 6 * 3600
+DEFAULT_RETENTION_DAYS = 90
+# Loose objects are packed from this count, packs are merged from this count.
+LOOSE_OBJECT_LIMIT = 2000
+PACK_LIMIT = 20
+# History is only squashed once this many commits have aged past the
+# retention window, so the rewrite runs rarely.
+SQUASH_MIN_COMMITS = 500
+# git settings for a work tree holding the whole home directory: a v4 index
+# is smaller to read and write, the untracked cache lets "git add" and
+# "git diff" skip unchanged directories, and gc.auto is off because repacks
+# happen here instead of in the middle of a commit.
+REPOSITORY_SETTINGS = {
+    "core.untrackedCache": "true",
+    "index.version": "4",
+    "core.commitGraph": "true",
+    "gc.auto": "0",
+}
+LOG_FIELDS = ("%T", "%an", "%ae", "%aI", "%cn", "%ce", "%cI", "%B")
+
+def git(git_root, *args, stdin_text=None, env=None):
+    return subprocess.run(["git", "-C", git_root, *args], input=stdin_text, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, text=True, errors="replace",
+                          env=dict(os.environ, **(env or {})))
+
+def is_repository(git_root):
+    return git(git_root, "rev-parse", "--verify", "-q", "HEAD").returncode == 0
+
+def tune_repository(git_root):
+    for key, value in REPOSITORY_SETTINGS.items():
+        if git(git_root, "config", "--get", key).stdout.strip() != value:
+            git(git_root, "config", key, value)
+    git(git_root, "update-index", "--index-version", REPOSITORY_SETTINGS["index.version"], "--untracked-cache")
+
+def repository_stats(git_root):
+    # Sizes in bytes, from "git count-objects -v" (which reports KiB).
+    stats = {}
+    for line in git(git_root, "count-objects", "-v").stdout.splitlines():
+        key, _separator, value = line.partition(": ")
+        if value.isdigit():
+            stats[key] = int(value) * 1024 if key.startswith("size") else int(value)
+    stats["commits"] = int(git(git_root, "rev-list", "--count", "HEAD").stdout.strip() or 0)
+    stats["total_bytes"] = stats.get("size", 0) + stats.get("size-pack", 0)
+    return stats
+
+def repack(git_root, stats):
+    actions = []
+    if stats.get("count", 0) >= LOOSE_OBJECT_LIMIT:
+        git(git_root, "repack", "-d", "-l", "-q")
+        git(git_root, "prune-packed", "-q")
+        actions.append("packed loose objects")
+    if stats.get("packs", 0) >= PACK_LIMIT:
+        # Geometric repacking merges the small packs only, instead of
+        # rewriting the whole object store.
+        if git(git_root, "repack", "-d", "-l", "-q", "--geometric=2").returncode != 0:
+            git(git_root, "repack", "-a", "-d", "-l", "-q")
+        actions.append("merged packs")
+    if actions:
+        git(git_root, "commit-graph", "write", "--reachable", "--split")
+    return actions
+
+def squash_history(git_root, retention_days):
+    # Replaces every commit older than the retention window with a single
+    # root commit holding the tree of the newest of them, replays the newer
+    # commits on top unchanged, and drops the old objects. Returns the number
+    # of commits squashed.
+    cutoff = int(time.time()) - retention_days * 86400
+    boundary = git(git_root, "rev-list", "-1", "--first-parent", f"--before={cutoff}", "HEAD").stdout.strip()
+    if not boundary:
+        return 0
+    squashed = int(git(git_root, "rev-list", "--count", "--first-parent", boundary).stdout.strip() or 0)
+    if squashed < SQUASH_MIN_COMMITS:
+        return 0
+    branch = git(git_root, "symbolic-ref", "-q", "HEAD").stdout.strip()
+    head = git(git_root, "rev-parse", "HEAD").stdout.strip()
+    if not branch:
+        return 0
+
+    fields = git(git_root, "log", "-1", "--format=" + "%x00".join(LOG_FIELDS[:7]), boundary).stdout.rstrip("\n").split("\0")
+    message = f"Baseline: {squashed} commits up to {fields[6]} squashed"
+    parent = commit_tree(git_root, fields, message, None)
+    replay = git(git_root, "log", "--reverse", "--first-parent", "-z", "--format=" + "%x00".join(LOG_FIELDS),
+                 f"{boundary}..HEAD").stdout
+    replay = replay.split("\0") if replay else []
+    for start in range(0, len(replay) - len(LOG_FIELDS) + 1, len(LOG_FIELDS)):
+        commit_fields = replay[start:start + len(LOG_FIELDS)]
+        parent = commit_tree(git_root, commit_fields, commit_fields[7], parent)
+    # Guarded by the old value, so a commit made meanwhile is never lost.
+    if git(git_root, "update-ref", "-m", "integrity maintenance: squash history", branch, parent, head).returncode != 0:
+        return 0
+    git(git_root, "reflog", "expire", "--expire=now", "--all")
+    git(git_root, "prune", "--expire=now")
+    git(git_root, "repack", "-a", "-d", "-l", "-q")
+    git(git_root, "commit-graph", "write", "--reachable")
+    return squashed
+
+def commit_tree(git_root, fields, message, parent):
+    tree, author, author_email, author_date, committer, committer_email, committer_date = fields[:7]
+    env = {
+        "GIT_AUTHOR_NAME": author, "GIT_AUTHOR_EMAIL": author_email, "GIT_AUTHOR_DATE": author_date,
+        "GIT_COMMITTER_NAME": committer, "GIT_COMMITTER_EMAIL": committer_email, "GIT_COMMITTER_DATE": committer_date,
+    }
+    args = ["commit-tree", tree] + (["-p", parent] if parent else [])
+    result = git(git_root, *args, stdin_text=message, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout.strip()
+
+def run_maintenance(git_root, retention_days=DEFAULT_RETENTION_DAYS):
+    # Returns a report dict with the actions taken, the repository before and
+    # after, and the wall time spent.
+    started = time.monotonic()
+    tune_repository(git_root)
+    before = repository_stats(git_root)
+    actions = []
+    squashed = squash_history(git_root, retention_days) if retention_days else 0
+    if squashed:
+        actions.append(f"squashed {squashed} commits older than {retention_days} days")
+    actions += repack(git_root, before if not squashed else repository_stats(git_root))
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "actions": actions,
+        "before": before,
+        "after": repository_stats(git_root) if actions else before,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+
+def format_stats(stats):
+    return (f"{stats['total_bytes'] / 1024 ** 2:.1f} MB, {stats['commits']} commits, "
+            f"{stats.get('count', 0)} loose objects, {stats.get('packs', 0)} packs")
+
+def format_report(report):
+    return (f"Git maintenance: {', '.join(report['actions']) or 'nothing to do'}; "
+            f"repository {format_stats(report['before'])} -> {format_stats(report['after'])}; "
+            f"took {report['elapsed_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    from integrity_watcher import GIT_ROOT
+    parser = argparse.ArgumentParser(description="Maintain the integrity git repository")
+    parser.add_argument("--git-root", default=GIT_ROOT, help="Repository to maintain")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="Squash history older than this many days (0: keep all history)")
+    parser.add_argument("--report", action="store_true", help="Only print the repository size")
+    args = parser.parse_args()
+
+    if not is_repository(args.git_root):
+        print(f"Not a git repository: {args.git_root}")
+        exit(1)
+    if args.report:
+        print(format_stats(repository_stats(args.git_root)))
+    else:
+        print(format_report(run_maintenance(args.git_root, args.retention_days)))
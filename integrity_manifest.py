@@ -0,0 +1,462 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import stat
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from localization import _
+
+MONITOR_DIRS = [
+    "/home/unitx/cortex",
+    "/home/unitx/prod",
+    "/home/unitx/optix",
+    "/home/unitx/unitx_data",
+]
+# Subdirectories of a monitored root that are never tracked (bulk production
+# data), directory names skipped everywhere, and files matching "*.log*".
+IGNORED_SUBDIRS = {
+    "/home/unitx/unitx_data": {"production", "data", "temp", "cache", "images_train", "experiments", "fake_images"},
+}
+IGNORED_DIR_NAMES = {".git"}
+IGNORED_FILE_PATTERN = re.compile(r"\.log")
+
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "logs", "integrity_manifest.bin")
+# Changes since the sorted file was written are appended to a delta file next
+# to it; the sorted file is only rewritten once the delta holds this many
+# paths or is older than DELTA_MERGE_INTERVAL seconds.
+DELTA_MERGE_ENTRIES = 50000
+DELTA_MERGE_INTERVAL = 3600
+DIGEST_SIZE = 16
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+# Files queued to the hashing pool at once, per worker.
+HASH_QUEUE_PER_WORKER = 4
+
+ADDED = "added"
+DELETED = "deleted"
+MODIFIED = "modified"
+# Stat tuple changed but the content hashes the same (touch, copy-back, chown).
+TOUCHED = "touched"
+
+def default_hash_workers():
+    # Hashing releases the GIL for large buffers; beyond a few threads an
+    # HDD only seeks more.
+    return min(8, os.cpu_count() or 1)
+
+
+class RateLimiter:
+    # Shared byte budget for all hashing threads: each read reserves its size
+    # and sleeps until the budget allows it.
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = bytes_per_second
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, size):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + size / self.bytes_per_second
+        if start > now:
+            time.sleep(start - now)
+
+
+_buffers = threading.local()
+
+def hash_file(path, limiter=None):
+    # One read buffer per thread: allocating it per file would dominate the
+    # cost of hashing small files.
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _buffers.buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            if limiter:
+                limiter.acquire(read)
+            digest.update(view[:read])
+    return digest.digest()
+
+def hash_files(files, workers=None, limiter=None):
+    # files: [(path, stat)]. Yields (path, stat, digest or None). Files are read
+    # in inode order, which roughly follows their on-disk placement, and only a
+    # bounded window is queued so memory stays flat on millions of files.
+    files = sorted(files, key=lambda item: item[1].st_ino)
+    workers = workers or default_hash_workers()
+
+    def hash_job(path):
+        try:
+            return hash_file(path, limiter)
+        except OSError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path, st in files:
+            pending.append((path, st, executor.submit(hash_job, path)))
+            if len(pending) >= workers * HASH_QUEUE_PER_WORKER:
+                path, st, future = pending.popleft()
+                yield path, st, future.result()
+        while pending:
+            path, st, future = pending.popleft()
+            yield path, st, future.result()
+
+def stat_key(st):
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+def ignored_dirs():
+    return {os.path.join(os.path.realpath(root), name)
+            for root, names in IGNORED_SUBDIRS.items() for name in names}
+
+
+class MappedManifest:
+    # Read-only view of a manifest file: a header, fixed-width records sorted
+    # by path, then the path bytes they point into. The file is mmap()ed and
+    # searched in place, so opening it parses nothing and a lookup touches
+    # O(log n) pages.
+    MAGIC = b"IMAN1\0\0\0"
+    HEADER = struct.Struct("<8sQQ")
+    # path offset, path length, reserved, size, mtime_ns, inode, digest
+    RECORD = struct.Struct(f"<QIIQqQ{DIGEST_SIZE}s")
+    PATH_REF = struct.Struct("<QI")
+
+    def __init__(self, manifest_file):
+        with open(manifest_file, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.paths_offset = self.HEADER.unpack_from(self.map, 0)
+        if magic != self.MAGIC:
+            self.map.close()
+            raise ValueError(manifest_file)
+
+    def __len__(self):
+        return self.count
+
+    def path_at(self, position):
+        offset, length = self.PATH_REF.unpack_from(self.map, self.HEADER.size + position * self.RECORD.size)
+        start = self.paths_offset + offset
+        return self.map[start:start + length]
+
+    def entry_at(self, position):
+        _offset, _length, _reserved, size, mtime_ns, inode, digest = self.RECORD.unpack_from(
+            self.map, self.HEADER.size + position * self.RECORD.size)
+        return size, mtime_ns, inode, digest
+
+    def lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.path_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, path):
+        key = os.fsencode(path)
+        position = self.lower_bound(key)
+        if position < self.count and self.path_at(position) == key:
+            return self.entry_at(position)
+        return None
+
+    def paths_with_prefix(self, prefix):
+        key = os.fsencode(prefix)
+        position = self.lower_bound(key)
+        while position < self.count:
+            path = self.path_at(position)
+            if not path.startswith(key):
+                break
+            yield os.fsdecode(path)
+            position += 1
+
+    def items(self):
+        for position in range(self.count):
+            yield os.fsdecode(self.path_at(position)), self.entry_at(position)
+
+    def close(self):
+        self.map.close()
+
+    @classmethod
+    def write(cls, manifest_file, items):
+        # items: (path, (size, mtime_ns, inode, digest)) in any order.
+        items = sorted((os.fsencode(path), entry) for path, entry in items)
+        records = bytearray(cls.RECORD.size * len(items))
+        paths = bytearray()
+        for position, (path, (size, mtime_ns, inode, digest)) in enumerate(items):
+            cls.RECORD.pack_into(records, position * cls.RECORD.size, len(paths), len(path), 0,
+                                 size, mtime_ns, inode, digest)
+            paths += path
+        temp_file = f"{manifest_file}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(items), cls.HEADER.size + len(records)))
+            f.write(records)
+            f.write(paths)
+        os.replace(temp_file, manifest_file)
+
+
+class ManifestDelta:
+    # Append-only log of the changes made on top of a MappedManifest: a fixed
+    # record per change followed by its path bytes. A record cut short by a
+    # crash is ignored when the log is read back.
+    # path length, deleted, size, mtime_ns, inode, digest
+    RECORD = struct.Struct(f"<IBQqQ{DIGEST_SIZE}s")
+    EMPTY_DIGEST = bytes(DIGEST_SIZE)
+
+    @staticmethod
+    def file_for(manifest_file):
+        return f"{manifest_file}.delta"
+
+    @classmethod
+    def append(cls, delta_file, items):
+        data = bytearray()
+        for path, entry in items:
+            path = os.fsencode(path)
+            if entry is None:
+                data += cls.RECORD.pack(len(path), 1, 0, 0, 0, cls.EMPTY_DIGEST)
+            else:
+                data += cls.RECORD.pack(len(path), 0, *entry)
+            data += path
+        with open(delta_file, "ab") as f:
+            f.write(data)
+
+    @classmethod
+    def read(cls, delta_file):
+        try:
+            with open(delta_file, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        position = 0
+        while position + cls.RECORD.size <= len(data):
+            length, deleted, size, mtime_ns, inode, digest = cls.RECORD.unpack_from(data, position)
+            position += cls.RECORD.size
+            if position + length > len(data):
+                break
+            path = os.fsdecode(data[position:position + length])
+            position += length
+            yield path, None if deleted else (size, mtime_ns, inode, digest)
+
+
+class Manifest:
+    # path -> (size, mtime_ns, inode, digest). A file is only read again when
+    # its (size, mtime_ns, inode) differs from the recorded one, so checking a
+    # quiet tree costs one lstat per file. The baseline stays in the mapped
+    # file; changes since it was written are kept in a small dict on top
+    # (None marks a deletion). flush() appends them to the delta file and only
+    # merges everything into a new sorted file now and then; save() always
+    # merges.
+    def __init__(self, roots=MONITOR_DIRS):
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.ignored = ignored_dirs()
+        self.baseline = None
+        self.changes = {}
+        # Changes not yet appended to the delta file, and when the delta was
+        # started (monotonic).
+        self.unflushed = {}
+        self.delta_started = None
+
+    def __len__(self):
+        count = len(self.baseline) if self.baseline else 0
+        for path, entry in self.changes.items():
+            recorded = self.baseline is not None and self.baseline.get(path) is not None
+            count += (entry is not None) - recorded
+        return count
+
+    def get(self, path):
+        if path in self.changes:
+            return self.changes[path]
+        return self.baseline.get(path) if self.baseline else None
+
+    def items(self):
+        if self.baseline:
+            for path, entry in self.baseline.items():
+                if path not in self.changes:
+                    yield path, entry
+        for path, entry in self.changes.items():
+            if entry is not None:
+                yield path, entry
+
+    def is_ignored_dir(self, path, name):
+        return name in IGNORED_DIR_NAMES or path in self.ignored
+
+    def walk(self, top, recursive=True):
+        # Yields (path, stat) for the tracked regular files below top, or
+        # only those directly in it.
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive and not self.is_ignored_dir(entry.path, entry.name):
+                                    stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False) and not IGNORED_FILE_PATTERN.search(entry.name):
+                                yield entry.path, entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def current_files(self, scope, recursive=True):
+        try:
+            st = os.lstat(scope)
+        except OSError:
+            return {}
+        if stat.S_ISDIR(st.st_mode):
+            return dict(self.walk(scope, recursive))
+        if stat.S_ISREG(st.st_mode) and not IGNORED_FILE_PATTERN.search(os.path.basename(scope)):
+            return {scope: st}
+        return {}
+
+    def recorded_under(self, scope):
+        if self.get(scope) is not None:
+            return [scope]
+        prefix = scope.rstrip(os.sep) + os.sep
+        paths = set(self.baseline.paths_with_prefix(prefix)) if self.baseline else set()
+        paths.update(path for path in self.changes if path.startswith(prefix))
+        return [path for path in paths if self.get(path) is not None]
+
+    def record(self, path, entry):
+        self.changes[path] = entry
+        self.unflushed[path] = entry
+
+    def check(self, scopes=None, update=True, deep=False, workers=None, limiter=None, entries=False):
+        # Compares the files below each scope (default: every root) with the
+        # manifest and returns [(change, path)], or with entries
+        # [(change, path, old entry, new entry)] where an entry is
+        # (size, mtime_ns, inode, digest) or None. With update the manifest is
+        # brought up to date as it goes. deep re-hashes files whose stat tuple
+        # is unchanged too, to catch silent corruption.
+        changes = []
+        to_hash = []
+        for scope in scopes or self.roots:
+            current = self.current_files(scope)
+            for path in self.recorded_under(scope):
+                if path not in current:
+                    changes.append((DELETED, path, tuple(self.get(path)), None))
+                    if update:
+                        self.record(path, None)
+            for path, st in current.items():
+                recorded = self.get(path)
+                if deep or recorded is None or tuple(recorded[:3]) != stat_key(st):
+                    to_hash.append((path, st))
+
+        for path, st, digest in hash_files(to_hash, workers, limiter):
+            if digest is None:
+                continue
+            recorded = self.get(path)
+            key = stat_key(st)
+            entry = key + (digest,)
+            if recorded is None:
+                changes.append((ADDED, path, None, entry))
+            elif recorded[3] != digest:
+                changes.append((MODIFIED, path, tuple(recorded), entry))
+            elif tuple(recorded[:3]) != key:
+                changes.append((TOUCHED, path, tuple(recorded), entry))
+            else:
+                continue
+            if update:
+                self.record(path, entry)
+        changes.sort(key=lambda change: change[1])
+        return changes if entries else [change[:2] for change in changes]
+
+    def save(self, manifest_file=MANIFEST_FILE):
+        os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+        MappedManifest.write(manifest_file, self.items())
+        if self.baseline:
+            self.baseline.close()
+        self.baseline = MappedManifest(manifest_file)
+        self.changes = {}
+        self.unflushed = {}
+        self.delta_started = None
+        try:
+            os.remove(ManifestDelta.file_for(manifest_file))
+        except FileNotFoundError:
+            pass
+
+    def merge_due(self):
+        if self.baseline is None or len(self.changes) >= DELTA_MERGE_ENTRIES:
+            return True
+        return self.delta_started is not None and time.monotonic() - self.delta_started >= DELTA_MERGE_INTERVAL
+
+    def flush(self, manifest_file=MANIFEST_FILE):
+        # Persists the changes since the last flush by appending them to the
+        # delta file, so a batch costs its own size rather than a rewrite of
+        # the whole manifest.
+        if self.merge_due():
+            self.save(manifest_file)
+            return
+        if not self.unflushed:
+            return
+        ManifestDelta.append(ManifestDelta.file_for(manifest_file), self.unflushed.items())
+        self.unflushed = {}
+        if self.delta_started is None:
+            self.delta_started = time.monotonic()
+
+    @classmethod
+    def load(cls, manifest_file=MANIFEST_FILE, roots=MONITOR_DIRS):
+        manifest = cls(roots)
+        try:
+            manifest.baseline = MappedManifest(manifest_file)
+        except (OSError, ValueError, struct.error):
+            pass
+        manifest.changes.update(ManifestDelta.read(ManifestDelta.file_for(manifest_file)))
+        if manifest.changes:
+            manifest.delta_started = time.monotonic()
+        return manifest
+
+def format_changes(changes):
+    return "\n".join(f"{change}: {path}" for change, path in changes)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash manifest of the monitored directories")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="Manifest file")
+    parser.add_argument("--workers", type=int, default=default_hash_workers(), help="Hashing threads")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Maximum read rate in MB/s, so hashing does not starve the inspection software (0: unlimited)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("baseline", help="Hash every tracked file and store a new manifest")
+    verify_parser = subparsers.add_parser("verify", help="Report files changed since the manifest")
+    verify_parser.add_argument("--update", action="store_true", help="Accept the changes into the manifest")
+    verify_parser.add_argument("--deep", action="store_true", help="Re-hash every file, not only those whose stat changed")
+    verify_parser.add_argument("--json", action="store_true", help="Print the changes as JSON")
+    verify_parser.add_argument("paths", nargs="*", help="Only check these files or directories")
+    args = parser.parse_args()
+
+    limiter = None
+    if args.rate_limit > 0:
+        limiter = RateLimiter(args.rate_limit * 1024 * 1024)
+        # A throttled run is background work: yield the CPU as well.
+        os.nice(10)
+
+    started = time.monotonic()
+    if args.command == "baseline":
+        manifest = Manifest()
+        manifest.check(workers=args.workers, limiter=limiter)
+        manifest.save(args.manifest)
+        print(_("Manifest of {count} files written to {path} in {seconds:.1f}s").format(
+            count=len(manifest), path=args.manifest, seconds=time.monotonic() - started))
+    else:
+        manifest = Manifest.load(args.manifest)
+        if not manifest.baseline:
+            print(_("No manifest found, create one with 'baseline' first."))
+            exit(1)
+        changes = manifest.check([os.path.realpath(path) for path in args.paths] or None, update=args.update,
+                                 deep=args.deep, workers=args.workers, limiter=limiter)
+        if args.update:
+            manifest.save(args.manifest)
+        if args.json:
+            print(json.dumps([{"change": change, "path": path} for change, path in changes], indent=2))
+        else:
+            print(format_changes(changes) or _("No changes."))
+        exit(1 if any(change != TOUCHED for change, _path in changes) else 0)
@@ -0,0 +1,774 @@
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import re
+import select
+import struct
+import subprocess
+import time
+from datetime import datetime
+from integrity_manifest import (Manifest, MONITOR_DIRS, IGNORED_DIR_NAMES, IGNORED_FILE_PATTERN,
+                                ignored_dirs, format_changes, stat_key, ADDED, DELETED, MODIFIED)
+from integrity_maintenance import (run_maintenance, format_report, is_repository,
+                                   MAINTENANCE_INTERVAL, DEFAULT_RETENTION_DAYS)
+from integrity_events import (connect, change_record, append_events, enforce_retention,
+                              STORE_GIT, STORE_HASH, STORE_VERSION, VERSION_CHANGED)
+
+GIT_ROOT = "/home/unitx"
+VERSION_FILES = [
+    "/home/unitx/cortex/cortex_src/version.txt",
+    "/home/unitx/prod/production_src/version.txt",
+    "/home/unitx/optix/optix_src/version.txt",
+]
+LOG_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "logs", "file_change.log")
+# Binary and large files are kept out of git: they are listed in
+# .git/info/exclude and tracked by size, mtime and digest in this manifest.
+BINARY_MANIFEST_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "logs", "integrity_binaries.bin")
+EXCLUDE_MARKER = "# Hash-only files, maintained by integrity_watcher.py"
+MAX_TEXT_FILE_SIZE = 2 * 1024 * 1024
+BINARY_SNIFF_SIZE = 8192
+BINARY_EXTENSIONS = {
+    ".pt", ".pth", ".onnx", ".engine", ".trt", ".ckpt", ".safetensors", ".h5", ".npy", ".npz", ".pkl",
+    ".bin", ".so", ".db", ".sqlite", ".sqlite3", ".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff",
+    ".zip", ".gz", ".tar",
+}
+GIT_STATUS_CHANGES = {"A": ADDED, "D": DELETED, "M": MODIFIED, "T": MODIFIED}
+NULL_OBJECT_ID = "0" * 40
+
+# A batch is processed once events stop for DEBOUNCE_SECONDS, and at the latest
+# MAX_BATCH_DELAY after its first event.
+DEBOUNCE_SECONDS = 0.25
+MAX_BATCH_DELAY = 0.8
+GIT_PATHSPEC_CHUNK = 500
+# The first git maintenance runs this long after start-up, once the catch-up
+# commit is done.
+MAINTENANCE_DELAY = 600
+
+# inotify watches are per user and shared with every other program, so only
+# this share of fs.inotify.max_user_watches is used. Subtrees beyond it are
+# polled: every directory's entries are stat()ed and compared with the
+# previous pass, more often while a subtree keeps changing.
+MAX_USER_WATCHES_FILE = "/proc/sys/fs/inotify/max_user_watches"
+WATCH_BUDGET_SHARE = 0.5
+POLL_MIN_INTERVAL = 30
+POLL_MAX_INTERVAL = 900
+POLL_START_INTERVAL = 120
+# A subtree is never polled more often than this many times its last pass
+# took, which keeps polling to a few percent of the time.
+POLL_COST_FACTOR = 20
+WATCH_STATUS_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "logs", "integrity_watch_status.json")
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+EVENT_HEADER = struct.Struct("iIII")
+EVENT_NAMES = [(IN_CREATE, "created"), (IN_DELETE, "deleted"), (IN_MOVED_FROM, "moved out"),
+               (IN_MOVED_TO, "moved in"), (IN_CLOSE_WRITE, "written"), (IN_MODIFY, "modified"),
+               (IN_ATTRIB, "attributes changed")]
+
+def log(message):
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    with open(LOG_FILE, "a") as f:
+        f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n")
+
+def has_binary_extension(path):
+    return os.path.splitext(path)[1].lower() in BINARY_EXTENSIONS
+
+def is_hash_only(path, st):
+    if st.st_size > MAX_TEXT_FILE_SIZE or has_binary_extension(path):
+        return True
+    # Same test git uses: a NUL byte near the start means binary.
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(BINARY_SNIFF_SIZE)
+    except OSError:
+        return False
+
+def exclude_pattern(relative_path):
+    return "/" + re.sub(r"([*?\[\\])", r"\\\1", relative_path)
+
+def extension_pattern(extension):
+    # "*.png" in any letter case, as has_binary_extension() compares it.
+    return "*" + "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else c for c in extension)
+
+def size_delta(old_size, new_size):
+    return (new_size or 0) - (old_size or 0)
+
+def hash_records(changes):
+    # changes carry manifest entries: (size, mtime_ns, inode, digest).
+    return [change_record(change, path, old and old[3].hex(), new and new[3].hex(), STORE_HASH,
+                          size=new and new[0], size_delta=size_delta(old and old[0], new and new[0]))
+            for change, path, old, new in changes]
+
+def read_max_user_watches():
+    try:
+        with open(MAX_USER_WATCHES_FILE, "r") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 8192
+
+def default_watch_budget():
+    return int(read_max_user_watches() * WATCH_BUDGET_SHARE)
+
+def event_name(mask):
+    for flag, name in EVENT_NAMES:
+        if mask & flag:
+            return name
+    return hex(mask)
+
+
+class Inotify:
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.paths = {}
+        self.watches = {}
+        self.limit_reached = False
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return None
+            if error == errno.ENOSPC:
+                if not self.limit_reached:
+                    log(f"inotify watch limit reached at {path}, polling the remaining directories")
+                self.limit_reached = True
+                return None
+            raise OSError(error, os.strerror(error), path)
+        self.paths[wd] = path
+        self.watches[path] = wd
+        return wd
+
+    def forget(self, wd):
+        path = self.paths.pop(wd, None)
+        if path is not None and self.watches.get(path) == wd:
+            del self.watches[path]
+
+    def read_events(self):
+        # Yields (watched directory, mask, cookie, name) for everything queued.
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                yield self.paths.get(wd), wd, mask, cookie, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class StatPoller:
+    # Keeps one signature per directory: a hash of its entries' names, sizes
+    # and mtimes. Only that int is stored, so large dataset trees cost little
+    # memory; a changed signature reports the directory, and the git or
+    # manifest backend works out which files in it changed.
+    def __init__(self, is_ignored_dir):
+        self.is_ignored_dir = is_ignored_dir
+        self.trees = {}
+
+    def add(self, root):
+        if any(root == polled or root.startswith(polled + os.sep) for polled in self.trees):
+            return
+        for polled in [polled for polled in self.trees if polled.startswith(root + os.sep)]:
+            del self.trees[polled]
+        started = time.monotonic()
+        signatures = self.scan(root)
+        elapsed = time.monotonic() - started
+        self.trees[root] = {
+            "signatures": signatures,
+            "interval": max(POLL_START_INTERVAL, elapsed * POLL_COST_FACTOR),
+            "next_poll": time.monotonic() + POLL_START_INTERVAL,
+            "last_seconds": elapsed,
+            "polls": 0,
+            "changes": 0,
+        }
+
+    def scan(self, root):
+        signatures = {}
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            entries = []
+            try:
+                with os.scandir(directory) as scan:
+                    for entry in scan:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.is_ignored_dir(entry.path, entry.name):
+                                stack.append(entry.path)
+                            entries.append((entry.name, -1, 0))
+                        elif not IGNORED_FILE_PATTERN.search(entry.name):
+                            st = entry.stat(follow_symlinks=False)
+                            entries.append((entry.name, st.st_size, st.st_mtime_ns))
+            except OSError:
+                continue
+            signatures[directory] = hash(frozenset(entries))
+        return signatures
+
+    def next_due(self):
+        return min((tree["next_poll"] for tree in self.trees.values()), default=None)
+
+    def poll_due(self):
+        changed = []
+        now = time.monotonic()
+        for root, tree in list(self.trees.items()):
+            if tree["next_poll"] > now:
+                continue
+            started = time.monotonic()
+            signatures = self.scan(root)
+            elapsed = time.monotonic() - started
+            previous = tree["signatures"]
+            tree_changed = [directory for directory, signature in signatures.items() if previous.get(directory) != signature]
+            tree_changed += [directory for directory in previous if directory not in signatures]
+            changed += tree_changed
+            tree["signatures"] = signatures
+            tree["last_seconds"] = elapsed
+            tree["polls"] += 1
+            if tree_changed:
+                tree["changes"] += 1
+                interval = tree["interval"] / 2
+            else:
+                interval = tree["interval"] * 1.5
+            tree["interval"] = min(POLL_MAX_INTERVAL, max(POLL_MIN_INTERVAL, elapsed * POLL_COST_FACTOR, interval))
+            tree["next_poll"] = time.monotonic() + tree["interval"]
+            if not signatures:
+                del self.trees[root]
+        return changed
+
+    def directory_count(self):
+        return sum(len(tree["signatures"]) for tree in self.trees.values())
+
+    def status(self):
+        return [{"path": root, "directories": len(tree["signatures"]), "interval_seconds": round(tree["interval"]),
+                 "last_poll_seconds": round(tree["last_seconds"], 3), "polls": tree["polls"],
+                 "polls_with_changes": tree["changes"]}
+                for root, tree in sorted(self.trees.items())]
+
+
+class IntegrityWatcher:
+    def __init__(self, roots=MONITOR_DIRS, version_files=VERSION_FILES, backend="git",
+                 retention_days=DEFAULT_RETENTION_DAYS, watch_budget=None):
+        # unitx_data is a symlink to the station's data directory; the real
+        # path is what inotify reports and git tracks. Subtrees .gitignore
+        # excludes are not watched at all, so bulk data costs no watches.
+        self.roots = [os.path.realpath(root) for root in roots]
+        self.ignored = ignored_dirs()
+        # "manifest" records changes in the hash manifest instead of git.
+        self.manifest = Manifest.load(roots=roots) if backend == "manifest" else None
+        self.binaries = Manifest.load(BINARY_MANIFEST_FILE, roots) if backend == "git" else None
+        self.exclude_file = os.path.join(GIT_ROOT, ".git", "info", "exclude")
+        self.hash_only = self.read_hash_only() if backend == "git" else set()
+        # path -> (size, mtime_ns, inode) of files sniffed as text, so an
+        # unchanged file is not read again on every batch that names it.
+        self.text_files = {}
+        self.journal = connect()
+        enforce_retention(self.journal)
+        self.version_files = [os.path.realpath(path) for path in version_files]
+        self.previous_versions = self.read_versions()
+        self.inotify = Inotify()
+        self.watch_budget = watch_budget or default_watch_budget()
+        self.poller = StatPoller(self.is_ignored_dir)
+        self.changed = {}
+        self.events = []
+        self.rescan_needed = False
+        self.batch_started = None
+        self.last_event = None
+        # Wall time spent in git during the current batch.
+        self.git_seconds = 0
+        self.retention_days = retention_days
+        self.next_maintenance = time.monotonic() + MAINTENANCE_DELAY
+
+    def is_ignored_dir(self, path, name):
+        return name in IGNORED_DIR_NAMES or path in self.ignored
+
+    def watch_tree(self, top):
+        # Returns the files found, so a directory created or moved in before its
+        # watch existed still has its contents processed. Directories beyond
+        # the watch budget are handed to the poller with their subtrees.
+        files = []
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            if directory not in self.inotify.watches and len(self.inotify.watches) >= self.watch_budget:
+                self.poller.add(directory)
+                continue
+            if self.inotify.add_watch(directory) is None:
+                if self.inotify.limit_reached:
+                    self.poller.add(directory)
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.is_ignored_dir(entry.path, entry.name):
+                                stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def count_tree(self, top):
+        # Directories in every subtree, from getdents alone.
+        children = {}
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            children[directory] = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and not self.is_ignored_dir(entry.path, entry.name):
+                            children[directory].append(entry.path)
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        counts = {}
+        for directory in sorted(children, key=lambda path: path.count(os.sep), reverse=True):
+            counts[directory] = 1 + sum(counts[child] for child in children[directory])
+        return counts, children
+
+    def plan_tree(self, directory, counts, children):
+        # A subtree that fits the remaining budget is watched whole. One that
+        # does not gets a watch on the directory itself and is split, smallest
+        # subtrees first: config and code directories are small, dataset
+        # directories large, so those are what end up polled.
+        remaining = self.watch_budget - len(self.inotify.watches)
+        if counts[directory] <= remaining:
+            self.watch_tree(directory)
+        elif remaining < 1 or self.inotify.add_watch(directory) is None:
+            self.poller.add(directory)
+        else:
+            for child in sorted(children[directory], key=counts.get):
+                self.plan_tree(child, counts, children)
+
+    def watch_all(self):
+        # Roots are planned in order, so the code and config trees listed
+        # first in MONITOR_DIRS get their watches before unitx_data.
+        for root in self.roots:
+            if not os.path.isdir(root):
+                continue
+            counts, children = self.count_tree(root)
+            self.plan_tree(root, counts, children)
+        log(f"Watching {len(self.inotify.watches)} directories (budget {self.watch_budget}), "
+            f"polling {self.poller.directory_count()} directories in {len(self.poller.trees)} subtrees "
+            f"under {', '.join(self.roots)}")
+        self.write_status()
+
+    def write_status(self):
+        watched = len(self.inotify.watches)
+        polled = self.poller.directory_count()
+        status = {
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "max_user_watches": read_max_user_watches(),
+            "watch_budget": self.watch_budget,
+            "watched_directories": watched,
+            "polled_directories": polled,
+            "inotify_coverage": round(watched / (watched + polled), 4) if watched + polled else 1.0,
+            "watch_limit_reached": self.inotify.limit_reached,
+            "polled_trees": self.poller.status(),
+        }
+        os.makedirs(os.path.dirname(WATCH_STATUS_FILE), exist_ok=True)
+        with open(f"{WATCH_STATUS_FILE}.tmp", "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(f"{WATCH_STATUS_FILE}.tmp", WATCH_STATUS_FILE)
+
+    def handle_event(self, directory, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # The kernel dropped events: only a full pass can be trusted now.
+            self.rescan_needed = True
+            return
+        if mask & IN_IGNORED:
+            self.inotify.forget(wd)
+            return
+        if directory is None or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            return
+        path = os.path.join(directory, name) if name else directory
+        if mask & IN_ISDIR:
+            if self.is_ignored_dir(path, name):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                for file_path in self.watch_tree(path):
+                    self.changed[file_path] = mask
+        elif IGNORED_FILE_PATTERN.search(name):
+            return
+        self.changed[path] = mask
+        # Keep the exact order of quick successive edits for the change log.
+        if not self.events or self.events[-1][1:] != (mask, path):
+            self.events.append((datetime.now().strftime('%H:%M:%S.%f')[:-3], mask, path))
+
+    def run(self):
+        log("Integrity watcher started")
+        if self.binaries is not None:
+            self.prepare_exclude()
+        self.watch_all()
+        # Catch up on whatever changed while the watcher was not running.
+        self.record_changes(self.roots, [])
+        self.check_version_changes()
+        poller = select.poll()
+        poller.register(self.inotify.fd, select.POLLIN)
+        while True:
+            now = time.monotonic()
+            if self.batch_started is not None:
+                deadline = min(self.last_event + DEBOUNCE_SECONDS, self.batch_started + MAX_BATCH_DELAY)
+            else:
+                deadline = min(self.next_maintenance, self.poller.next_due() or self.next_maintenance)
+            if poller.poll(max(0, deadline - now) * 1000):
+                for directory, wd, mask, _cookie, name in self.inotify.read_events():
+                    self.handle_event(directory, wd, mask, name)
+                if self.changed or self.rescan_needed:
+                    self.last_event = time.monotonic()
+                    if self.batch_started is None:
+                        self.batch_started = self.last_event
+                continue
+            if self.batch_started is not None:
+                self.process_batch()
+            elif time.monotonic() >= (self.poller.next_due() or float("inf")):
+                self.poll_trees()
+            elif time.monotonic() >= self.next_maintenance:
+                self.maintain()
+
+    def poll_trees(self):
+        changed = self.poller.poll_due()
+        for path in changed:
+            self.changed.setdefault(path, 0)
+        if changed:
+            self.last_event = self.batch_started = time.monotonic()
+        self.write_status()
+
+    def maintain(self):
+        self.next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL
+        if not is_repository(GIT_ROOT):
+            return
+        try:
+            log(format_report(run_maintenance(GIT_ROOT, self.retention_days)))
+        except (OSError, RuntimeError) as e:
+            log(f"Git maintenance failed: {e}")
+
+    def process_batch(self):
+        # The poller reports each changed directory itself (mask 0), so those
+        # only need their own entries looked at.
+        polled = {path for path, mask in self.changed.items() if not mask}
+        changed, self.changed = list(self.changed), {}
+        events, self.events = self.events, []
+        self.batch_started = self.last_event = None
+        rescan, self.rescan_needed = self.rescan_needed, False
+        if rescan:
+            log("inotify event queue overflowed, rescanning all monitored directories")
+            # Existing watches are kept; directories created meanwhile are
+            # watched while the budget lasts and polled after that.
+            for root in self.roots:
+                if os.path.isdir(root):
+                    self.watch_tree(root)
+            self.write_status()
+            changed = self.roots
+            polled = set()
+        self.git_seconds = 0
+        self.record_changes(changed, events, polled)
+        if rescan or any(path in self.version_files for path in changed):
+            self.check_version_changes()
+        if self.git_seconds:
+            log(f"Batch of {len(changed)} paths recorded, git wall time {self.git_seconds:.2f}s")
+
+    def record_changes(self, paths, events, polled=()):
+        if self.manifest is None:
+            self.commit_changes(paths, events, polled)
+            return
+        baseline = not len(self.manifest)
+        changes = self.manifest.check(paths, entries=True)
+        if not changes:
+            return
+        self.manifest.flush()
+        if baseline:
+            log(f"Manifest baseline of {len(self.manifest)} files created")
+            return
+        append_events(self.journal, hash_records(changes))
+        lines = [f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Manifest updated", "Changed files:",
+                 format_changes(change[:2] for change in changes)]
+        self.write_change_log(lines, events)
+
+    def write_change_log(self, lines, events):
+        if events:
+            lines.append("Event order:")
+            lines.extend(f"{stamp} {event_name(mask)} {path}" for stamp, mask, path in events)
+        lines.append("-" * 60)
+        with open(LOG_FILE, "a") as f:
+            f.write("\n".join(lines) + "\n")
+        try:
+            subprocess.run(["notify-send", "-t", "10000", "File changes", "View the changes in the File Integrity Monitor"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            pass
+
+    def git(self, *args, stdin_text=None, literal=True):
+        # check-ignore takes paths, not pathspecs, and refuses literal mode.
+        started = time.monotonic()
+        env = dict(os.environ, GIT_LITERAL_PATHSPECS="1") if literal else None
+        result = subprocess.run(["git", "-C", GIT_ROOT, *args], input=stdin_text, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, text=True, errors="replace", env=env)
+        self.git_seconds += time.monotonic() - started
+        return result
+
+    def read_exclude(self):
+        try:
+            with open(self.exclude_file, "r") as f:
+                return f.read().splitlines()
+        except OSError:
+            return []
+
+    def read_hash_only(self):
+        # Only the literal lines; binary extensions are covered by globs.
+        lines = self.read_exclude()
+        if EXCLUDE_MARKER not in lines:
+            return set()
+        return {re.sub(r"\\(.)", r"\1", line[1:])
+                for line in lines[lines.index(EXCLUDE_MARKER) + 1:] if line.startswith("/")}
+
+    def exclude_section(self):
+        return ([EXCLUDE_MARKER] + [extension_pattern(extension) for extension in sorted(BINARY_EXTENSIONS)]
+                + [exclude_pattern(path) for path in sorted(self.hash_only)])
+
+    def write_exclude(self):
+        # The section from EXCLUDE_MARKER to the end of the file is rewritten
+        # as a whole; lines above it are left alone.
+        lines = self.read_exclude()
+        if EXCLUDE_MARKER in lines:
+            lines = lines[:lines.index(EXCLUDE_MARKER)]
+        os.makedirs(os.path.dirname(self.exclude_file), exist_ok=True)
+        with open(f"{self.exclude_file}.tmp", "w") as f:
+            f.write("\n".join(lines + self.exclude_section()) + "\n")
+        os.replace(f"{self.exclude_file}.tmp", self.exclude_file)
+
+    def prepare_exclude(self):
+        # Run at start-up: brings the section up to date (older versions listed
+        # every binary file literally) and moves tracked files it excludes out
+        # of the index; they stay on disk.
+        self.hash_only = {path for path in self.hash_only if not has_binary_extension(path)}
+        lines = self.read_exclude()
+        if EXCLUDE_MARKER not in lines or lines[lines.index(EXCLUDE_MARKER):] != self.exclude_section():
+            self.write_exclude()
+        ignored = self.git("ls-files", "-z", "-c", "-i", "--exclude-standard").stdout.split("\0")
+        self.untrack([path for path in ignored if path and (has_binary_extension(path) or path in self.hash_only)])
+
+    def untrack(self, relative_paths):
+        for start in range(0, len(relative_paths), GIT_PATHSPEC_CHUNK):
+            chunk = relative_paths[start:start + GIT_PATHSPEC_CHUNK]
+            tracked = [path for path in self.git("ls-files", "-z", "--", *chunk).stdout.split("\0") if path]
+            if tracked:
+                self.git("rm", "--cached", "-q", "--", *tracked)
+                log(f"Moved {len(tracked)} binary or large files from git to hash-only tracking")
+
+    def exclude_hash_only(self, relative_paths):
+        # Files with a binary extension are excluded by the globs; the others
+        # (large, or with a NUL byte) get one literal line each so "git add"
+        # never stores them.
+        new_paths = sorted(set(path for path in relative_paths if not has_binary_extension(path)) - self.hash_only)
+        if not new_paths:
+            return
+        self.hash_only.update(new_paths)
+        self.write_exclude()
+        self.untrack(new_paths)
+
+    def prune_hash_only(self, missing):
+        # Drops the literal lines and cached text verdicts of files that are
+        # gone, or below a directory that is gone.
+        prefixes = tuple(os.path.relpath(path, GIT_ROOT) + "/" for path in missing)
+        gone = {path for path in self.hash_only
+                if path.startswith(prefixes) or path + "/" in prefixes}
+        if gone:
+            self.hash_only -= gone
+            self.write_exclude()
+        prefixes = tuple(path + os.sep for path in missing)
+        for path in [path for path in self.text_files if path.startswith(prefixes) or path + os.sep in prefixes]:
+            del self.text_files[path]
+
+    def is_hash_only(self, path, st):
+        if os.path.relpath(path, GIT_ROOT) in self.hash_only:
+            return True
+        if st.st_size > MAX_TEXT_FILE_SIZE or has_binary_extension(path):
+            return True
+        key = stat_key(st)
+        if self.text_files.get(path) == key:
+            return False
+        if is_hash_only(path, st):
+            self.text_files.pop(path, None)
+            return True
+        self.text_files[path] = key
+        return False
+
+    def record_hash_only(self, paths, polled=()):
+        # Splits binary and large files off the changed paths and records them
+        # in the binary manifest; returns their changes. Directories in polled
+        # are listed without their subdirectories, which the poller reports
+        # on their own.
+        files = {}
+        missing = []
+        for path in paths:
+            if path in polled:
+                current = self.binaries.current_files(path, recursive=False)
+                missing += [recorded for recorded in self.binaries.recorded_under(path)
+                            if os.path.dirname(recorded) == path and recorded not in current]
+            else:
+                current = self.binaries.current_files(path)
+            files.update(current)
+            if not os.path.lexists(path):
+                missing.append(path)
+        missing = list(dict.fromkeys(missing))
+        hash_only = [path for path, st in files.items() if self.is_hash_only(path, st)]
+        self.exclude_hash_only(os.path.relpath(path, GIT_ROOT) for path in hash_only)
+        if missing:
+            self.prune_hash_only(missing)
+        scopes = hash_only + [path for path in missing if self.binaries.recorded_under(path)]
+        if not scopes:
+            return []
+        changes = self.binaries.check(scopes, entries=True)
+        if changes:
+            self.binaries.flush(BINARY_MANIFEST_FILE)
+        return changes
+
+    def commit_changes(self, paths, events, polled=()):
+        binary_changes = self.record_hash_only(paths, polled)
+        relative = [os.path.relpath(path, GIT_ROOT) for path in paths]
+        # Explicitly named ignored paths make "git add" fail, so drop them first.
+        ignored = set(self.git("check-ignore", "--stdin", stdin_text="\n".join(relative),
+                                    literal=False).stdout.splitlines())
+        relative = [path for path in relative if path not in ignored]
+        # A path that is gone and was never tracked (editor temp files, the
+        # source of an atomic rename) makes "git add" reject its whole chunk.
+        missing = [path for path in relative if not os.path.lexists(os.path.join(GIT_ROOT, path))]
+        if missing:
+            vanished = set(missing) - self.tracked_pathspecs(missing)
+            relative = [path for path in relative if path not in vanished]
+        for start in range(0, len(relative), GIT_PATHSPEC_CHUNK):
+            result = self.git("add", "-A", "--", *relative[start:start + GIT_PATHSPEC_CHUNK])
+            if result.returncode != 0:
+                log(f"git add failed: {result.stderr.strip()}")
+        staged = self.git("diff", "--cached", "--quiet").returncode != 0
+        if not staged and not binary_changes:
+            return
+        # Only blob ids are recorded; the diff itself is produced when the
+        # event is opened.
+        records = []
+        lines = []
+        if staged:
+            raw = self.git("diff", "--cached", "--raw", "-z", "--no-abbrev", "--no-renames").stdout.split("\0")
+            self.git("commit", "-m", "Automatically commit: monitored directories have changed")
+            log("Commit changes completed")
+            commit = self.git("rev-parse", "HEAD").stdout.strip()
+            commit_time = self.git("log", "-1", "--format=%cd").stdout.strip()
+            changes = []
+            for status, path in zip(raw[0::2], raw[1::2]):
+                _old_mode, _new_mode, old, new, letter = status.lstrip(":").split(" ")
+                changes.append((GIT_STATUS_CHANGES.get(letter[0], MODIFIED), os.path.join(GIT_ROOT, path),
+                                None if old == NULL_OBJECT_ID else old, None if new == NULL_OBJECT_ID else new))
+            sizes = self.blob_sizes(blob for change in changes for blob in change[2:] if blob)
+            records += [change_record(change, path, old, new, STORE_GIT, commit, size=sizes.get(new),
+                                      size_delta=size_delta(sizes.get(old), sizes.get(new)))
+                        for change, path, old, new in changes]
+            lines += [f"Commit time: {commit_time}", "Changed files:", format_changes(change[:2] for change in changes)]
+        if binary_changes:
+            records += hash_records(binary_changes)
+            lines += ["Hash-only files:", format_changes(change[:2] for change in binary_changes)]
+        append_events(self.journal, records)
+        self.write_change_log(lines, events)
+
+    def tracked_pathspecs(self, relative_paths):
+        # The paths that are a tracked file or contain one.
+        tracked = set()
+        for start in range(0, len(relative_paths), GIT_PATHSPEC_CHUNK):
+            chunk = relative_paths[start:start + GIT_PATHSPEC_CHUNK]
+            files = [path for path in self.git("ls-files", "-z", "--", *chunk).stdout.split("\0") if path]
+            for path in chunk:
+                prefix = path + "/"
+                if any(file == path or file.startswith(prefix) for file in files):
+                    tracked.add(path)
+        return tracked
+
+    def blob_sizes(self, blobs):
+        # One cat-file process for the whole batch.
+        blobs = list(dict.fromkeys(blobs))
+        if not blobs:
+            return {}
+        output = self.git("cat-file", "--batch-check=%(objectname) %(objectsize)", stdin_text="\n".join(blobs) + "\n").stdout
+        sizes = {}
+        for line in output.splitlines():
+            blob, _separator, size = line.partition(" ")
+            if size.isdigit():
+                sizes[blob] = int(size)
+        return sizes
+
+    def read_versions(self):
+        versions = {}
+        for version_file in self.version_files:
+            try:
+                with open(version_file, "r") as f:
+                    versions[version_file] = f.read().strip()
+            except OSError:
+                log(f"version file does not exist: {version_file}")
+        return versions
+
+    def check_version_changes(self):
+        versions = self.read_versions()
+        changed = [(path, self.previous_versions[path], version) for path, version in versions.items()
+                   if self.previous_versions.get(path, version) != version]
+        self.previous_versions.update(versions)
+        if not changed:
+            return
+        commit = None
+        if len(set(versions.values())) == 1:
+            version = next(iter(versions.values()))
+            log(f"version number changes and is consistent: {version}")
+            self.git("add", ".")
+            self.git("commit", "-m", f"Automatically commit: version number updated to {version}")
+            commit = self.git("rev-parse", "HEAD").stdout.strip()
+            commit_time = self.git("log", "-1", "--format=%cd").stdout.strip()
+            with open(LOG_FILE, "a") as f:
+                f.write(f"Commit time: {commit_time}\n" + "-" * 60 + "\n")
+        append_events(self.journal, [change_record(VERSION_CHANGED, path, old, new, STORE_VERSION, commit)
+                                     for path, old, new in changed])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record changes in the monitored directories as they happen")
+    parser.add_argument("--backend", choices=["git", "manifest"], default="git",
+                        help="Commit changes to the git repository in /home/unitx, or keep a hash manifest instead")
+    parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="Squash git history older than this many days into a baseline commit (0: keep all)")
+    parser.add_argument("--watch-budget", type=int,
+                        help="inotify watches to use; beyond it directories are polled (default: half of fs.inotify.max_user_watches)")
+    args = parser.parse_args()
+
+    watcher = IntegrityWatcher(backend=args.backend, retention_days=args.retention_days, watch_budget=args.watch_budget)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.inotify.close()
@@ -1,11 +1,18 @@
 import os
 import shutil
+import threading
+import time
 from PySide2.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTextEdit, QComboBox,
                                QLineEdit, QPushButton, QProgressBar, QMessageBox,
-                               QHBoxLayout, QSizePolicy)
+                               QHBoxLayout, QSizePolicy, QTableView, QHeaderView, QCheckBox,
+                               QTabWidget, QTreeWidget, QTreeWidgetItem)
 from PySide2.QtGui import QFont, QIntValidator
-from PySide2.QtCore import QThread, Signal, QObject, Qt
+from PySide2.QtCore import QThread, Signal, QObject, Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
 from localization import _
+from file_scan_engine import ScanEngine, TraversalPolicy
+from file_size_index import SizeIndex, DirectoryTotals, index_file_for, grown_since
+from duplicate_finder import group_by_size, find_duplicates, reclaimable_bytes
+from inode_hotspots import find_hotspots, format_report
 
 def format_size(size_bytes):
     if size_bytes < 0 or not isinstance(size_bytes, (int, float)):
@@ -19,46 +26,186 @@ def format_size(size_bytes):
     else:
         return f"{size / (1024 ** 2):.2f} MB"
 
+# Upper bound on how often the scanner thread posts events to the GUI thread.
+SIGNAL_INTERVAL = 0.1
+TOP_ENTRIES = 20
+NODE_ROLE = Qt.UserRole
+# Scan modes, in the order of the mode selector.
+MODE_LARGE_FILES = 0
+MODE_DUPLICATES = 1
+MODE_INODES = 2
+
+
+class LargeFileTableModel(QAbstractTableModel):
+    SIZE_ROLE = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 2
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return _("Size") if section == 1 else _("Path")
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, size = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return format_size(size) if index.column() == 1 else path
+        if role == self.SIZE_ROLE:
+            return size if index.column() == 1 else path
+        if role == Qt.TextAlignmentRole and index.column() == 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def add_rows(self, rows):
+        if not rows:
+            return
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+
 class FileScanner(QObject):
     update_progress = Signal(int)
-    file_found = Signal(str, object)
+    files_found = Signal(list)
+    growth_found = Signal(list)
+    aggregation_ready = Signal(object, object, list)
+    duplicates_found = Signal(list)
+    hotspots_found = Signal(dict)
+    stage_changed = Signal(str)
     finished = Signal(bool)
     error_occurred = Signal(str)
 
-    def __init__(self, directory, min_size_bytes):
+    def __init__(self, directory, min_size_bytes, incremental=False, one_filesystem=True, mode=MODE_LARGE_FILES):
         super().__init__()
         self.directory = directory
         self.min_size_bytes = min_size_bytes
-        self.exclude_dirs = {'proc', 'sys', 'dev', 'run', 'tmp', 'var', 'lib', 'snap', 'lost+found'}
+        self.incremental = incremental
+        self.one_filesystem = one_filesystem
+        # In duplicates mode min_size_bytes is the smallest file compared and
+        # the large-file list is not filled.
+        self.mode = mode
         self._is_running = True
+        self.engine = None
+        # Engine callbacks arrive on its worker threads; they are buffered here
+        # and posted at most every SIGNAL_INTERVAL so the GUI event loop is not
+        # flooded with one queued event per file.
+        self._lock = threading.Lock()
+        self._found = []
+        self._errors = []
+        self._processed = 0
+        self._last_emit = 0.0
+
+    def collect_file(self, path, size):
+        with self._lock:
+            self._found.append((path, size))
+        self.maybe_flush()
+
+    def collect_progress(self, processed_files):
+        with self._lock:
+            self._processed = max(self._processed, processed_files)
+        self.maybe_flush()
+
+    def collect_error(self, message):
+        with self._lock:
+            self._errors.append(message)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_emit >= SIGNAL_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._last_emit = time.monotonic()
+            found, self._found = self._found, []
+            errors, self._errors = self._errors, []
+            processed = self._processed
+        if not self._is_running:
+            return
+        if found:
+            self.files_found.emit(found)
+        if errors:
+            self.error_occurred.emit("\n".join(errors))
+        self.update_progress.emit(processed)
 
     def stop(self):
         self._is_running = False
+        if self.engine:
+            self.engine.stop()
 
     def run(self):
-        processed_files = 0
+        if self.mode == MODE_INODES:
+            self.count_inodes()
+            return
         try:
-            for root, dirs, files in os.walk(self.directory, topdown=True):
-                dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-                if not self._is_running:
-                    return
-                for file in files:
-                    if not self._is_running:
-                        return
-                    processed_files += 1
-                    self.update_progress.emit(processed_files)
-                    try:
-                        file_path = os.path.join(root, file)
-                        if os.path.isfile(file_path):
-                            size = os.stat(file_path).st_size
-                            if size >= self.min_size_bytes:
-                                self.file_found.emit(file_path, size)
-                    except (FileNotFoundError, PermissionError) as e:
-                        self.error_occurred.emit(_("Unable to access file {file}: {e}").format(file=file_path, e=str(e)))
-                    except Exception as e:
-                        self.error_occurred.emit(_("Scan error: {e}").format(e=str(e)))
+            index_file = index_file_for(self.directory)
+            previous_index = SizeIndex.load(index_file)
+            index = SizeIndex(self.directory)
+            self.engine = ScanEngine(
+                self.directory,
+                self.min_size_bytes,
+                policy=TraversalPolicy(one_filesystem=self.one_filesystem),
+                top_files=TOP_ENTRIES,
+                on_file=self.collect_file if self.mode == MODE_LARGE_FILES else None,
+                on_progress=self.collect_progress,
+                on_error=self.collect_error,
+                index=index,
+                previous_index=previous_index if self.incremental else None,
+            )
+            if not self._is_running:
+                return
+            self.engine.run()
+            self.flush()
+            if self._is_running:
+                self.aggregation_ready.emit(index, DirectoryTotals(index), self.engine.largest_files())
+                index.save(index_file)
+                if previous_index is not None:
+                    self.growth_found.emit(grown_since(previous_index, index))
+                if self.mode == MODE_DUPLICATES:
+                    self.find_duplicate_files(index)
+                if self._is_running:
+                    self.finished.emit(True)
+        except Exception:
             if self._is_running:
                 self.finished.emit(True)
+
+    def find_duplicate_files(self, index):
+        size_groups = group_by_size(index, self.min_size_bytes)
+        candidates = sum(len(paths) for paths in size_groups.values())
+        self.stage_changed.emit(_("Comparing {count} files with matching sizes...").format(count=candidates))
+        duplicates = find_duplicates(size_groups, is_running=lambda: self._is_running)
+        if self._is_running:
+            self.duplicates_found.emit(duplicates)
+
+    def count_inodes(self):
+        def engine_ready(engine):
+            self.engine = engine
+            if not self._is_running:
+                engine.stop()
+
+        try:
+            result = find_hotspots(self.directory, TOP_ENTRIES, self.one_filesystem,
+                                   engine_ready=engine_ready, on_progress=self.collect_progress)
+            self.flush()
+            if self._is_running and result is not None:
+                self.hotspots_found.emit(result)
+                self.finished.emit(True)
         except Exception:
             if self._is_running:
                 self.finished.emit(True)
@@ -85,6 +232,11 @@ class LargeFileCheck(QWidget):
         self.directory_selector.setMinimumWidth(100)
         control_layout.addWidget(self.directory_selector)
 
+        self.mode_selector = QComboBox()
+        self.mode_selector.addItems([_("Large files"), _("Duplicates"), _("Inode hotspots")])
+        self.mode_selector.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        control_layout.addWidget(self.mode_selector)
+
         size_group = QHBoxLayout()
         size_group.setSpacing(5)
 
@@ -103,6 +255,16 @@ class LargeFileCheck(QWidget):
 
         control_layout.addLayout(size_group)
 
+        self.reuse_checkbox = QCheckBox(_("Reuse unchanged directories"))
+        self.reuse_checkbox.setToolTip(_("Take the listing of directories unchanged since the last scan from its index; "
+                                         "only faster when reading directories is slow, e.g. on a cold HDD"))
+        control_layout.addWidget(self.reuse_checkbox)
+
+        self.one_filesystem_checkbox = QCheckBox(_("Stay on one filesystem"))
+        self.one_filesystem_checkbox.setChecked(True)
+        self.one_filesystem_checkbox.setToolTip(_("Do not descend into other mounts; network mounts are never scanned"))
+        control_layout.addWidget(self.one_filesystem_checkbox)
+
         self.check_button = QPushButton(_("Start detection"))
         self.check_button.setMinimumWidth(120)
         self.check_button.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
@@ -117,6 +279,40 @@ class LargeFileCheck(QWidget):
         self.large_files_output_area.setFont(font)
         main_layout.addWidget(self.large_files_output_area, stretch=1)
 
+        self.results_model = LargeFileTableModel(self)
+        self.results_proxy = QSortFilterProxyModel(self)
+        self.results_proxy.setSourceModel(self.results_model)
+        self.results_proxy.setSortRole(LargeFileTableModel.SIZE_ROLE)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_proxy)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.sortByColumn(1, Qt.DescendingOrder)
+        self.results_table.setFont(font)
+        self.results_table.verticalHeader().hide()
+        self.results_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.results_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+
+        self.directory_tree = QTreeWidget()
+        self.directory_tree.setColumnCount(4)
+        self.directory_tree.setHeaderLabels([_("Name"), _("Size"), _("Allocated"), _("Files")])
+        self.directory_tree.setFont(font)
+        self.directory_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.directory_tree.itemExpanded.connect(self.populate_tree_item)
+        self.directory_index = None
+        self.directory_totals = None
+
+        self.results_tabs = QTabWidget()
+        self.results_tabs.addTab(self.results_table, _("Large files"))
+        self.results_tabs.addTab(self.directory_tree, _("Directory sizes"))
+
+        self.duplicates_tree = QTreeWidget()
+        self.duplicates_tree.setColumnCount(3)
+        self.duplicates_tree.setHeaderLabels([_("Path"), _("Size"), _("Reclaimable")])
+        self.duplicates_tree.setFont(font)
+        self.duplicates_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.results_tabs.addTab(self.duplicates_tree, _("Duplicates"))
+        main_layout.addWidget(self.results_tabs, stretch=3)
+
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 0)
         self.progress_bar.hide()
@@ -150,27 +346,34 @@ class LargeFileCheck(QWidget):
             self.start_detection()
 
     def start_detection(self):
-        if not self.size_input.text().strip():
-            QMessageBox.warning(self, _("Input Required"), _("Enter minimum file size (MB) default 1000 MB"))
-            return
+        # Duplicates mode compares every file from the entered size up, so the
+        # large-file limits do not apply to it; inode hotspots ignore sizes.
+        mode = self.mode_selector.currentIndex()
+        if mode == MODE_INODES:
+            min_size_bytes = 0
+        else:
+            if not self.size_input.text().strip():
+                QMessageBox.warning(self, _("Input Required"), _("Enter minimum file size (MB) default 1000 MB"))
+                return
 
-        min_size_bytes = self.parse_size_input()
-        if not min_size_bytes:
-            QMessageBox.warning(self, _("Invalid Size"), _("Please enter a valid number"))
-            return
+            min_size_bytes = self.parse_size_input()
+            if not min_size_bytes:
+                QMessageBox.warning(self, _("Invalid Size"), _("Please enter a valid number"))
+                return
 
-        unit = self.size_unit.currentText().upper()
-        value = int(self.size_input.text())
-        if unit == "MB" and value <= 1024:
-            QMessageBox.warning(self, _("Invalid Size"), _("MB unit must be greater than 1024 MB (i.e., 1GB)"))
-            return
-        elif unit == "GB" and value < 1:
-            QMessageBox.warning(self, _("Invalid Size"), _("GB unit must be greater than 1 GB"))
-            return
+        if mode == MODE_LARGE_FILES:
+            unit = self.size_unit.currentText().upper()
+            value = int(self.size_input.text())
+            if unit == "MB" and value <= 1024:
+                QMessageBox.warning(self, _("Invalid Size"), _("MB unit must be greater than 1024 MB (i.e., 1GB)"))
+                return
+            elif unit == "GB" and value < 1:
+                QMessageBox.warning(self, _("Invalid Size"), _("GB unit must be greater than 1 GB"))
+                return
 
-        if min_size_bytes < 1024 ** 3:
-            QMessageBox.warning(self, _("Invalid Size"), _("Minimum size must be ≥1GB"))
-            return
+            if min_size_bytes < 1024 ** 3:
+                QMessageBox.warning(self, _("Invalid Size"), _("Minimum size must be ≥1GB"))
+                return
 
         target_path = self.directory_selector.currentText()
         usage = self.get_disk_usage(target_path)
@@ -178,9 +381,10 @@ class LargeFileCheck(QWidget):
             return
 
         self.large_files_output_area.clear()
+        self.clear_results()
         self.show_parameters(target_path, usage, min_size_bytes)
 
-        if min_size_bytes > usage.free:
+        if mode == MODE_LARGE_FILES and min_size_bytes > usage.free:
             self.large_files_output_area.append(
                 _("[Warning] Threshold ({threshold}) exceeds free space ({free})").format(
                     threshold=format_size(min_size_bytes),
@@ -193,11 +397,19 @@ class LargeFileCheck(QWidget):
         self.prepare_scan_ui()
 
         self.scanner_thread = QThread()
-        self.scanner = FileScanner(target_path, min_size_bytes)
+        self.scanner = FileScanner(target_path, min_size_bytes,
+                                   incremental=self.reuse_checkbox.isChecked(),
+                                   one_filesystem=self.one_filesystem_checkbox.isChecked(),
+                                   mode=mode)
         self.scanner.moveToThread(self.scanner_thread)
 
         self.scanner.update_progress.connect(self.update_progress)
-        self.scanner.file_found.connect(self.add_file_result)
+        self.scanner.files_found.connect(self.add_file_results)
+        self.scanner.growth_found.connect(self.show_growth)
+        self.scanner.aggregation_ready.connect(self.show_aggregation)
+        self.scanner.duplicates_found.connect(self.show_duplicates)
+        self.scanner.hotspots_found.connect(self.show_hotspots)
+        self.scanner.stage_changed.connect(self.large_files_output_area.append)
         self.scanner.error_occurred.connect(self.add_error_message)
         self.scanner.finished.connect(self.on_scan_finished)
 
@@ -230,6 +442,7 @@ class LargeFileCheck(QWidget):
         self.progress_bar.hide()
         self.progress_label.setText("Processed 0 files")
         self.large_files_output_area.clear()
+        self.clear_results()
         self.large_files_output_area.append(_("Stopped detection"))
         self.disconnect_signals()
         self.cleanup_scan()
@@ -248,7 +461,12 @@ class LargeFileCheck(QWidget):
         if self.scanner:
             try:
                 self.scanner.update_progress.disconnect(self.update_progress)
-                self.scanner.file_found.disconnect(self.add_file_result)
+                self.scanner.files_found.disconnect(self.add_file_results)
+                self.scanner.growth_found.disconnect(self.show_growth)
+                self.scanner.aggregation_ready.disconnect(self.show_aggregation)
+                self.scanner.duplicates_found.disconnect(self.show_duplicates)
+                self.scanner.hotspots_found.disconnect(self.show_hotspots)
+                self.scanner.stage_changed.disconnect(self.large_files_output_area.append)
                 self.scanner.error_occurred.disconnect(self.add_error_message)
                 self.scanner.finished.disconnect(self.on_scan_finished)
             except TypeError:
@@ -258,11 +476,76 @@ class LargeFileCheck(QWidget):
         if self.scanner and self.scanner._is_running:
             self.progress_label.setText(_("{count} files processed").format(count=count))
 
-    def add_file_result(self, path, size_bytes):
-        size_mb = size_bytes / (1024 ** 2)
-        self.large_files_output_area.append(
-            _("{file_path} (Size: {size:.2f} MB)").format(file_path=path, size=size_mb)
-        )
+    def add_file_results(self, results):
+        self.results_model.add_rows(results)
+
+    def clear_results(self):
+        self.results_model.clear()
+        self.directory_tree.clear()
+        self.duplicates_tree.clear()
+        self.directory_index = None
+        self.directory_totals = None
+
+    def show_aggregation(self, index, totals, largest_files):
+        self.directory_index = index
+        self.directory_totals = totals
+        self.directory_tree.clear()
+        root_item = self.make_tree_item(0, index.root)
+        self.directory_tree.addTopLevelItem(root_item)
+        root_item.setExpanded(True)
+
+        lines = [_("[Largest files]")]
+        for size, path in largest_files:
+            lines.append(_("{file_path} ({size})").format(file_path=path, size=format_size(size)))
+        lines.append(_("[Largest directories]"))
+        for path, apparent, allocated, files in totals.top_directories(TOP_ENTRIES):
+            lines.append(_("{path} ({size}, allocated {allocated}, {files} files)").format(
+                path=path, size=format_size(apparent), allocated=format_size(allocated), files=files))
+        self.large_files_output_area.append("\n".join(lines))
+
+    def make_tree_item(self, node_id, name):
+        totals = self.directory_totals
+        item = QTreeWidgetItem([name, format_size(totals.apparent[node_id]),
+                                format_size(totals.allocated[node_id]), str(totals.files[node_id])])
+        item.setData(0, NODE_ROLE, node_id)
+        if self.directory_index.is_dir(node_id):
+            # Children are created on first expansion; the indicator stands in until then.
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        return item
+
+    def populate_tree_item(self, item):
+        if item.childCount() or self.directory_index is None:
+            return
+        node_id = item.data(0, NODE_ROLE)
+        for child_id in self.directory_totals.sorted_children(node_id):
+            item.addChild(self.make_tree_item(child_id, os.fsdecode(self.directory_index.name(child_id))))
+        if not item.childCount():
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicator)
+
+    def show_growth(self, growth):
+        if not growth:
+            return
+        lines = [_("[Grown since the previous scan]")]
+        for path, delta, size in growth:
+            lines.append(_("{file_path} (+{delta}, now {size})").format(
+                file_path=path, delta=format_size(delta), size=format_size(size)))
+        self.large_files_output_area.append("\n".join(lines))
+
+    def show_duplicates(self, duplicates):
+        self.duplicates_tree.clear()
+        for size, paths in duplicates:
+            group_item = QTreeWidgetItem([_("{count} copies").format(count=len(paths)), format_size(size),
+                                          format_size(size * (len(paths) - 1))])
+            for path in sorted(paths):
+                group_item.addChild(QTreeWidgetItem([path, format_size(size), ""]))
+            self.duplicates_tree.addTopLevelItem(group_item)
+        self.large_files_output_area.append(_("{groups} groups of duplicate files, {size} reclaimable").format(
+            groups=len(duplicates), size=format_size(reclaimable_bytes(duplicates))))
+        if duplicates:
+            self.results_tabs.setCurrentWidget(self.duplicates_tree)
+
+    def show_hotspots(self, result):
+        self.large_files_output_area.append(format_report(result))
 
     def add_error_message(self, msg):
         self.large_files_output_area.append(_("[Error] {msg}").format(msg=msg))
@@ -274,7 +557,9 @@ class LargeFileCheck(QWidget):
             self.check_button.setText(_("Start detection"))
             self.check_button.setEnabled(True)
             self.progress_label.setText("Processed 0 files")
-            if not self.large_files_output_area.toPlainText().strip():
+            if self.mode_selector.currentIndex() != MODE_LARGE_FILES:
+                return
+            if self.results_model.rowCount() == 0:
                 self.large_files_output_area.append(_("No large files found."))
             else:
                 self.large_files_output_area.append(_("\nLarge files found."))
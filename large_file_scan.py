@@ -0,0 +1,111 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from localization import _
+from file_scan_engine import ScanEngine, TraversalPolicy, PSEUDO_FILESYSTEM_PATHS
+from file_size_index import SizeIndex, DirectoryTotals, index_file_for, grown_since
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+DEFAULT_MIN_SIZE = "1G"
+DEFAULT_TOP = 20
+
+def parse_size(text):
+    # "500M", "2G", "1.5T" or plain bytes.
+    text = text.strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * SIZE_UNITS[unit])
+
+def scan(path, min_size_bytes, top=DEFAULT_TOP, one_filesystem=False, incremental=False,
+         exclude_paths=PSEUDO_FILESYSTEM_PATHS):
+    # Same engine and index as the Large File tab, without Qt. Returns a plain
+    # dict ready for JSON. Unlike the tab it only skips pseudo filesystems by
+    # default: a full disk is as likely to be /var or /tmp as anything else.
+    path = os.path.abspath(path)
+    index_file = index_file_for(path)
+    previous_index = SizeIndex.load(index_file) if incremental else None
+    index = SizeIndex(path)
+    large_files = []
+    errors = []
+    engine = ScanEngine(path, min_size_bytes,
+                        policy=TraversalPolicy(one_filesystem=one_filesystem, exclude_paths=exclude_paths),
+                        top_files=top,
+                        on_file=lambda file_path, size: large_files.append((size, file_path)),
+                        on_error=errors.append,
+                        index=index,
+                        previous_index=previous_index)
+    started = time.monotonic()
+    engine.run()
+    elapsed = time.monotonic() - started
+    totals = DirectoryTotals(index)
+    if incremental:
+        index.save(index_file)
+
+    result = {
+        "path": path,
+        "scanned_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(elapsed, 3),
+        "files": engine.processed_files,
+        "apparent_bytes": totals.apparent[0],
+        "allocated_bytes": totals.allocated[0],
+        "min_size_bytes": min_size_bytes,
+        "large_files": [{"path": file_path, "size": size} for size, file_path in sorted(large_files, reverse=True)],
+        "top_files": [{"path": file_path, "size": size} for size, file_path in engine.largest_files()],
+        "top_directories": [{"path": dir_path, "size": apparent, "allocated": allocated, "files": files}
+                            for dir_path, apparent, allocated, files in totals.top_directories(top)],
+        "errors": errors,
+    }
+    if previous_index is not None:
+        result["grown_files"] = [{"path": file_path, "growth": delta, "size": size}
+                                 for file_path, delta, size in grown_since(previous_index, index, top)]
+    return result
+
+def write_csv(result, output):
+    writer = csv.writer(output)
+    writer.writerow(["kind", "path", "size", "allocated", "files"])
+    for entry in result["large_files"]:
+        writer.writerow(["large_file", entry["path"], entry["size"], "", ""])
+    for entry in result["top_files"]:
+        writer.writerow(["top_file", entry["path"], entry["size"], "", ""])
+    for entry in result["top_directories"]:
+        writer.writerow(["top_directory", entry["path"], entry["size"], entry["allocated"], entry["files"]])
+    for entry in result.get("grown_files", []):
+        writer.writerow(["grown_file", entry["path"], entry["growth"], "", ""])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find large files and directories without the GUI")
+    parser.add_argument("--path", default="/", help="Directory to scan")
+    parser.add_argument("--min-size", default=DEFAULT_MIN_SIZE, help="Report files from this size up, e.g. 500M, 2G")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="Number of largest files and directories to list")
+    parser.add_argument("--one-filesystem", action="store_true", help="Do not descend into other mounts")
+    parser.add_argument("--incremental", action="store_true", help="Reuse and update the size index shared with the GUI")
+    parser.add_argument("--exclude", action="append", metavar="PATH",
+                        help="Subtree to skip, may be repeated (default: /proc, /sys, /dev and /run)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Output format")
+    parser.add_argument("--output", help="Write the result to this file instead of stdout")
+    args = parser.parse_args()
+
+    try:
+        min_size_bytes = parse_size(args.min_size)
+    except (ValueError, KeyError):
+        print(_("Invalid size: {size}").format(size=args.min_size), file=sys.stderr)
+        exit(1)
+    if not os.path.isdir(args.path):
+        print(_("Directory does not exist: {path}").format(path=args.path), file=sys.stderr)
+        exit(1)
+
+    result = scan(args.path, min_size_bytes, args.top, args.one_filesystem, args.incremental,
+                  PSEUDO_FILESYSTEM_PATHS if args.exclude is None else args.exclude)
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            write_csv(result, output)
+        else:
+            json.dump(result, output, indent=2)
+            output.write("\n")
+    finally:
+        if args.output:
+            output.close()
@@ -2,10 +2,15 @@ import subprocess
 import argparse
 import os
 import re
+import gzip
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import tarfile
+import json
 from localization import setup_locale, _
+import log_formats
+from time_spans import parse_span
 
 home_dir = os.path.expanduser('~')
 timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
@@ -32,6 +37,18 @@ config_dirs = [
 
 ATOP_LOG_DIR = "/var/log/atop"
 
+# Matches the suffix logrotate appends to a rotated sibling: ".1", ".2.gz", ...
+ROTATED_SUFFIX_PATTERN = re.compile(r"^\.(\d+)(\.gz)?$")
+SEGMENT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Format assumed for a source when format detection finds no known timestamps.
+SOFTWARE_LOG_FORMAT = "app"
+SYSTEM_LOG_FORMAT = "bsd_syslog"
+
+CHECKPOINT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "log_collection_checkpoints.json")
+COPY_CHUNK_SIZE = 1024 * 1024
+TAIL_SCAN_SIZE = 64 * 1024
+
 def display_help(script_name):
     current_time = datetime.now()
     one_hour_earlier = current_time - timedelta(hours=1)
@@ -45,6 +62,8 @@ Log Filter Tool - Usage Guide
 Usage:
     python log_collection.py -u [user] -t [start_time] [end_time]
     python log_collection.py -u [user] -n [recent_lines] [-f log_file ...]
+    python log_collection.py --since-last [-f log_file ...]
+    python log_collection.py --around [event_time] [--span span] [-f log_file ...]
 
 Options:
     -t            Define the time range for filtering logs.
@@ -53,6 +72,13 @@ Options:
     -f            Specify the log file(s) to process. Multiple files can be listed.
                   Available log files: cortex.log, optix.log, prod.log, syslog, kern.log.
                   If omitted, all log files are included by default.
+    --since-last  Collect only what was written since the previous --since-last bundle,
+                  resuming from the per-file checkpoints it saved. -t, -n and --around
+                  leave the checkpoints alone.
+    --around      Collect every log and the atop samples within --span of one event time.
+    --span        Half-width of the --around window, e.g. 30s, 5m, 1h (default: 30s).
+    --format      Output format: text (default) or jsonl, one JSON record per log entry
+                  with ts (epoch ns), source, level, logger and message.
 
 Execution Examples:
     python {script_name} -t "{example_start_time}" "{example_end_time}"  
@@ -72,10 +98,21 @@ Execution Examples:
     
     python {script_name} -n 100 -f syslog prod.log  
     # Get the last 100 lines from syslog and prod.log
+
+    python {script_name} --since-last
+    # Get everything written to all logs since the last --since-last bundle
+
+    python {script_name} --around "{example_end_time}" --span 30s
+    # Get 30 seconds either side of "{example_end_time}" from all logs and atop
+
+    python {script_name} -n 1000 --format jsonl
+    # Get the latest 1000 lines from all logs as JSON records
     
 
     Notes:
     - Ensure date-time values follow the correct format.
+    - With -t, rotated siblings (e.g. syslog.1, syslog.2.gz) are searched as well;
+      segments whose time span lies outside the window are skipped unopened.
     - Combining `-f` allows you to target specific logs while limiting the output.
     """
     return help_text
@@ -175,9 +212,98 @@ def get_today_atop_log():
 
         return None
 
-def filter_software_logs_by_time(start_time=None, end_time=None, selected_files=None):
-    timestamp_pattern = r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+"
+# Returns the live log and its rotated siblings, oldest segment first.
+def find_log_segments(log_file):
+    log_dir = os.path.dirname(log_file)
+    base_name = os.path.basename(log_file)
+    segments = []
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return [log_file] if os.path.exists(log_file) else []
+
+    for name in names:
+        if name == base_name:
+            segments.append((0, log_file))
+        elif name.startswith(base_name):
+            match = ROTATED_SUFFIX_PATTERN.match(name[len(base_name):])
+            if match:
+                segments.append((int(match.group(1)), os.path.join(log_dir, name)))
+
+    segments.sort(key=lambda segment: segment[0], reverse=True)
+    return [path for _rotation, path in segments]
+
+# A segment holds lines written between the mtime of the next older segment
+# (when it was started) and its own mtime (its last write), so segments outside
+# [start_time, end_time] are dropped with stat() alone, without opening them.
+def select_segments_in_window(segments, start_time=None, end_time=None):
+    selected = []
+    previous_mtime = None
+    for segment in segments:
+        try:
+            mtime = datetime.fromtimestamp(os.stat(segment).st_mtime)
+        except OSError:
+            continue
+        first_time = previous_mtime
+        previous_mtime = mtime
+        if start_time is not None and mtime < start_time:
+            continue
+        if end_time is not None and first_time is not None and first_time > end_time:
+            continue
+        selected.append(segment)
+    return selected
+
+def open_log_segment(segment):
+    if segment.endswith(".gz"):
+        return gzip.open(segment, "rt")
+    return open(segment, "r")
+
+def filter_segment_by_time(segment, part_file, log_format, start_time=None, end_time=None):
+    parse_time = log_formats.bind_parser(segment, log_format).parse_time
+    with open_log_segment(segment) as infile, open(part_file, "w") as outfile:
+        current_time = None
+        for line in infile:
+            log_time = parse_time(line)
+            if log_time:
+                current_time = log_time
+
+            if current_time and (start_time is None or current_time >= start_time) and (end_time is None or current_time <= end_time):
+                outfile.write(line)
+    return part_file
+
+def filter_log_segments_by_time(input_log_file, output_log_file, log_format, start_time=None, end_time=None,
+                                segment_filter=filter_segment_by_time):
+    # Returns the number of bytes written.
+    segments = select_segments_in_window(find_log_segments(input_log_file), start_time, end_time)
+    part_files = [f"{output_log_file}.part{index}" for index in range(len(segments))]
+    try:
+        # gzip inflation releases the GIL, so compressed segments decode in parallel;
+        # each worker writes its own part and the parts are joined oldest first.
+        with ThreadPoolExecutor(max_workers=SEGMENT_WORKERS) as executor:
+            futures = [
+                executor.submit(segment_filter, segment, part_file, log_format, start_time, end_time)
+                for segment, part_file in zip(segments, part_files)
+            ]
+            for future in futures:
+                future.result()
+
+        with open(output_log_file, "wb") as outfile:
+            for part_file in part_files:
+                with open(part_file, "rb") as infile:
+                    shutil.copyfileobj(infile, outfile)
+            return outfile.tell()
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+def report_filtered_log(written, input_log_file, output_log_file, start_time, end_time):
+    if written:
+        print(f"{_('Log file from {start_time} to {end_time} saved to {output_log_file}.').format(start_time=start_time, end_time=end_time, output_log_file=output_log_file)}")
+    else:
+        print(f"{_('No lines of {input_log_file} from {start_time} to {end_time}.').format(input_log_file=input_log_file, start_time=start_time, end_time=end_time)}")
 
+def filter_software_logs_by_time(start_time=None, end_time=None, selected_files=None):
     if not selected_files:
         selected_files = log_files.keys()
     else:
@@ -194,28 +320,12 @@ def filter_software_logs_by_time(start_time=None, end_time=None, selected_files=
         output_log_file = os.path.join(output_dir, os.path.basename(log_key))  
 
         try:
-            with open(input_log_file, "r") as infile, open(output_log_file, "w") as outfile:
-                current_time = None
-                for line in infile:
-                    match = re.match(timestamp_pattern, line)
-                    if match:
-                        log_time_str = match.group().split(".")[0]
-                        log_time = datetime.strptime(log_time_str, "%Y-%m-%d %H:%M:%S")
-
-                        current_time = log_time
-
-                    if current_time and (start_time is None or current_time >= start_time) and (end_time is None or current_time <= end_time):
-                        outfile.write(line)
-
-
-            print(f"{_('Log file from {start_time} to {end_time} saved to {output_log_file}.').format(start_time=start_time, end_time=end_time, output_log_file=output_log_file)}")
-        except FileNotFoundError:
-            print(f"{_('Log file {input_log_file} not found, skipping.').format(input_log_file=input_log_file)}")
+            written = filter_log_segments_by_time(input_log_file, output_log_file, SOFTWARE_LOG_FORMAT, start_time, end_time)
+            report_filtered_log(written, input_log_file, output_log_file, start_time, end_time)
         except Exception as e:
             print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=input_log_file, e=e)}")
 
 def filter_system_logs_by_time(start_time=None, end_time=None, selected_files=None):
-    syslog_pattern = r"^\w{3} {1,2}\d{1,2} \d{2}:\d{2}:\d{2}"
     if not selected_files:
         selected_files = system_log_files.values()
     else:
@@ -231,26 +341,321 @@ def filter_system_logs_by_time(start_time=None, end_time=None, selected_files=No
         output_log_file = os.path.join(output_dir, os.path.basename(input_log_file))
 
         try:
-            with open(input_log_file, "r") as infile, open(output_log_file, "w") as outfile:
-                current_time = None
-                for line in infile:
-                    match = re.match(syslog_pattern, line)
-                    if match:
-                        log_time_str = match.group()
-                        syslog_time = datetime.strptime(f"{datetime.now().year} {log_time_str}", "%Y %b %d %H:%M:%S")
+            written = filter_log_segments_by_time(input_log_file, output_log_file, SYSTEM_LOG_FORMAT, start_time, end_time)
+            report_filtered_log(written, input_log_file, output_log_file, start_time, end_time)
+        except Exception as e:
+            print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=input_log_file, e=e)}")
+
+def iter_selected_sources(selected_files=None):
+    for log_key, input_log_file in log_files.items():
+        if not selected_files or log_key in selected_files:
+            yield os.path.basename(log_key), input_log_file, SOFTWARE_LOG_FORMAT
+    for log_key, input_log_file in system_log_files.items():
+        if not selected_files or log_key in selected_files:
+            yield os.path.basename(input_log_file), input_log_file, SYSTEM_LOG_FORMAT
+
+def load_checkpoints():
+    try:
+        with open(CHECKPOINT_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_checkpoints(checkpoints):
+    os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+    temp_file = f"{CHECKPOINT_FILE}.tmp"
+    with open(temp_file, "w") as f:
+        json.dump(checkpoints, f, indent=2)
+    os.replace(temp_file, CHECKPOINT_FILE)
+
+def read_last_second(log_file, log_format, end_offset=None):
+    # Returns the last timestamp before end_offset and the number of lines
+    # from the first line stamped with that second up to end_offset. Only the
+    # tail is read, so a longer burst within one second is undercounted, which
+    # makes the timestamp fallback repeat lines rather than drop them.
+    parse_time = log_formats.bind_parser(log_file, log_format).parse_time
+    with open(log_file, "rb") as f:
+        if end_offset is None:
+            end_offset = f.seek(0, os.SEEK_END)
+        f.seek(max(0, end_offset - TAIL_SCAN_SIZE))
+        partial = f.tell() > 0
+        tail = f.read(end_offset - f.tell())
+    lines = tail.splitlines()[1 if partial else 0:]
+    last_time = None
+    count = counted = 0
+    for raw_line in reversed(lines):
+        log_time = parse_time(raw_line.decode("utf-8", errors="replace"))
+        count += 1
+        if log_time:
+            if last_time is None:
+                last_time = log_time
+            elif log_time != last_time:
+                break
+            counted = count
+    return last_time, counted
+
+def copy_complete_lines(infile, outfile):
+    # Copies up to the last newline so a line being written right now is picked
+    # up whole by the next collection; returns the number of bytes consumed.
+    consumed = 0
+    pending = b""
+    while True:
+        chunk = infile.read(COPY_CHUNK_SIZE)
+        if not chunk:
+            break
+        chunk = pending + chunk
+        cut = chunk.rfind(b"\n") + 1
+        outfile.write(chunk[:cut])
+        consumed += cut
+        pending = chunk[cut:]
+    return consumed
+
+def make_checkpoint(input_log_file, log_format, offset=None):
+    file_stat = os.stat(input_log_file)
+    if offset is None:
+        offset = file_stat.st_size
+    last_time, last_second_lines = read_last_second(input_log_file, log_format, offset)
+    return {
+        "inode": file_stat.st_ino,
+        "offset": offset,
+        "last_timestamp": last_time.strftime("%Y-%m-%d %H:%M:%S") if last_time else None,
+        "last_second_lines": last_second_lines,
+    }
+
+def collect_source_since_checkpoint(input_log_file, output_log_file, log_format, checkpoint):
+    segments = find_log_segments(input_log_file)
+    live_inode = os.stat(input_log_file).st_ino
+    last_time = None
+    if checkpoint and checkpoint.get("last_timestamp"):
+        last_time = datetime.strptime(checkpoint["last_timestamp"], "%Y-%m-%d %H:%M:%S")
+
+    with open(output_log_file, "wb") as outfile:
+        if checkpoint is None:
+            # First collection for this file: ship the live file only.
+            with open(input_log_file, "rb") as infile:
+                offset = copy_complete_lines(infile, outfile)
+            return make_checkpoint(input_log_file, log_format, offset)
+
+        # Find the segment the checkpoint points into: the live file, or an
+        # uncompressed rotated sibling that still carries the same inode.
+        resume_index = None
+        for index, segment in enumerate(segments):
+            if not segment.endswith(".gz") and os.stat(segment).st_ino == checkpoint["inode"]:
+                resume_index = index
+                break
+
+        if resume_index is not None:
+            resume_offset = checkpoint["offset"]
+            if os.path.getsize(segments[resume_index]) < resume_offset:
+                resume_offset = 0  # truncated in place (copytruncate)
+            newer_segments = segments[resume_index:]
+        else:
+            # The old file was compressed or removed since; fall back to the
+            # saved timestamp and only take segments that can hold newer lines.
+            resume_offset = None
+            newer_segments = select_segments_in_window(segments, last_time, None)
+
+        # Lines stamped with the checkpoint's second that it already covered;
+        # older checkpoints do not say, and that second is then sent again.
+        skip = checkpoint.get("last_second_lines", 0)
+        offset = 0
+        for index, segment in enumerate(newer_segments):
+            is_live = segment == input_log_file
+            if index == 0 and resume_offset is not None:
+                with open(segment, "rb") as infile:
+                    infile.seek(resume_offset)
+                    consumed = copy_complete_lines(infile, outfile)
+                offset = resume_offset + consumed if is_live else 0
+            elif resume_offset is None and last_time is not None:
+                # Read as bytes so undecodable lines are copied unchanged; on
+                # the live file only complete lines are taken and counted.
+                parse_time = log_formats.bind_parser(segment, log_format).parse_time
+                consumed = 0
+                with (gzip.open(segment, "rb") if segment.endswith(".gz") else open(segment, "rb")) as infile:
+                    current_time = None
+                    for raw_line in infile:
+                        if is_live and not raw_line.endswith(b"\n"):
+                            break
+                        consumed += len(raw_line)
+                        log_time = parse_time(raw_line.decode("utf-8", errors="replace"))
+                        if log_time:
+                            current_time = log_time
+                        if current_time == last_time and skip:
+                            skip -= 1
+                        elif current_time and current_time >= last_time:
+                            outfile.write(raw_line)
+                if is_live:
+                    offset = consumed
+            elif is_live:
+                with open(segment, "rb") as infile:
+                    offset = copy_complete_lines(infile, outfile)
+            else:
+                with (gzip.open(segment, "rb") if segment.endswith(".gz") else open(segment, "rb")) as infile:
+                    shutil.copyfileobj(infile, outfile, COPY_CHUNK_SIZE)
+
+    if os.stat(input_log_file).st_ino != live_inode:
+        offset = 0  # rotated while we were reading; resume from the new file's start
+    return make_checkpoint(input_log_file, log_format, offset)
+
+def collect_logs_since_last(selected_files=None):
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoints = load_checkpoints()
+
+    for output_name, input_log_file, log_format in iter_selected_sources(selected_files):
+        if not os.path.exists(input_log_file):
+            print(f"{_('The file {input_log_file} does not exist, skipping.').format(input_log_file=input_log_file)}")
+            continue
+
+        output_log_file = os.path.join(output_dir, output_name)
+
+        try:
+            checkpoints[input_log_file] = collect_source_since_checkpoint(
+                input_log_file, output_log_file, log_format, checkpoints.get(input_log_file))
+            print(f"{_('New log lines since the last collection saved to {output_log_file}.').format(output_log_file=output_log_file)}")
+        except Exception as e:
+            print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=input_log_file, e=e)}")
+
+    save_checkpoints(checkpoints)
+
+def probe_timestamp(infile, position, parse_time):
+    # Returns (offset, time) of the first timestamped line starting at or after position.
+    if position == 0:
+        infile.seek(0)
+    else:
+        infile.seek(position - 1)
+        infile.readline()
+    while True:
+        offset = infile.tell()
+        raw_line = infile.readline()
+        if not raw_line:
+            return offset, None
+        log_time = parse_time(raw_line.decode("utf-8", errors="replace"))
+        if log_time:
+            return offset, log_time
+
+def bisect_log_offset(infile, target_time, parse_time, file_size):
+    low, high = 0, file_size
+    while low < high:
+        middle = (low + high) // 2
+        _offset, log_time = probe_timestamp(infile, middle, parse_time)
+        if log_time is None or log_time >= target_time:
+            high = middle
+        else:
+            low = middle + 1
+    offset, _log_time = probe_timestamp(infile, low, parse_time)
+    return offset
+
+def extract_segment_window(segment, part_file, log_format, start_time, end_time):
+    parse_time = log_formats.bind_parser(segment, log_format).parse_time
+    with open(part_file, "wb") as outfile:
+        if segment.endswith(".gz"):
+            infile = gzip.open(segment, "rb")
+            infile_size = None
+        else:
+            infile = open(segment, "rb")
+            infile_size = os.fstat(infile.fileno()).st_size
+        with infile:
+            # Plain segments are entered by bisection on the timestamps; gzip
+            # streams cannot seek and are read from the start instead.
+            current_time = None
+            if infile_size is not None:
+                infile.seek(bisect_log_offset(infile, start_time, parse_time, infile_size))
+            for raw_line in infile:
+                log_time = parse_time(raw_line.decode("utf-8", errors="replace"))
+                if log_time:
+                    if log_time > end_time:
+                        break
+                    current_time = log_time
+                if current_time and current_time >= start_time:
+                    outfile.write(raw_line)
+    return part_file
+
+def extract_atop_window(start_time, end_time):
+    if not shutil.which("atop"):
+        print(_("atop is not installed, skipping the atop window."))
+        return
+    # atop samples are minute-granular; widen the window to whole minutes.
+    # atop keeps one file per day, so a window across midnight is read from
+    # each day's file in turn.
+    begin = start_time.replace(second=0, microsecond=0)
+    end = (end_time + timedelta(minutes=1)).replace(second=0, microsecond=0)
+    day = begin.date()
+    while day <= end.date():
+        day_start = datetime.combine(day, datetime.min.time())
+        day_begin = max(begin, day_start)
+        day_end = min(end, day_start + timedelta(hours=23, minutes=59))
+        day = day + timedelta(days=1)
+        if day_end < day_begin:
+            continue
+        atop_log_file = os.path.join(ATOP_LOG_DIR, f"atop_{day_begin.strftime('%Y%m%d')}")
+        if not os.path.exists(atop_log_file):
+            print(f"{_('Atop log {atop_log_file} not found, skipping.').format(atop_log_file=atop_log_file)}")
+            continue
+        output_atop_file = os.path.join(output_dir, f"atop_{day_begin.strftime('%Y%m%d-%H%M')}_{day_end.strftime('%H%M')}")
+        command = ["atop", "-r", atop_log_file, "-b", day_begin.strftime("%H:%M"), "-e", day_end.strftime("%H:%M"),
+                   "-w", output_atop_file]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode == 0:
+            print(f"{_('Atop samples saved to {output_atop_file}.').format(output_atop_file=output_atop_file)}")
+        else:
+            print(f"{_('Failed to extract atop samples: {error}').format(error=result.stderr.strip())}")
 
-                        current_time = syslog_time
+def extract_logs_around(event_time, span, selected_files=None):
+    start_time = event_time - span
+    end_time = event_time + span
+    os.makedirs(output_dir, exist_ok=True)
 
-                    if current_time and (start_time is None or current_time >= start_time) and (end_time is None or current_time <= end_time):
-                        outfile.write(line)
+    for output_name, input_log_file, log_format in iter_selected_sources(selected_files):
+        if not os.path.exists(input_log_file):
+            print(f"{_('The file {input_log_file} does not exist, skipping.').format(input_log_file=input_log_file)}")
+            continue
 
+        output_log_file = os.path.join(output_dir, output_name)
 
-            print(f"{_('Log file from {start_time} to {end_time} saved to {output_log_file}.').format(start_time=start_time, end_time=end_time, output_log_file=output_log_file)}")
-        except FileNotFoundError:
-            print(f"{_('Log file {input_log_file} not found, skipping.').format(input_log_file=input_log_file)}")
+        try:
+            written = filter_log_segments_by_time(input_log_file, output_log_file, log_format, start_time, end_time,
+                                                  segment_filter=extract_segment_window)
+            report_filtered_log(written, input_log_file, output_log_file, start_time, end_time)
         except Exception as e:
             print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=input_log_file, e=e)}")
 
+    extract_atop_window(start_time, end_time)
+
+def convert_log_to_jsonl(log_file, source, log_format):
+    # Lines without a timestamp of their own (tracebacks, wrapped output) are
+    # folded into the message of the record they follow.
+    parse_record = log_formats.bind_parser(log_file, log_format).parse_record
+    jsonl_file = f"{log_file}.jsonl"
+    with open(log_file, "r", errors="replace") as infile, open(jsonl_file, "w") as outfile:
+        record = None
+        for line in infile:
+            parsed = parse_record(line)
+            if parsed is None:
+                if record is None:
+                    record = {"ts": None, "source": source, "level": None, "logger": None, "message": line.rstrip("\n")}
+                else:
+                    record["message"] += "\n" + line.rstrip("\n")
+                continue
+            if record is not None:
+                outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+            record = {"ts": parsed["ts"], "source": source, "level": parsed["level"],
+                      "logger": parsed["logger"], "message": parsed["message"]}
+        if record is not None:
+            outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.remove(log_file)
+    return jsonl_file
+
+def convert_output_to_jsonl(selected_files=None):
+    for output_name, _input_log_file, log_format in iter_selected_sources(selected_files):
+        output_log_file = os.path.join(output_dir, output_name)
+        if not os.path.exists(output_log_file):
+            continue
+        try:
+            jsonl_file = convert_log_to_jsonl(output_log_file, output_name, log_format)
+            print(f"{_('Structured records saved to {jsonl_file}.').format(jsonl_file=jsonl_file)}")
+        except Exception as e:
+            print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=output_log_file, e=e)}")
+
 def display_software_recent_lines(line_count=10, selected_files=None):
     if not selected_files:
         selected_files = log_files.keys()
@@ -302,8 +707,9 @@ def display_system_recent_lines(line_count=10, selected_files=None):
             print(f"{_('Error processing file {input_log_file}: {e}').format(input_log_file=input_log_file, e=e)}")
 
 
-def create_compressed_archive(output_dir, config_dirs):
-    archive_file = os.path.join(home_dir, f"all_logs_{timestamp}.tar.gz")
+def create_compressed_archive(output_dir, config_dirs, archive_timestamp=None, open_file_manager=True):
+    archive_timestamp = archive_timestamp or timestamp
+    archive_file = os.path.join(home_dir, f"all_logs_{archive_timestamp}.tar.gz")
 
     if not os.path.exists(output_dir):
         print(f"{_('Error: The directory {output_dir} does not exist.').format(output_dir=output_dir)}")
@@ -330,7 +736,9 @@ def create_compressed_archive(output_dir, config_dirs):
         if today_atop_log:
             tar.add(today_atop_log, arcname=os.path.basename(today_atop_log))
     shutil.move(archive_file, output_dir)
-    print(f"{_('Compressed archive created: {output_dir}/all_logs_{timestamp}.tar.gz').format(output_dir=output_dir, timestamp=timestamp)}")
+    print(f"{_('Compressed archive created: {output_dir}/all_logs_{timestamp}.tar.gz').format(output_dir=output_dir, timestamp=archive_timestamp)}")
+    if not open_file_manager:
+        return
     try:
         subprocess.Popen(['gio', 'open', output_dir], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     except Exception:
@@ -347,6 +755,10 @@ if __name__ == "__main__":
         help="Specify the log files to process. Choices: cortex.log, optix.log, prod.log, syslog, kern.log"
     )
 
+    parser.add_argument("--since-last", action="store_true", help="Collect only log lines written since the previous collection")
+    parser.add_argument("--around", help="Collect logs around an event time (format: YYYY-MM-DD HH:MM:SS)")
+    parser.add_argument("--span", default="30s", help="Half-width of the --around window, e.g. 30s, 5m, 1h")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text", help="Output format of the collected logs")
     parser.add_argument("-h", "--help", action="store_true", help="Show help message and examples")
 
     args = parser.parse_args()
@@ -359,7 +771,17 @@ if __name__ == "__main__":
     
     should_create_archive = False
     
-    if args.t:
+    if args.around:
+        try:
+            event_time = datetime.strptime(args.around, "%Y-%m-%d %H:%M:%S")
+            extract_logs_around(event_time, parse_span(args.span), args.f)
+            should_create_archive = True
+        except ValueError:
+            print(_("Invalid --around time or --span. Use 'YYYY-MM-DD HH:MM:SS' and e.g. 30s, 5m, 1h."))
+    elif args.since_last:
+        collect_logs_since_last(args.f)
+        should_create_archive = True
+    elif args.t:
         try:
             start_time = datetime.strptime(args.t[0], "%Y-%m-%d %H:%M:%S")
             end_time = datetime.strptime(args.t[1], "%Y-%m-%d %H:%M:%S") if len(args.t) > 1 else None
@@ -376,6 +798,8 @@ if __name__ == "__main__":
         parser.print_help()
 
     if should_create_archive:
+        if args.format == "jsonl":
+            convert_output_to_jsonl(args.f)
         if output_dir:
             gather_system_info(output_dir)
             create_compressed_archive(output_dir, config_dirs)
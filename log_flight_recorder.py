@@ -0,0 +1,182 @@
+import argparse
+import os
+import re
+import signal
+import time
+from collections import deque
+from datetime import datetime
+import log_collection
+from localization import setup_locale, _
+
+PID_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "log_flight_recorder.pid")
+BUNDLE_DIR = os.path.join(log_collection.home_dir, "flight_recorder")
+
+DEFAULT_RING_LINES = 50000
+DEFAULT_DUMP_MINUTES = 10
+DEFAULT_ERROR_THRESHOLD = 50
+DEFAULT_ERROR_WINDOW = 60
+DEFAULT_COOLDOWN = 300
+POLL_INTERVAL = 0.5
+
+ERROR_LINE_PATTERN = re.compile(r"\b(ERROR|CRITICAL|FATAL)\b")
+KERNEL_TRIGGER_PATTERN = re.compile(r"NVRM: Xid|nvme\d*\S*:.*(timeout|reset|I/O error)|blk_update_request: I/O error", re.IGNORECASE)
+
+
+class LogTail:
+    def __init__(self, path, ring_lines):
+        self.path = path
+        self.ring = deque(maxlen=ring_lines)
+        self.file = None
+        self.inode = None
+        self.pending = ""
+
+    def open(self, from_end):
+        try:
+            self.file = open(self.path, "r", errors="replace")
+        except OSError:
+            self.file = None
+            return
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        if from_end:
+            self.file.seek(0, os.SEEK_END)
+
+    def read_new_lines(self):
+        if self.file is None:
+            self.open(from_end=False)
+            if self.file is None:
+                return []
+        else:
+            try:
+                current = os.stat(self.path)
+            except OSError:
+                current = None
+            if current is not None and (current.st_ino != self.inode or current.st_size < self.file.tell()):
+                # Rotated or truncated: drain what is left of the old file, then switch.
+                lines = self.drain()
+                self.file.close()
+                self.open(from_end=False)
+                return lines + (self.drain() if self.file else [])
+        return self.drain()
+
+    def drain(self):
+        now = time.time()
+        lines = []
+        data = self.pending + self.file.read()
+        if not data:
+            return lines
+        parts = data.split("\n")
+        self.pending = parts.pop()
+        for line in parts:
+            self.ring.append((now, line))
+            lines.append(line)
+        return lines
+
+    def lines_since(self, since):
+        return [line for logged_at, line in self.ring if logged_at >= since]
+
+
+class FlightRecorder:
+    def __init__(self, ring_lines, dump_minutes, error_threshold, error_window, cooldown):
+        self.dump_minutes = dump_minutes
+        self.error_threshold = error_threshold
+        self.error_window = error_window
+        self.cooldown = cooldown
+        self.error_times = deque()
+        self.last_dump = 0.0
+        self.manual_trigger = False
+        self.tails = {}
+        for output_name, input_log_file, _log_format in log_collection.iter_selected_sources():
+            self.tails[output_name] = LogTail(input_log_file, ring_lines)
+
+    def request_dump(self, signum=None, frame=None):
+        self.manual_trigger = True
+
+    def check_triggers(self, output_name, lines):
+        now = time.monotonic()
+        if output_name == "kern.log":
+            for line in lines:
+                if KERNEL_TRIGGER_PATTERN.search(line):
+                    return _("kernel event: {line}").format(line=line.strip())
+        elif output_name in log_collection.log_files:
+            for line in lines:
+                if ERROR_LINE_PATTERN.search(line):
+                    self.error_times.append(now)
+        while self.error_times and self.error_times[0] < now - self.error_window:
+            self.error_times.popleft()
+        if len(self.error_times) >= self.error_threshold:
+            return _("{count} ERROR lines within {window} seconds").format(count=len(self.error_times), window=self.error_window)
+        return None
+
+    def dump(self, reason):
+        bundle_timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output_dir = os.path.join(BUNDLE_DIR, f"flight_{bundle_timestamp}")
+        os.makedirs(output_dir, exist_ok=True)
+        since = time.time() - self.dump_minutes * 60
+        for output_name, tail in self.tails.items():
+            lines = tail.lines_since(since)
+            if lines:
+                with open(os.path.join(output_dir, output_name), "w") as f:
+                    f.write("\n".join(lines) + "\n")
+        with open(os.path.join(output_dir, "trigger.txt"), "w") as f:
+            f.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {reason}\n")
+        log_collection.gather_system_info(output_dir)
+        log_collection.create_compressed_archive(output_dir, log_collection.config_dirs,
+                                                 archive_timestamp=bundle_timestamp, open_file_manager=False)
+        self.error_times.clear()
+        self.last_dump = time.monotonic()
+
+    def run(self):
+        for tail in self.tails.values():
+            tail.open(from_end=True)
+        print(_("Flight recorder started, tracking {count} log files.").format(count=len(self.tails)))
+        while True:
+            reason = None
+            for output_name, tail in self.tails.items():
+                lines = tail.read_new_lines()
+                if lines and reason is None:
+                    reason = self.check_triggers(output_name, lines)
+            if self.manual_trigger:
+                reason = _("manual trigger")
+                self.manual_trigger = False
+                self.last_dump = 0.0
+            if reason and time.monotonic() - self.last_dump >= self.cooldown:
+                print(_("Flight recorder triggered: {reason}").format(reason=reason))
+                self.dump(reason)
+            time.sleep(POLL_INTERVAL)
+
+
+def send_manual_trigger():
+    try:
+        with open(PID_FILE, "r") as f:
+            pid = int(f.read().strip())
+        os.kill(pid, signal.SIGUSR1)
+        print(_("Snapshot requested from flight recorder (pid {pid}).").format(pid=pid))
+    except (FileNotFoundError, ValueError, ProcessLookupError):
+        print(_("Flight recorder is not running."))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep recent log lines in memory and bundle them when errors burst")
+    parser.add_argument("--trigger", action="store_true", help="Ask the running recorder to dump a bundle now")
+    parser.add_argument("--ring-lines", type=int, default=DEFAULT_RING_LINES, help="Lines kept in memory per log file")
+    parser.add_argument("--minutes", type=int, default=DEFAULT_DUMP_MINUTES, help="Minutes of history written to a bundle")
+    parser.add_argument("--error-threshold", type=int, default=DEFAULT_ERROR_THRESHOLD, help="ERROR lines that trigger a bundle")
+    parser.add_argument("--error-window", type=int, default=DEFAULT_ERROR_WINDOW, help="Seconds over which ERROR lines are counted")
+    parser.add_argument("--cooldown", type=int, default=DEFAULT_COOLDOWN, help="Minimum seconds between automatic bundles")
+    args = parser.parse_args()
+
+    if args.trigger:
+        send_manual_trigger()
+        exit(0)
+
+    recorder = FlightRecorder(args.ring_lines, args.minutes, args.error_threshold, args.error_window, args.cooldown)
+    os.makedirs(os.path.dirname(PID_FILE), exist_ok=True)
+    with open(PID_FILE, "w") as f:
+        f.write(str(os.getpid()))
+    signal.signal(signal.SIGUSR1, recorder.request_dump)
+    try:
+        recorder.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(PID_FILE):
+            os.remove(PID_FILE)
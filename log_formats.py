@@ -0,0 +1,184 @@
+import gzip
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+DETECT_LINES = 50
+
+LOG_LEVEL_PATTERN = re.compile(r"\b(TRACE|DEBUG|INFO|WARNING|WARN|ERROR|CRITICAL|FATAL)\b")
+LOGGER_PATTERN = re.compile(r"^[\s\-|:\]]*\[?([\w.\-/]+(?::\d+)?)\]?\s*[-:|]\s")
+SYSLOG_BODY_PATTERN = re.compile(r"^ (\S+) ([^:\[\s]+)(?:\[\d+\])?: ?(.*)$")
+
+MONTHS = {name: index for index, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1)}
+
+LOG_FORMATS = {}
+
+def register_format(format_class):
+    LOG_FORMATS[format_class.name] = format_class
+    return format_class
+
+def to_epoch_ns(log_time, fraction=""):
+    seconds = int(time.mktime(log_time.timetuple()))
+    return seconds * 1_000_000_000 + int((fraction + "000000000")[:9])
+
+def parse_syslog_body(rest):
+    match = SYSLOG_BODY_PATTERN.match(rest)
+    if not match:
+        return None, rest.strip()
+    return match.group(2), match.group(3)
+
+
+class LogFormat(ABC):
+    name = None
+    # Anchored pattern that recognises the first line of an entry in this format.
+    pattern = None
+
+    def __init__(self, reference_time=None):
+        self.reference_time = reference_time or datetime.now()
+
+    @classmethod
+    def matches(cls, line):
+        return cls.pattern.match(line) is not None
+
+    def parse_time(self, line):
+        match = self.pattern.match(line)
+        return self.build_time(match)[0] if match else None
+
+    def parse_record(self, line):
+        match = self.pattern.match(line)
+        if not match:
+            return None
+        log_time, fraction = self.build_time(match)
+        record = {"ts": to_epoch_ns(log_time, fraction), "level": None, "logger": None, "message": ""}
+        self.fill_record(record, line[match.end():].rstrip("\n"))
+        return record
+
+    @abstractmethod
+    def build_time(self, match):
+        # Returns (datetime, fraction of a second as a digit string, "" if none).
+        pass
+
+    def fill_record(self, record, rest):
+        record["logger"], record["message"] = parse_syslog_body(rest)
+        level_match = LOG_LEVEL_PATTERN.search(record["message"], 0, 40)
+        if level_match:
+            record["level"] = level_match.group(1)
+
+
+@register_format
+class AppLogFormat(LogFormat):
+    name = "app"
+    pattern = re.compile(r"^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})[.,](\d+)")
+
+    def build_time(self, match):
+        year, month, day, hour, minute, second, fraction = match.groups()
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second)), fraction
+
+    def fill_record(self, record, rest):
+        level_match = LOG_LEVEL_PATTERN.search(rest, 0, 40)
+        if level_match:
+            record["level"] = level_match.group(1)
+            rest = rest[level_match.end():]
+            logger_match = LOGGER_PATTERN.match(rest)
+            if logger_match:
+                record["logger"] = logger_match.group(1)
+                rest = rest[logger_match.end():]
+        record["message"] = rest.lstrip(" -|:]")
+
+
+@register_format
+class IsoSyslogFormat(LogFormat):
+    # rsyslog RSYSLOG_FileFormat: 2026-10-17T14:03:12.123456+08:00 host tag[pid]: message
+    name = "iso_syslog"
+    pattern = re.compile(r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?")
+
+    def __init__(self, reference_time=None):
+        super().__init__(reference_time)
+        self.timezones = {}
+
+    def build_time(self, match):
+        year, month, day, hour, minute, second, fraction, offset = match.groups()
+        log_time = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+        if offset:
+            # Collected windows are expressed in local time, so convert.
+            tzinfo = self.timezones.get(offset)
+            if tzinfo is None:
+                if offset == "Z":
+                    tzinfo = timezone.utc
+                else:
+                    sign = -1 if offset[0] == "-" else 1
+                    digits = offset[1:].replace(":", "")
+                    tzinfo = timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+                self.timezones[offset] = tzinfo
+            log_time = log_time.replace(tzinfo=tzinfo).astimezone().replace(tzinfo=None)
+        return log_time, fraction or ""
+
+
+@register_format
+class BsdSyslogFormat(LogFormat):
+    # Classic "Oct 17 14:03:12 host tag: message" lines carry no year. It is
+    # inferred from the file's mtime: a month later than the mtime month can
+    # only belong to the previous year.
+    name = "bsd_syslog"
+    pattern = re.compile(r"^(\w{3}) {1,2}(\d{1,2}) (\d{2}):(\d{2}):(\d{2})")
+
+    @classmethod
+    def matches(cls, line):
+        match = cls.pattern.match(line)
+        return match is not None and match.group(1) in MONTHS
+
+    def build_time(self, match):
+        month_name, day, hour, minute, second = match.groups()
+        month = MONTHS[month_name]
+        year = self.reference_time.year
+        if month > self.reference_time.month:
+            year -= 1
+        return datetime(year, month, int(day), int(hour), int(minute), int(second)), ""
+
+    def parse_time(self, line):
+        match = self.pattern.match(line)
+        if not match or match.group(1) not in MONTHS:
+            return None
+        return self.build_time(match)[0]
+
+    def parse_record(self, line):
+        match = self.pattern.match(line)
+        if not match or match.group(1) not in MONTHS:
+            return None
+        return super().parse_record(line)
+
+
+def read_head_lines(path, count=DETECT_LINES):
+    opener = gzip.open if path.endswith(".gz") else open
+    lines = []
+    try:
+        with opener(path, "rt", errors="replace") as f:
+            for line in f:
+                lines.append(line)
+                if len(lines) >= count:
+                    break
+    except (OSError, EOFError):
+        pass
+    return lines
+
+def detect_format(path, default_format):
+    lines = read_head_lines(path)
+    best_format = default_format
+    best_count = 0
+    for name, format_class in LOG_FORMATS.items():
+        count = sum(1 for line in lines if format_class.matches(line))
+        if count > best_count:
+            best_format, best_count = name, count
+    return best_format
+
+def bind_parser(path, default_format):
+    # Detects the format once per file and returns a parser specialised for it,
+    # so per-line parsing never has to guess between formats.
+    try:
+        reference_time = datetime.fromtimestamp(os.stat(path).st_mtime)
+    except OSError:
+        reference_time = None
+    return LOG_FORMATS[detect_format(path, default_format)](reference_time)
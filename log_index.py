@@ -0,0 +1,266 @@
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+import log_collection
+import log_formats
+from time_spans import parse_span
+from localization import setup_locale, _
+
+INDEX_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "log_index.db")
+BATCH_SIZE = 5000
+DEFAULT_MAX_SIZE_MB = 2048
+DEFAULT_INGEST_INTERVAL = 60
+# Searches warn when the last ingest is older than this.
+STALE_INDEX_SECONDS = 10 * DEFAULT_INGEST_INTERVAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER,
+    source TEXT NOT NULL,
+    level TEXT,
+    logger TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (message, tokenize = 'unicode61');
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    last_ts INTEGER
+);
+CREATE TABLE IF NOT EXISTS ingest_info (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    ingested_at INTEGER NOT NULL
+);
+"""
+
+def connect(db_file=INDEX_DB_FILE):
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    is_new = not os.path.exists(db_file)
+    conn = sqlite3.connect(db_file)
+    if is_new:
+        # Must be set before the first table is created to take effect.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def iter_complete_lines(infile):
+    # Yields (line, offset after line); a trailing line without its newline is
+    # left for the next ingest so it is indexed whole.
+    offset = infile.tell()
+    for raw_line in infile:
+        if not raw_line.endswith(b"\n"):
+            break
+        offset += len(raw_line)
+        yield raw_line.decode("utf-8", errors="replace"), offset
+
+def insert_batch(conn, batch):
+    cursor = conn.cursor()
+    for ts, source, level, logger, message in batch:
+        cursor.execute("INSERT INTO entries (ts, source, level, logger) VALUES (?, ?, ?, ?)",
+                       (ts, source, level, logger))
+        cursor.execute("INSERT INTO entries_fts (rowid, message) VALUES (?, ?)", (cursor.lastrowid, message))
+
+def save_batch(conn, batch, state_path, inode, offset, last_ts):
+    # The rows and the offset to resume from are committed together, so an
+    # interrupted ingest never indexes a line twice.
+    with conn:
+        insert_batch(conn, batch)
+        conn.execute("INSERT OR REPLACE INTO ingest_state (path, inode, offset, last_ts) VALUES (?, ?, ?, ?)",
+                     (state_path, inode, offset, last_ts))
+
+def ingest_segment(conn, log_file, source, log_format, start_offset, last_ts, state_path):
+    parse_record = log_formats.bind_parser(log_file, log_format).parse_record
+    batch = []
+    record = None
+    offset = line_start = start_offset
+    with open(log_file, "rb") as infile:
+        inode = os.fstat(infile.fileno()).st_ino
+        infile.seek(start_offset)
+        for line, offset in iter_complete_lines(infile):
+            parsed = parse_record(line)
+            if parsed is None:
+                if record is None:
+                    record = [last_ts, source, None, None, line.rstrip("\n")]
+                else:
+                    record[4] += "\n" + line.rstrip("\n")
+                line_start = offset
+                continue
+            if record is not None:
+                batch.append(tuple(record))
+            if len(batch) >= BATCH_SIZE:
+                # Every record in the batch ends before this line.
+                save_batch(conn, batch, state_path, inode, line_start, last_ts)
+                batch = []
+            record = [parsed["ts"], source, parsed["level"], parsed["logger"], parsed["message"]]
+            last_ts = parsed["ts"]
+            line_start = offset
+        if record is not None:
+            batch.append(tuple(record))
+
+    save_batch(conn, batch, state_path, inode, offset, last_ts)
+    return offset, last_ts
+
+def ingest_source(conn, source, log_file, log_format):
+    row = conn.execute("SELECT inode, offset, last_ts FROM ingest_state WHERE path = ?", (log_file,)).fetchone()
+    live_inode = os.stat(log_file).st_ino
+    if row is None:
+        return ingest_segment(conn, log_file, source, log_format, 0, None, log_file)
+
+    inode, offset, last_ts = row
+    if inode != live_inode:
+        # Rotated since the last ingest: finish the old file if logrotate left
+        # it uncompressed, then start the new live file from the beginning.
+        for segment in log_collection.find_log_segments(log_file):
+            if not segment.endswith(".gz") and segment != log_file and os.stat(segment).st_ino == inode:
+                _offset, last_ts = ingest_segment(conn, segment, source, log_format, offset, last_ts, log_file)
+                break
+        offset = 0
+    elif os.path.getsize(log_file) < offset:
+        offset = 0
+    return ingest_segment(conn, log_file, source, log_format, offset, last_ts, log_file)
+
+def database_size(conn):
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return (page_count - freelist_count) * page_size
+
+def enforce_retention(conn, max_size_bytes):
+    # FTS5 only reclaims space for deleted rows when its segments are merged, so
+    # drop the estimated share of oldest rows in one go, optimize, then re-check.
+    removed = 0
+    size = database_size(conn)
+    while size > max_size_bytes:
+        total = conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+        if not total:
+            break
+        excess = int(total * (1 - max_size_bytes / size) * 1.1) + 1
+        with conn:
+            conn.execute("DELETE FROM entries_fts WHERE rowid IN (SELECT id FROM entries ORDER BY ts LIMIT ?)", (excess,))
+            conn.execute("DELETE FROM entries WHERE id IN (SELECT id FROM entries ORDER BY ts LIMIT ?)", (excess,))
+            conn.execute("INSERT INTO entries_fts (entries_fts) VALUES ('optimize')")
+        removed += min(excess, total)
+        size = database_size(conn)
+    if removed:
+        conn.execute("PRAGMA incremental_vacuum")
+    return removed
+
+def ingest_all(conn, max_size_bytes=DEFAULT_MAX_SIZE_MB * 1024 * 1024):
+    for source, log_file, log_format in log_collection.iter_selected_sources():
+        if not os.path.exists(log_file):
+            continue
+        try:
+            ingest_source(conn, source, log_file, log_format)
+        except Exception as e:
+            print(f"{_('An error occurred while processing log file {input_log_file}: {e}').format(input_log_file=log_file, e=e)}")
+    removed = enforce_retention(conn, max_size_bytes)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO ingest_info (id, ingested_at) VALUES (0, ?)", (int(time.time()),))
+    return removed
+
+def last_ingest_time(conn):
+    row = conn.execute("SELECT ingested_at FROM ingest_info WHERE id = 0").fetchone()
+    return datetime.fromtimestamp(row[0]) if row else None
+
+def index_notice(conn):
+    # Searches only read the index; ingesting is left to "serve" or an
+    # explicit rebuild, so a missing or stale index is pointed out instead.
+    ingested_at = last_ingest_time(conn)
+    if ingested_at is None:
+        return _("The log index has not been built yet. Rebuild it, or run 'log_index.py serve'.")
+    if (datetime.now() - ingested_at).total_seconds() > STALE_INDEX_SECONDS:
+        return _("The log index was last updated at {time}; newer log lines are not searched.").format(
+            time=ingested_at.strftime("%Y-%m-%d %H:%M:%S"))
+    return None
+
+def to_fts_query(keywords):
+    # Each word is quoted so punctuation in log text cannot break FTS syntax.
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in keywords.split())
+
+def search(conn, keywords=None, start_time=None, end_time=None, sources=None, limit=500):
+    clauses = []
+    params = []
+    if keywords:
+        query = ("SELECT e.ts, e.source, e.level, e.logger, f.message FROM entries_fts f "
+                 "JOIN entries e ON e.id = f.rowid WHERE entries_fts MATCH ?")
+        params.append(to_fts_query(keywords))
+    else:
+        query = ("SELECT e.ts, e.source, e.level, e.logger, f.message FROM entries e "
+                 "JOIN entries_fts f ON f.rowid = e.id WHERE 1")
+    if start_time is not None:
+        clauses.append("e.ts >= ?")
+        params.append(log_formats.to_epoch_ns(start_time))
+    if end_time is not None:
+        clauses.append("e.ts <= ?")
+        params.append(log_formats.to_epoch_ns(end_time))
+    if sources:
+        clauses.append("e.source IN ({})".format(",".join("?" * len(sources))))
+        params.extend(sources)
+    for clause in clauses:
+        query += " AND " + clause
+    query += " ORDER BY e.ts DESC LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+def format_result(row):
+    ts, source, level, logger, message = row
+    stamp = datetime.fromtimestamp(ts / 1_000_000_000).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] if ts else "-"
+    return f"{stamp} [{source}] {level or '-'} {logger or '-'}: {message}"
+
+def serve(interval, max_size_bytes):
+    conn = connect()
+    print(_("Log index service started, ingesting every {interval} seconds.").format(interval=interval))
+    while True:
+        started = time.monotonic()
+        ingest_all(conn, max_size_bytes)
+        time.sleep(max(0, interval - (time.monotonic() - started)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental SQLite full-text index of station logs")
+    parser.add_argument("--max-size-mb", type=int, default=DEFAULT_MAX_SIZE_MB, help="Retention cap of the index database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("ingest", help="Load new log lines into the index once")
+
+    serve_parser = subparsers.add_parser("serve", help="Keep ingesting new log lines periodically")
+    serve_parser.add_argument("--interval", type=int, default=DEFAULT_INGEST_INTERVAL, help="Seconds between ingests")
+
+    search_parser = subparsers.add_parser("search", help="Query the index")
+    search_parser.add_argument("keywords", nargs="?", default="", help="Words that must all appear in the message")
+    search_parser.add_argument("--last", help="Only entries from the last span, e.g. 30m, 6h, 3d")
+    search_parser.add_argument("-t", nargs="+", help="Time range: start_time [end_time] (format: YYYY-MM-DD HH:MM:SS)")
+    search_parser.add_argument("-f", nargs="+", help="Only these sources, e.g. unitx_cortex.log syslog")
+    search_parser.add_argument("--limit", type=int, default=500, help="Maximum number of results")
+
+    args = parser.parse_args()
+    max_size_bytes = args.max_size_mb * 1024 * 1024
+
+    if args.command == "ingest":
+        conn = connect()
+        removed = ingest_all(conn, max_size_bytes)
+        print(_("Log index updated, {removed} old entries pruned.").format(removed=removed))
+    elif args.command == "serve":
+        serve(args.interval, max_size_bytes)
+    elif args.command == "search":
+        start_time = end_time = None
+        try:
+            if args.last:
+                start_time = datetime.now() - parse_span(args.last)
+            elif args.t:
+                start_time = datetime.strptime(args.t[0], "%Y-%m-%d %H:%M:%S")
+                end_time = datetime.strptime(args.t[1], "%Y-%m-%d %H:%M:%S") if len(args.t) > 1 else None
+        except ValueError:
+            print(_("Invalid time format. Please use 'YYYY-MM-DD HH:MM:SS'."))
+            exit(1)
+        conn = connect()
+        notice = index_notice(conn)
+        if notice:
+            print(notice)
+        for row in reversed(search(conn, args.keywords, start_time, end_time, args.f, args.limit)):
+            print(format_result(row))
@@ -7,6 +7,7 @@ import subprocess
 from PySide2.QtGui import QFontMetrics
 from language_resources import language_resources
 from localization import setup_locale, _
+import log_index
 
 class LogQueryThread(QThread):
     update_logs_signal = Signal(str)
@@ -39,6 +40,48 @@ class LogQueryThread(QThread):
             self.update_logs_signal.emit(f"ERROR: {str(e)}")
 
 
+class LogSearchThread(QThread):
+    update_logs_signal = Signal(str)
+
+    def __init__(self, keywords, start_time, end_time):
+        super().__init__()
+        self.keywords = keywords
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def run(self):
+        # Only reads the index; it is kept current by "log_index.py serve" or
+        # the Rebuild index button.
+        try:
+            if not os.path.exists(log_index.INDEX_DB_FILE):
+                self.update_logs_signal.emit(_("The log index has not been built yet. Rebuild it, or run 'log_index.py serve'."))
+                return
+            conn = log_index.connect()
+            notice = log_index.index_notice(conn)
+            rows = log_index.search(conn, self.keywords, self.start_time, self.end_time)
+            conn.close()
+            if rows:
+                text = "\n".join(log_index.format_result(row) for row in reversed(rows))
+            else:
+                text = _("No matching log entries found.")
+            self.update_logs_signal.emit(f"{notice}\n\n{text}" if notice else text)
+        except Exception as e:
+            self.update_logs_signal.emit(f"ERROR: {str(e)}")
+
+
+class LogIndexThread(QThread):
+    update_logs_signal = Signal(str)
+
+    def run(self):
+        try:
+            conn = log_index.connect()
+            removed = log_index.ingest_all(conn)
+            conn.close()
+            self.update_logs_signal.emit(_("Log index updated, {removed} old entries pruned.").format(removed=removed))
+        except Exception as e:
+            self.update_logs_signal.emit(f"ERROR: {str(e)}")
+
+
 class LogViewer(QWidget):
     def __init__(self):
         super().__init__()
@@ -103,6 +146,21 @@ class LogViewer(QWidget):
         self.collect_logs_button.clicked.connect(self.collect_logs)
         top_layout.addWidget(self.collect_logs_button)
 
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText(_("Search keywords in the selected time period, e.g. camera timeout"))
+        self.search_input.returnPressed.connect(self.search_logs)
+        self.search_button = QPushButton(_("Search"), self)
+        self.search_button.setFixedSize(100, 30)
+        self.search_button.clicked.connect(self.search_logs)
+        self.rebuild_index_button = QPushButton(_("Rebuild index"), self)
+        self.rebuild_index_button.setFixedSize(120, 30)
+        self.rebuild_index_button.clicked.connect(self.rebuild_index)
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.search_button)
+        search_layout.addWidget(self.rebuild_index_button)
+        top_layout.addLayout(search_layout)
+
         top_layout.setSpacing(10)
         filter_time_layout.setSpacing(10)
         filter_lines_layout.setSpacing(10)
@@ -166,6 +224,25 @@ class LogViewer(QWidget):
         self.log_query_thread.update_logs_signal.connect(self.update_logs_display)
         self.log_query_thread.start()
 
+    def search_logs(self):
+        keywords = self.search_input.text().strip()
+        if not keywords:
+            return
+        self.log_viewer_output_area.setPlainText(_("Searching the log index, please wait..."))
+        start_time = self.start_datetime_edit.dateTime().toPython()
+        end_time = self.end_datetime_edit.dateTime().toPython()
+        self.log_search_thread = LogSearchThread(keywords, start_time, end_time)
+        self.log_search_thread.update_logs_signal.connect(self.update_logs_display)
+        self.log_search_thread.start()
+
+    def rebuild_index(self):
+        self.log_viewer_output_area.setPlainText(_("Updating the log index, please wait..."))
+        self.rebuild_index_button.setEnabled(False)
+        self.log_index_thread = LogIndexThread()
+        self.log_index_thread.update_logs_signal.connect(self.update_logs_display)
+        self.log_index_thread.finished.connect(lambda: self.rebuild_index_button.setEnabled(True))
+        self.log_index_thread.start()
+
     def update_logs_display(self, logs):
         self.log_viewer_output_area.setPlainText(logs)
 
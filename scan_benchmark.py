@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from file_scan_engine import ScanEngine, TraversalPolicy, default_worker_count
+from file_size_index import SizeIndex, DirectoryTotals
+from large_file_scan import parse_size
+
+def size_sampler(spec, rng):
+    # fixed:4K, uniform:1K-10M, lognormal:64K (median), mixed (image dataset
+    # with a few model checkpoints).
+    kind, _separator, argument = spec.partition(":")
+    if kind == "fixed":
+        size = parse_size(argument or "4K")
+        return lambda: size
+    if kind == "uniform":
+        low, high = (parse_size(part) for part in (argument or "1K-1M").split("-"))
+        return lambda: rng.randint(low, high)
+    if kind == "lognormal":
+        median = parse_size(argument or "64K")
+        return lambda: int(rng.lognormvariate(0, 1.5) * median)
+    if kind == "mixed":
+        return lambda: rng.randint(256 * 1024 ** 2, 4 * 1024 ** 3) if rng.random() < 0.01 else rng.randint(20 * 1024, 2 * 1024 ** 2)
+    raise ValueError(spec)
+
+def generate_tree(root, files, fanout, depth, sizes="lognormal", symlink_loops=0, denied_dirs=0, seed=0):
+    rng = random.Random(seed)
+    next_size = size_sampler(sizes, rng)
+    directories = [root]
+    level = [root]
+    for _depth in range(depth):
+        level = [os.path.join(parent, f"d{index}") for parent in level for index in range(fanout)]
+        directories.extend(level)
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    # Files are sparse: millions of "large" files cost inodes but almost no
+    # disk space or write time.
+    for index in range(files):
+        path = os.path.join(directories[index % len(directories)], f"f{index}")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, next_size())
+        finally:
+            os.close(fd)
+
+    # A scanner that followed symlinks would never finish on these.
+    for index, directory in enumerate(rng.sample(directories, min(symlink_loops, len(directories)))):
+        os.symlink(root if index % 2 else "..", os.path.join(directory, f"loop{index}"))
+
+    # Running as root bypasses the mode bits, so these only exercise the
+    # PermissionError path for ordinary users.
+    for index, directory in enumerate(rng.sample(directories[1:], min(denied_dirs, len(directories) - 1))):
+        denied = os.path.join(directory, f"denied{index}")
+        os.makedirs(denied, exist_ok=True)
+        for file_index in range(10):
+            open(os.path.join(denied, f"f{file_index}"), "w").close()
+        os.chmod(denied, 0)
+    return len(directories)
+
+def remove_tree(root):
+    for directory, subdirectories, _files in os.walk(root):
+        for name in subdirectories:
+            path = os.path.join(directory, name)
+            if not os.path.islink(path) and not stat.S_IMODE(os.lstat(path).st_mode):
+                os.chmod(path, 0o755)
+    shutil.rmtree(root)
+
+def scan_once(root, workers, incremental):
+    # One engine run the way FileScanner drives it: index, totals and all.
+    previous_index = None
+    if incremental:
+        previous_index = SizeIndex(root)
+        ScanEngine(root, 1024 ** 3, policy=TraversalPolicy(exclude_paths=()), workers=workers, index=previous_index).run()
+    index = SizeIndex(root)
+    engine = ScanEngine(root, 1024 ** 3, policy=TraversalPolicy(exclude_paths=()), workers=workers,
+                        index=index, previous_index=previous_index)
+    started = time.perf_counter()
+    engine.run()
+    DirectoryTotals(index)
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_seconds": elapsed,
+        "files": engine.processed_files,
+        "entries": len(index),
+        "reused_directories": engine.reused_directories,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def walk_once(root):
+    # The single-threaded os.walk() and stat() loop the engine replaced, as the
+    # baseline the speedup is measured against.
+    files = 0
+    started = time.perf_counter()
+    for directory, _subdirectories, names in os.walk(root):
+        for name in names:
+            try:
+                os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            files += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed_seconds": elapsed,
+        "files": files,
+        "entries": files,
+        "reused_directories": 0,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+def parse_strace_total(summary):
+    # Calls in the "total" row of strace -c, located through the header: the
+    # errors column may be empty, and its position differs between versions.
+    calls_column = None
+    for line in summary.splitlines():
+        fields = line.replace("% time", "time").split()
+        if "calls" in fields and "syscall" in fields:
+            calls_column = fields.index("calls")
+        elif calls_column is not None and fields and fields[-1] == "total" and len(fields) > calls_column:
+            return int(fields[calls_column]) if fields[calls_column].isdigit() else None
+    return None
+
+def count_syscalls(root, workers, incremental):
+    # Re-runs the scan under strace -c; the total includes interpreter start-up,
+    # which is constant and small next to a tree of any real size.
+    strace = shutil.which("strace")
+    if not strace:
+        return None
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as summary:
+        command = [strace, "-f", "-c", "-o", summary.name, sys.executable, os.path.abspath(__file__),
+                   "scan", "--root", root, "--workers", str(workers)]
+        if incremental:
+            command.append("--incremental")
+        # ptrace is often denied in containers; the count is then unavailable.
+        try:
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        except (subprocess.CalledProcessError, OSError):
+            return None
+        return parse_strace_total(summary.read())
+
+def timed_runs(command, repeat):
+    runs = []
+    for _run in range(repeat):
+        # A fresh process per run keeps peak RSS per run and the page cache warm.
+        output = subprocess.run(command, stdout=subprocess.PIPE, check=True, text=True).stdout
+        runs.append(json.loads(output))
+    return runs
+
+def run_benchmark(root, workers, repeat, incremental, syscalls, baseline=False):
+    command = [sys.executable, os.path.abspath(__file__), "scan", "--root", root, "--workers", str(workers)]
+    if incremental:
+        command.append("--incremental")
+    runs = timed_runs(command, repeat)
+    best = min(runs, key=lambda run: run["elapsed_seconds"])
+    result = {
+        "root": root,
+        "workers": workers,
+        "incremental": incremental,
+        "files": best["files"],
+        "entries": best["entries"],
+        "best_seconds": round(best["elapsed_seconds"], 3),
+        "median_seconds": round(sorted(run["elapsed_seconds"] for run in runs)[len(runs) // 2], 3),
+        "files_per_second": round(best["files"] / best["elapsed_seconds"]) if best["elapsed_seconds"] else None,
+        "peak_rss_mb": round(max(run["peak_rss_kb"] for run in runs) / 1024, 1),
+        "syscalls_per_file": None,
+    }
+    if baseline:
+        walk_best = min(run["elapsed_seconds"] for run in timed_runs(
+            [sys.executable, os.path.abspath(__file__), "scan", "--root", root, "--walk"], repeat))
+        result["os_walk_seconds"] = round(walk_best, 3)
+        result["speedup"] = round(walk_best / best["elapsed_seconds"], 2) if best["elapsed_seconds"] else None
+    if syscalls:
+        total = count_syscalls(root, workers, incremental)
+        if total is not None and best["files"]:
+            result["syscalls_per_file"] = round(total / best["files"], 2)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the large-file scan engine on synthetic trees")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="Build a synthetic directory tree")
+    generate_parser.add_argument("--root", required=True, help="Directory to create the tree in (local disk or tmpfs)")
+    generate_parser.add_argument("--files", type=int, default=10000, help="Number of files, e.g. 10000 to 5000000")
+    generate_parser.add_argument("--fanout", type=int, default=10, help="Subdirectories per directory")
+    generate_parser.add_argument("--depth", type=int, default=3, help="Directory levels below the root")
+    generate_parser.add_argument("--sizes", default="lognormal", help="fixed:SIZE, uniform:MIN-MAX, lognormal:MEDIAN or mixed")
+    generate_parser.add_argument("--symlink-loops", type=int, default=0, help="Symlinks pointing back up the tree")
+    generate_parser.add_argument("--denied-dirs", type=int, default=0, help="Subtrees without read permission")
+    generate_parser.add_argument("--seed", type=int, default=0, help="Random seed")
+
+    run_parser = subparsers.add_parser("run", help="Time the scan engine on a tree")
+    run_parser.add_argument("--root", required=True, help="Tree to scan")
+    run_parser.add_argument("--workers", type=int, default=default_worker_count(), help="Scanner threads")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Runs; the best and median are reported")
+    run_parser.add_argument("--incremental", action="store_true", help="Time a rescan that reuses a fresh size index")
+    run_parser.add_argument("--syscalls", action="store_true", help="Count system calls with strace (slow)")
+    run_parser.add_argument("--baseline", action="store_true", help="Also time a single-threaded os.walk() scan")
+
+    scan_parser = subparsers.add_parser("scan", help=argparse.SUPPRESS)
+    scan_parser.add_argument("--root", required=True)
+    scan_parser.add_argument("--workers", type=int, default=default_worker_count())
+    scan_parser.add_argument("--incremental", action="store_true")
+    scan_parser.add_argument("--walk", action="store_true")
+
+    clean_parser = subparsers.add_parser("clean", help="Remove a generated tree, including denied subtrees")
+    clean_parser.add_argument("--root", required=True)
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        started = time.perf_counter()
+        directories = generate_tree(os.path.abspath(args.root), args.files, args.fanout, args.depth, args.sizes,
+                                    args.symlink_loops, args.denied_dirs, args.seed)
+        print(f"Generated {args.files} files in {directories} directories in {time.perf_counter() - started:.1f}s")
+    elif args.command == "run":
+        try:
+            result = run_benchmark(os.path.abspath(args.root), args.workers, args.repeat, args.incremental,
+                                   args.syscalls, args.baseline)
+        except subprocess.CalledProcessError as e:
+            print(f"Scan run failed with exit code {e.returncode}", file=sys.stderr)
+            exit(1)
+        print(json.dumps(result, indent=2))
+    elif args.command == "scan":
+        root = os.path.abspath(args.root)
+        print(json.dumps(walk_once(root) if args.walk else scan_once(root, args.workers, args.incremental)))
+    elif args.command == "clean":
+        remove_tree(os.path.abspath(args.root))
@@ -0,0 +1,46 @@
+import os
+from duplicate_finder import edge_hash, find_duplicates, reclaimable_bytes, EDGE_SIZE
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_edge_hash_reads_files_between_one_and_two_edges_whole(tmp_path):
+    size = EDGE_SIZE + 30000
+    base = os.urandom(size)
+    changed = bytearray(base)
+    changed[EDGE_SIZE + 100] ^= 0xFF
+    first = write(tmp_path / "first", base)
+    second = write(tmp_path / "second", bytes(changed))
+    assert edge_hash(first, size) != edge_hash(second, size)
+    assert find_duplicates({size: [first, second]}, workers=2) == []
+
+
+def test_edge_hash_ignores_the_middle_of_large_files(tmp_path):
+    size = 3 * EDGE_SIZE
+    base = os.urandom(size)
+    changed = bytearray(base)
+    changed[size // 2] ^= 0xFF
+    first = write(tmp_path / "first", base)
+    second = write(tmp_path / "second", bytes(changed))
+    assert edge_hash(first, size) == edge_hash(second, size)
+    # The full hash still tells them apart.
+    assert find_duplicates({size: [first, second]}, workers=2) == []
+
+
+def test_find_duplicates_groups_identical_files(tmp_path):
+    data = os.urandom(3 * EDGE_SIZE)
+    copies = [write(tmp_path / f"copy{index}", data) for index in range(3)]
+    other = write(tmp_path / "other", os.urandom(len(data)))
+    small = [write(tmp_path / f"small{index}", b"s" * 100) for index in range(2)]
+    duplicates = find_duplicates({len(data): copies + [other], 100: small}, workers=2)
+    assert [(size, sorted(paths)) for size, paths in duplicates] == [(len(data), sorted(copies)), (100, sorted(small))]
+    assert reclaimable_bytes(duplicates) == 2 * len(data) + 100
+
+
+def test_unreadable_candidates_drop_out(tmp_path):
+    data = b"d" * 1000
+    present = write(tmp_path / "present", data)
+    assert find_duplicates({1000: [present, str(tmp_path / "gone")]}, workers=1) == []
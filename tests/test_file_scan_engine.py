@@ -0,0 +1,92 @@
+import os
+import pytest
+from file_scan_engine import ScanEngine, TraversalPolicy, read_mountinfo
+from file_size_index import SizeIndex, DirectoryTotals
+
+
+def make_tree(root):
+    (root / "a" / "deep").mkdir(parents=True)
+    (root / "b").mkdir()
+    (root / "a" / "big.bin").write_bytes(b"x" * 5000)
+    (root / "a" / "deep" / "small.txt").write_bytes(b"y" * 10)
+    (root / "b" / "mid.dat").write_bytes(b"z" * 700)
+    os.link(root / "b" / "mid.dat", root / "b" / "mid.link")
+
+
+def scan(root, previous_index=None, min_size=0):
+    found = []
+    index = SizeIndex(str(root))
+    engine = ScanEngine(str(root), min_size, policy=TraversalPolicy(exclude_paths=[]), workers=4,
+                        on_file=lambda path, size: found.append((path, size)), index=index,
+                        previous_index=previous_index)
+    assert engine.run()
+    return engine, index, found
+
+
+def test_scan_records_every_entry_and_counts_hardlinks_once(tmp_path):
+    make_tree(tmp_path)
+    engine, index, found = scan(tmp_path, min_size=600)
+    assert engine.processed_files == 4
+    assert sorted(size for _path, size in found) == [700, 5000]
+    totals = DirectoryTotals(index)
+    assert totals.apparent[0] == 5710
+    assert totals.files[0] == 3
+    assert engine.largest_files()[0] == (5000, str(tmp_path / "a" / "big.bin"))
+
+
+def test_incremental_scan_reuses_directories_but_sees_grown_files(tmp_path):
+    make_tree(tmp_path)
+    _engine, previous, _found = scan(tmp_path)
+    deep = tmp_path / "a" / "deep"
+    mtime = deep.stat().st_mtime_ns
+    with open(deep / "small.txt", "ab") as f:
+        f.write(b"y" * 990)
+    assert deep.stat().st_mtime_ns == mtime
+
+    engine, index, _found = scan(tmp_path, previous_index=previous)
+    assert engine.reused_directories > 0
+    assert DirectoryTotals(index).apparent[0] == 5710 + 990
+    assert sorted(index.path(node_id) for node_id in range(len(index))) == \
+        sorted(previous.path(node_id) for node_id in range(len(previous)))
+
+
+def test_incremental_scan_drops_files_removed_in_place(tmp_path):
+    make_tree(tmp_path)
+    _engine, previous, _found = scan(tmp_path)
+    (tmp_path / "a" / "deep" / "small.txt").unlink()
+    engine, index, _found = scan(tmp_path, previous_index=previous)
+    assert engine.processed_files == 3
+    assert str(tmp_path / "a" / "deep" / "small.txt") not in {index.path(node_id) for node_id in range(len(index))}
+
+
+def test_policy_prunes_excluded_paths_and_names(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "lost+found").mkdir()
+    (tmp_path / "lost+found" / "orphan").write_bytes(b"o")
+    policy = TraversalPolicy(exclude_paths=[str(tmp_path / "b")], mounts={})
+    engine = ScanEngine(str(tmp_path), 0, policy=policy, workers=2)
+    engine.run()
+    assert engine.processed_files == 2
+
+
+def test_read_mountinfo_decodes_octal_escapes_only(tmp_path):
+    mountinfo = tmp_path / "mountinfo"
+    mountinfo.write_bytes(b"36 25 0:32 / /mnt/my\\040disk rw shared:1 - ext4 /dev/sda1 rw\n"
+                          b"37 25 0:33 / /mnt/caf\xc3\xa9\\134n rw - xfs /dev/sdb rw\n"
+                          b"38 25 0:34 / /mnt/raw\xff rw - nfs server:/ rw\n"
+                          b"garbage\n")
+    assert read_mountinfo(str(mountinfo)) == {
+        "/mnt/my disk": "ext4",
+        "/mnt/café\\n": "xfs",
+        os.fsdecode(b"/mnt/raw\xff"): "nfs",
+    }
+    assert read_mountinfo(str(tmp_path / "missing")) == {}
+
+
+def test_policy_crosses_only_allowed_filesystems():
+    mounts = {"/mnt/usb": "vfat", "/mnt/share": "nfs"}
+    assert not TraversalPolicy(mounts=mounts).may_cross("/mnt/usb")
+    policy = TraversalPolicy(one_filesystem=False, mounts=mounts)
+    assert policy.may_cross("/mnt/usb")
+    assert not policy.may_cross("/mnt/share")
+    assert TraversalPolicy(allowed_mounts=["/mnt/share"], mounts=mounts).may_cross("/mnt/share")
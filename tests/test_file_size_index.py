@@ -0,0 +1,69 @@
+import os
+from types import SimpleNamespace
+from file_size_index import (SizeIndex, DirectoryTotals, grown_since, KIND_FILE, KIND_DIR,
+                             KIND_LINK_FIRST, KIND_LINK_DUPLICATE)
+
+
+def directory_stat():
+    return SimpleNamespace(st_blocks=8, st_mtime_ns=1, st_ino=1)
+
+
+def build_index():
+    # /data: a/ (x 100, y 50 and a hardlink pair of 30), b/ (z 7)
+    index = SizeIndex("/data")
+    root = index.add_root(directory_stat())
+    a, b = index.add_entries(root, [(b"a", KIND_DIR, 0, 4096, 1, 2), (b"b", KIND_DIR, 0, 4096, 1, 3)])
+    index.add_entries(a, [(b"x", KIND_FILE, 100, 4096, 1, 10), (b"y", KIND_FILE, 50, 4096, 1, 11),
+                          (b"l1", KIND_LINK_FIRST, 30, 4096, 1, 12), (b"l2", KIND_LINK_DUPLICATE, 30, 4096, 1, 12)])
+    index.add_entries(b, [(b"z", KIND_FILE, 7, 4096, 1, 13)])
+    return index
+
+
+def test_paths_and_children():
+    index = build_index()
+    a = index.children(0)[b"a"]
+    assert index.path(index.children(a)[b"y"]) == "/data/a/y"
+    assert sorted(index.children(a)) == [b"l1", b"l2", b"x", b"y"]
+    assert index.children(index.children(a)[b"x"]) == {}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    index_file = str(tmp_path / "data.idx")
+    index.save(index_file)
+    loaded = SizeIndex.load(index_file)
+    assert loaded.root == "/data"
+    assert len(loaded) == len(index)
+    for column, _typecode in SizeIndex.COLUMNS:
+        assert getattr(loaded, column) == getattr(index, column)
+    assert [loaded.path(node_id) for node_id in range(len(loaded))] == [index.path(node_id) for node_id in range(len(index))]
+
+
+def test_load_rejects_other_files(tmp_path):
+    (tmp_path / "bad.idx").write_bytes(b"not an index")
+    assert SizeIndex.load(str(tmp_path / "bad.idx")) is None
+    assert SizeIndex.load(str(tmp_path / "missing.idx")) is None
+
+
+def test_directory_totals_count_hardlinks_once():
+    index = build_index()
+    totals = DirectoryTotals(index)
+    a = index.children(0)[b"a"]
+    assert totals.apparent[a] == 180
+    assert totals.files[a] == 3
+    assert totals.apparent[0] == 187
+    assert totals.files[0] == 4
+    assert totals.allocated[0] == 8 * 512 + 2 * 4096 + 4 * 4096
+    assert [entry[0] for entry in totals.top_directories()] == ["/data/a", "/data/b"]
+    assert totals.sorted_children(0) == [a, index.children(0)[b"b"]]
+
+
+def test_grown_since_counts_new_files_from_zero():
+    previous = build_index()
+    current = SizeIndex("/data")
+    root = current.add_root(directory_stat())
+    a, = current.add_entries(root, [(b"a", KIND_DIR, 0, 4096, 2, 2)])
+    current.add_entries(a, [(b"x", KIND_FILE, 160, 4096, 2, 10), (b"y", KIND_FILE, 10, 4096, 2, 11),
+                            (b"new", KIND_FILE, 40, 4096, 2, 14)])
+    assert grown_since(previous, current) == [("/data/a/x", 60, 160), ("/data/a/new", 40, 40)]
+    assert grown_since(SizeIndex("/data"), current) == []
@@ -0,0 +1,43 @@
+import os
+import pytest
+import inode_hotspots
+from inode_hotspots import find_hotspots, subtree_totals
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(inode_hotspots, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+
+def fill(directory, count, prefix="f"):
+    directory.mkdir(parents=True, exist_ok=True)
+    for number in range(count):
+        (directory / f"{prefix}{number}").touch()
+
+
+def test_subtree_totals_roll_up_into_ancestors():
+    counts = {"/r": 2, "/r/a": 3, "/r/a/b": 4, "/r/c": 1}
+    assert subtree_totals(counts) == {"/r": 10, "/r/a": 7, "/r/a/b": 4, "/r/c": 1}
+
+
+def test_hotspots_rank_directories_by_entries(tmp_path):
+    root = tmp_path / "tree"
+    fill(root / "many", 30)
+    fill(root / "few" / "inner", 5)
+    result = find_hotspots(str(root), top=2, save=False)
+    assert result["entries"] == 30 + 5 + 1 + 2
+    assert [entry["path"] for entry in result["top_directories"]] == [str(root / "many"), str(root / "few" / "inner")]
+    assert result["top_subtrees"][0] == {"path": str(root), "subtree_entries": 38}
+
+
+def test_growth_is_only_reported_against_the_previous_snapshot(tmp_path):
+    root = tmp_path / "tree"
+    fill(root / "steady", 99)
+    fill(root / "small", 3)
+    find_hotspots(str(root))
+    fill(root / "steady", 1, prefix="new")
+    fill(root / "small", 50, prefix="new")
+    fill(root / "created", 40)
+    result = find_hotspots(str(root))
+    # "small" and the root were below the snapshot floor, "created" did not exist.
+    assert result["grown_directories"] == [{"path": str(root / "steady"), "growth": 1, "entries": 100}]
@@ -0,0 +1,78 @@
+import os
+import subprocess
+from datetime import datetime
+import pytest
+import integrity_events
+from integrity_events import (append_events, change_record, connect, enforce_retention, query_events,
+                              DiffCache, STORE_GIT, STORE_HASH)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    conn = connect(str(tmp_path / "journal.db"))
+    yield conn
+    conn.close()
+
+
+def record(path, ts, kind="modified"):
+    entry = change_record(kind, path, "a", "b", STORE_HASH, size=10, size_delta=1)
+    entry["ts"] = ts
+    return entry
+
+
+def test_under_matches_the_path_and_its_subtree_only(journal):
+    paths = ["/home/u/app", "/home/u/app/a.py", "/home/u/app/sub/b.py", "/home/u/app2/c.py", "/home/u/apq"]
+    append_events(journal, [record(path, index) for index, path in enumerate(paths)])
+    assert [row["path"] for row in query_events(journal, "/home/u/app/")] == paths[2::-1]
+    assert [row["path"] for row in query_events(journal, "/home/u/app/a.py")] == ["/home/u/app/a.py"]
+    assert len(query_events(journal)) == len(paths)
+
+
+def test_time_kind_and_keyset_paging(journal):
+    base = datetime(2026, 10, 17, 12, 0, 0)
+    start_ns = integrity_events.to_epoch_ns(base)
+    append_events(journal, [record(f"/p/{index}", start_ns + index * 1_000_000_000, "added" if index % 2 else "deleted")
+                            for index in range(10)])
+    first = query_events(journal, limit=4)
+    second = query_events(journal, before_id=first[-1]["id"], limit=4)
+    assert [row["path"] for row in first + second] == [f"/p/{index}" for index in range(9, 1, -1)]
+    window = query_events(journal, start_time=datetime(2026, 10, 17, 12, 0, 3), end_time=datetime(2026, 10, 17, 12, 0, 6),
+                          kinds=["added"])
+    assert [row["path"] for row in window] == ["/p/5", "/p/3"]
+
+
+def test_dense_subtrees_give_the_same_pages(journal, monkeypatch):
+    append_events(journal, [record(f"/busy/{index % 7}", index) for index in range(50)]
+                  + [record("/quiet/file", 100)])
+    sparse = query_events(journal, "/busy", limit=10)
+    monkeypatch.setattr(integrity_events, "DENSE_PATH_MATCHES", 5)
+    dense = query_events(journal, "/busy", limit=10)
+    assert dense == sparse
+    assert [row["id"] for row in dense] == sorted((row["id"] for row in dense), reverse=True)
+
+
+def test_retention_keeps_the_newest_events(journal):
+    append_events(journal, [record(f"/p/{index}", index) for index in range(20)])
+    assert enforce_retention(journal, 5) == 15
+    assert [row["path"] for row in query_events(journal)] == [f"/p/{index}" for index in range(19, 14, -1)]
+
+
+def test_diff_cache_pages_git_blob_diffs(tmp_path):
+    repo = str(tmp_path / "repo")
+    subprocess.run(["git", "init", "-q", repo], check=True)
+
+    def blob(text):
+        return subprocess.run(["git", "-C", repo, "hash-object", "-w", "--stdin"], input=text, text=True,
+                              stdout=subprocess.PIPE, check=True).stdout.strip()
+
+    old = blob("".join(f"line {index}\n" for index in range(30)))
+    new = blob("".join(f"line {index}\n" for index in range(30) if index != 12))
+    cache = DiffCache(repo, size=1, page_lines=5)
+    entry = change_record("modified", "/x", old, new, STORE_GIT)
+    pages = cache.pages(entry)
+    assert "-line 12" in "\n".join(pages)
+    assert all(len(page.splitlines()) <= 5 for page in pages)
+    assert cache.pages(entry) is pages
+    added = cache.pages(change_record("added", "/y", None, new, STORE_GIT))
+    assert "+line 29" in "\n".join(added)
+    assert list(cache.cache) == [(STORE_GIT, "/y", None, new)]
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import time
+import pytest
+import integrity_maintenance
+from integrity_maintenance import git, repository_stats, run_maintenance, squash_history, tune_repository
+
+DAY = 86400
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = str(tmp_path / "repo")
+    subprocess.run(["git", "init", "-q", root], check=True)
+    return root
+
+
+def commit(root, name, text, age_days):
+    with open(os.path.join(root, name), "w") as f:
+        f.write(text)
+    stamp = f"{int(time.time()) - age_days * DAY} +0000"
+    env = {"GIT_AUTHOR_NAME": "a", "GIT_AUTHOR_EMAIL": "a@x", "GIT_COMMITTER_NAME": "c",
+           "GIT_COMMITTER_EMAIL": "c@x", "GIT_AUTHOR_DATE": stamp, "GIT_COMMITTER_DATE": stamp}
+    git(root, "add", name)
+    assert git(root, "commit", "-q", "-m", f"change {name} {text}", env=env).returncode == 0
+    return git(root, "rev-parse", "HEAD:" + name).stdout.strip()
+
+
+def test_squash_replaces_old_history_and_keeps_recent_commits(repo, monkeypatch):
+    monkeypatch.setattr(integrity_maintenance, "SQUASH_MIN_COMMITS", 3)
+    old_blob = commit(repo, "f", "v0", 200)
+    for version in range(1, 5):
+        commit(repo, "f", f"v{version}", 200 - version)
+    commit(repo, "g", "recent 1", 5)
+    commit(repo, "f", "recent 2", 1)
+    tree = git(repo, "rev-parse", "HEAD^{tree}").stdout
+    recent = git(repo, "log", "-2", "--format=%s%x00%an%x00%cI").stdout
+
+    assert squash_history(repo, 90) == 5
+    assert git(repo, "rev-parse", "HEAD^{tree}").stdout == tree
+    assert git(repo, "log", "-2", "--format=%s%x00%an%x00%cI").stdout == recent
+    assert git(repo, "rev-list", "--count", "HEAD").stdout.strip() == "3"
+    assert git(repo, "log", "--format=%s").stdout.splitlines()[-1].startswith("Baseline: 5 commits")
+    assert git(repo, "cat-file", "-e", old_blob).returncode != 0
+    assert git(repo, "fsck", "--no-progress").returncode == 0
+
+
+def test_squash_waits_for_enough_old_commits(repo):
+    commit(repo, "f", "old", 200)
+    commit(repo, "f", "new", 1)
+    head = git(repo, "rev-parse", "HEAD").stdout
+    assert squash_history(repo, 90) == 0
+    assert git(repo, "rev-parse", "HEAD").stdout == head
+
+
+def test_maintenance_tunes_and_packs(repo, monkeypatch):
+    monkeypatch.setattr(integrity_maintenance, "LOOSE_OBJECT_LIMIT", 1)
+    commit(repo, "f", "content", 1)
+    tune_repository(repo)
+    assert git(repo, "config", "--get", "index.version").stdout.strip() == "4"
+    report = run_maintenance(repo, retention_days=90)
+    assert report["actions"] == ["packed loose objects"]
+    assert report["after"]["count"] == 0
+    assert repository_stats(repo)["commits"] == 1
@@ -0,0 +1,123 @@
+import os
+import pytest
+import integrity_manifest
+from integrity_manifest import MappedManifest, Manifest, ManifestDelta, ADDED, DELETED, MODIFIED, TOUCHED
+
+DIGEST = b"\0" * 16
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    manifest_file = str(tmp_path / "manifest.bin")
+    paths = ["/r/b/two", "/r/a", "/r/b/one", "/r/b.txt", "/r/c/x", "/r/b/three"]
+    MappedManifest.write(manifest_file, [(path, (len(path), 1, index, DIGEST)) for index, path in enumerate(paths)])
+    manifest = MappedManifest(manifest_file)
+    yield manifest
+    manifest.close()
+
+
+def test_records_are_sorted_and_found_by_binary_search(mapped):
+    assert [path for path, _entry in mapped.items()] == sorted(["/r/b/two", "/r/a", "/r/b/one", "/r/b.txt", "/r/c/x", "/r/b/three"])
+    assert mapped.get("/r/b/one") == (len("/r/b/one"), 1, 2, DIGEST)
+    assert mapped.get("/r/b") is None
+    assert mapped.get("/r/zzz") is None
+    assert mapped.lower_bound(b"/") == 0
+    assert mapped.lower_bound(b"/z") == len(mapped)
+
+
+def test_prefix_lookup_stops_at_siblings(mapped):
+    assert list(mapped.paths_with_prefix("/r/b/")) == ["/r/b/one", "/r/b/three", "/r/b/two"]
+    assert list(mapped.paths_with_prefix("/r/q/")) == []
+
+
+def test_non_manifest_files_are_rejected(tmp_path):
+    (tmp_path / "other").write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        MappedManifest(str(tmp_path / "other"))
+
+
+def test_check_reports_changes_against_the_saved_baseline(tmp_path):
+    root = tmp_path / "root"
+    (root / "sub").mkdir(parents=True)
+    (root / "keep").write_text("keep")
+    (root / "edit").write_text("old")
+    (root / "sub" / "gone").write_text("gone")
+    (root / "touch").write_text("same")
+    manifest_file = str(tmp_path / "manifest.bin")
+
+    manifest = Manifest(roots=[str(root)])
+    assert {change for change, _path in manifest.check()} == {ADDED}
+    manifest.save(manifest_file)
+
+    manifest = Manifest.load(manifest_file, roots=[str(root)])
+    assert len(manifest) == 4
+    (root / "edit").write_text("new content")
+    (root / "sub" / "gone").unlink()
+    os.utime(root / "touch", ns=(1, 1))
+    (root / "added").write_text("added")
+    changes = manifest.check(entries=True)
+    assert [(change, os.path.basename(path)) for change, path, _old, _new in changes] == [
+        (ADDED, "added"), (MODIFIED, "edit"), (DELETED, "gone"), (TOUCHED, "touch")]
+    deleted = changes[2]
+    assert deleted[2][0] == 4 and deleted[3] is None
+    assert manifest.check() == []
+    assert len(manifest) == 4
+
+
+def test_recorded_under_sees_unsaved_changes(tmp_path):
+    root = tmp_path / "root"
+    (root / "dir").mkdir(parents=True)
+    (root / "dir" / "file").write_text("x")
+    manifest = Manifest(roots=[str(root)])
+    manifest.check()
+    assert manifest.recorded_under(str(root / "dir")) == [str(root / "dir" / "file")]
+    assert manifest.recorded_under(str(root / "di")) == []
+
+
+def test_flush_appends_to_the_delta_and_load_replays_it(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a").write_text("a")
+    (root / "b").write_text("b")
+    manifest_file = str(tmp_path / "manifest.bin")
+    manifest = Manifest(roots=[str(root)])
+    manifest.check()
+    manifest.flush(manifest_file)
+    baseline = os.path.getmtime(manifest_file), os.path.getsize(manifest_file)
+
+    (root / "a").write_text("changed")
+    (root / "b").unlink()
+    (root / "c").write_text("c")
+    manifest.check()
+    manifest.flush(manifest_file)
+    assert (os.path.getmtime(manifest_file), os.path.getsize(manifest_file)) == baseline
+    delta_file = ManifestDelta.file_for(manifest_file)
+    with open(delta_file, "ab") as f:
+        f.write(b"\x05\0\0")
+
+    loaded = Manifest.load(manifest_file, roots=[str(root)])
+    assert sorted(os.path.basename(path) for path, _entry in loaded.items()) == ["a", "c"]
+    assert loaded.get(str(root / "a")) == manifest.get(str(root / "a"))
+    assert loaded.check() == []
+
+
+def test_flush_merges_the_delta_past_the_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(integrity_manifest, "DELTA_MERGE_ENTRIES", 2)
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a").write_text("a")
+    manifest_file = str(tmp_path / "manifest.bin")
+    manifest = Manifest(roots=[str(root)])
+    manifest.check()
+    manifest.flush(manifest_file)
+    (root / "b").write_text("b")
+    manifest.check()
+    manifest.flush(manifest_file)
+    assert os.path.exists(ManifestDelta.file_for(manifest_file))
+
+    (root / "c").write_text("c")
+    manifest.check()
+    manifest.flush(manifest_file)
+    assert not os.path.exists(ManifestDelta.file_for(manifest_file))
+    assert manifest.changes == {}
+    assert len(MappedManifest(manifest_file)) == 3
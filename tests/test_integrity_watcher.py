@@ -0,0 +1,112 @@
+import os
+import subprocess
+import pytest
+import integrity_events
+import integrity_watcher
+from integrity_watcher import IntegrityWatcher, exclude_pattern, extension_pattern, is_hash_only
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    root = tmp_path / "home"
+    root.mkdir()
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    for name, value in (("NAME", "watcher"), ("EMAIL", "watcher@localhost")):
+        monkeypatch.setenv(f"GIT_AUTHOR_{name}", value)
+        monkeypatch.setenv(f"GIT_COMMITTER_{name}", value)
+    monkeypatch.setattr(integrity_watcher, "GIT_ROOT", str(root))
+    monkeypatch.setattr(integrity_watcher, "LOG_FILE", str(tmp_path / "file_change.log"))
+    monkeypatch.setattr(integrity_watcher, "BINARY_MANIFEST_FILE", str(tmp_path / "binaries.bin"))
+    monkeypatch.setattr(integrity_watcher, "connect", lambda: integrity_events.connect(str(tmp_path / "journal.db")))
+    instance = IntegrityWatcher(roots=[str(root)], version_files=[], watch_budget=100)
+    instance.prepare_exclude()
+    return instance
+
+
+def tracked(watcher):
+    return watcher.git("ls-files").stdout.split()
+
+
+def test_exclude_patterns_escape_and_ignore_case():
+    assert exclude_pattern("dir/a*b[1].txt") == "/dir/a\\*b\\[1].txt"
+    assert extension_pattern(".h5") == "*.[hH]5"
+
+
+def test_is_hash_only_by_extension_size_and_nul_byte(tmp_path, monkeypatch):
+    monkeypatch.setattr(integrity_watcher, "MAX_TEXT_FILE_SIZE", 100)
+    files = {"text.py": b"print()\n", "image.PNG": b"png", "large.txt": b"a" * 200, "data.dat": b"ab\0cd"}
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    assert {name for name in files if is_hash_only(str(tmp_path / name), (tmp_path / name).stat())} == \
+        {"image.PNG", "large.txt", "data.dat"}
+
+
+def test_vanished_untracked_paths_do_not_block_the_batch(watcher):
+    root = integrity_watcher.GIT_ROOT
+    with open(os.path.join(root, "kept.txt"), "w") as f:
+        f.write("kept\n")
+    paths = [os.path.join(root, "kept.txt"), os.path.join(root, ".kept.txt.swp"), os.path.join(root, "gone-dir")]
+    watcher.commit_changes(paths, [])
+    assert tracked(watcher) == ["kept.txt"]
+    with open(integrity_watcher.LOG_FILE) as f:
+        assert "git add failed" not in f.read()
+
+
+def test_binary_files_are_excluded_and_recorded_by_hash(watcher):
+    root = integrity_watcher.GIT_ROOT
+    for name, data in (("notes.txt", b"notes\n"), ("model.ONNX", b"weights"), ("blob.dat", b"\0\1\2")):
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(data)
+    watcher.commit_changes([os.path.join(root, name) for name in ("notes.txt", "model.ONNX", "blob.dat")], [])
+    assert tracked(watcher) == ["notes.txt"]
+    assert watcher.hash_only == {"blob.dat"}
+    with open(watcher.exclude_file) as f:
+        lines = f.read().splitlines()
+    assert "*.[oO][nN][nN][xX]" in lines and "/blob.dat" in lines and "/model.ONNX" not in lines
+    assert {row["path"] for row in integrity_events.query_events(watcher.journal, kinds=["added"])} == \
+        {os.path.join(root, name) for name in ("notes.txt", "model.ONNX", "blob.dat")}
+
+    os.remove(os.path.join(root, "blob.dat"))
+    changes = watcher.record_hash_only([os.path.join(root, "blob.dat")])
+    assert [change[:2] for change in changes] == [("deleted", os.path.join(root, "blob.dat"))]
+    assert watcher.hash_only == set()
+    with open(watcher.exclude_file) as f:
+        assert "/blob.dat" not in f.read().splitlines()
+
+
+def test_start_up_moves_tracked_binaries_out_of_git(watcher):
+    root = integrity_watcher.GIT_ROOT
+    with open(os.path.join(root, "old.png"), "wb") as f:
+        f.write(b"png")
+    watcher.git("add", "-f", "old.png")
+    watcher.git("commit", "-q", "-m", "tracked before")
+    watcher.prepare_exclude()
+    assert "old.png" not in tracked(watcher)
+    assert os.path.exists(os.path.join(root, "old.png"))
+
+
+def test_text_verdicts_are_cached_and_polled_directories_listed_shallow(watcher, monkeypatch):
+    root = integrity_watcher.GIT_ROOT
+    os.makedirs(os.path.join(root, "polled", "sub"))
+    for name, data in (("polled/notes.txt", b"notes\n"), ("polled/blob.dat", b"\0\1"), ("polled/sub/deep.dat", b"\0")):
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(data)
+    sniffed = []
+    monkeypatch.setattr(integrity_watcher, "is_hash_only", lambda path, st: sniffed.append(path) or path.endswith(".dat"))
+    polled = os.path.join(root, "polled")
+    watcher.record_hash_only([polled], polled={polled})
+    assert sorted(os.path.basename(path) for path in sniffed) == ["blob.dat", "notes.txt"]
+    assert watcher.hash_only == {"polled/blob.dat"}
+
+    sniffed.clear()
+    watcher.record_hash_only([polled], polled={polled})
+    assert sniffed == []
+    with open(os.path.join(root, "polled", "notes.txt"), "ab") as f:
+        f.write(b"more\n")
+    watcher.record_hash_only([polled], polled={polled})
+    assert sniffed == [os.path.join(polled, "notes.txt")]
+
+    os.remove(os.path.join(polled, "blob.dat"))
+    changes = watcher.record_hash_only([polled], polled={polled})
+    assert [change[:2] for change in changes] == [("deleted", os.path.join(polled, "blob.dat"))]
+    assert watcher.hash_only == set()
@@ -0,0 +1,158 @@
+import gzip
+import io
+import os
+from datetime import datetime, timedelta
+import pytest
+import log_collection
+import log_formats
+
+APP = log_collection.SOFTWARE_LOG_FORMAT
+
+
+def app_line(moment, message):
+    return f"{moment:%Y-%m-%d %H:%M:%S},000 - INFO - test - {message}\n"
+
+
+def write_log(path, start, count, step=timedelta(seconds=1), tail=""):
+    with open(path, "w") as f:
+        for index in range(count):
+            f.write(app_line(start + index * step, f"line {index}"))
+        f.write(tail)
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "out"
+    directory.mkdir()
+    monkeypatch.setattr(log_collection, "output_dir", str(directory), raising=False)
+    return directory
+
+
+def test_bisect_lands_on_the_first_line_at_or_after_the_target(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime(2026, 10, 17, 12, 0, 0)
+    write_log(log_file, start, 1000)
+    parse_time = log_formats.AppLogFormat().parse_time
+    with open(log_file, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        for index in (0, 1, 499, 999):
+            f.seek(log_collection.bisect_log_offset(f, start + timedelta(seconds=index), parse_time, size))
+            assert f.readline().decode().endswith(f"line {index}\n")
+        assert log_collection.bisect_log_offset(f, start + timedelta(hours=1), parse_time, size) == size
+
+
+def test_bisect_skips_continuation_lines(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime(2026, 10, 17, 12, 0, 0)
+    with open(log_file, "w") as f:
+        for index in range(200):
+            f.write(app_line(start + timedelta(seconds=index), f"line {index}"))
+            f.write("Traceback (most recent call last):\n  more detail\n")
+    parse_time = log_formats.AppLogFormat().parse_time
+    with open(log_file, "rb") as f:
+        f.seek(log_collection.bisect_log_offset(f, start + timedelta(seconds=120), parse_time, os.path.getsize(log_file)))
+        assert f.readline().decode().endswith("line 120\n")
+
+
+def test_copy_complete_lines_leaves_the_partial_line():
+    outfile = io.BytesIO()
+    consumed = log_collection.copy_complete_lines(io.BytesIO(b"one\ntwo\nthr"), outfile)
+    assert consumed == 8
+    assert outfile.getvalue() == b"one\ntwo\n"
+
+
+def test_since_checkpoint_resumes_at_the_offset_and_skips_the_partial_line(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime(2026, 10, 17, 12, 0, 0)
+    write_log(log_file, start, 3)
+    checkpoint = log_collection.collect_source_since_checkpoint(str(log_file), str(tmp_path / "first"), APP, None)
+    assert checkpoint["offset"] == os.path.getsize(log_file)
+
+    with open(log_file, "a") as f:
+        f.write(app_line(start + timedelta(seconds=3), "line 3"))
+        f.write("2026-10-17 12:00:04,000 - INFO - test - still being writ")
+    checkpoint = log_collection.collect_source_since_checkpoint(str(log_file), str(tmp_path / "second"), APP, checkpoint)
+    assert (tmp_path / "second").read_text() == app_line(start + timedelta(seconds=3), "line 3")
+    assert checkpoint["last_timestamp"] == "2026-10-17 12:00:03"
+
+    with open(log_file, "a") as f:
+        f.write("ten\n")
+    log_collection.collect_source_since_checkpoint(str(log_file), str(tmp_path / "third"), APP, checkpoint)
+    assert (tmp_path / "third").read_text() == "2026-10-17 12:00:04,000 - INFO - test - still being written\n"
+
+
+def test_since_checkpoint_falls_back_to_the_timestamp_when_the_inode_is_gone(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime.now().replace(microsecond=0) - timedelta(minutes=10)
+    write_log(log_file, start, 4, tail=app_line(start + timedelta(seconds=4), "partial").rstrip("\n"))
+    data = log_file.read_bytes().replace(b"line 2", b"line \xff")
+    log_file.write_bytes(data)
+    checkpoint = {"inode": -1, "offset": 0, "last_timestamp": f"{start + timedelta(seconds=1):%Y-%m-%d %H:%M:%S}",
+                  "last_second_lines": 1}
+    result = log_collection.collect_source_since_checkpoint(str(log_file), str(tmp_path / "out.log"), APP, checkpoint)
+    collected = (tmp_path / "out.log").read_bytes()
+    assert collected.count(b"\n") == 2
+    assert b"line \xff" in collected
+    assert result["offset"] == data.rindex(b"\n") + 1
+
+
+def test_timestamp_fallback_keeps_later_lines_of_the_checkpoint_second(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime.now().replace(microsecond=0) - timedelta(minutes=10)
+    with open(log_file, "w") as f:
+        f.write(app_line(start, "before"))
+        f.write(app_line(start + timedelta(seconds=1), "first") + "  continued\n")
+        f.write(app_line(start + timedelta(seconds=1), "second"))
+    checkpoint = log_collection.make_checkpoint(str(log_file), APP)
+    assert checkpoint["last_second_lines"] == 3
+    with open(log_file, "a") as f:
+        f.write(app_line(start + timedelta(seconds=1), "same second, after the checkpoint"))
+        f.write(app_line(start + timedelta(seconds=2), "later"))
+    checkpoint["inode"] = -1
+    log_collection.collect_source_since_checkpoint(str(log_file), str(tmp_path / "out.log"), APP, checkpoint)
+    assert (tmp_path / "out.log").read_text() == (app_line(start + timedelta(seconds=1), "same second, after the checkpoint")
+                                                  + app_line(start + timedelta(seconds=2), "later"))
+
+
+def test_rotated_segments_are_found_oldest_first(tmp_path):
+    log_file = tmp_path / "syslog"
+    for name in ("syslog", "syslog.1", "syslog.2.gz", "syslog.old", "syslog.10.gz"):
+        (tmp_path / name).write_bytes(b"")
+    segments = [os.path.basename(path) for path in log_collection.find_log_segments(str(log_file))]
+    assert segments == ["syslog.10.gz", "syslog.2.gz", "syslog.1", "syslog"]
+
+
+def test_time_filter_reads_gzip_segments_and_reports_empty_windows(tmp_path):
+    log_file = tmp_path / "app.log"
+    start = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+    with gzip.open(tmp_path / "app.log.1.gz", "wt") as f:
+        f.write(app_line(start, "old"))
+    os.utime(tmp_path / "app.log.1.gz", (start.timestamp() + 1, start.timestamp() + 1))
+    write_log(log_file, start + timedelta(minutes=1), 2)
+
+    output = tmp_path / "window.log"
+    written = log_collection.filter_log_segments_by_time(str(log_file), str(output), APP, start, start + timedelta(minutes=1))
+    assert written == output.stat().st_size
+    assert output.read_text() == app_line(start, "old") + app_line(start + timedelta(minutes=1), "line 0")
+    assert log_collection.filter_log_segments_by_time(
+        str(log_file), str(output), APP, start - timedelta(days=1), start - timedelta(hours=23)) == 0
+    assert not list(tmp_path.glob("*.part*"))
+
+
+def test_atop_window_across_midnight_reads_both_days(tmp_path, output_dir, monkeypatch):
+    for day in ("20261017", "20261018"):
+        (tmp_path / f"atop_{day}").write_bytes(b"")
+    monkeypatch.setattr(log_collection, "ATOP_LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(log_collection.shutil, "which", lambda name: "/usr/bin/atop")
+    commands = []
+
+    class Result:
+        returncode = 0
+        stderr = ""
+
+    monkeypatch.setattr(log_collection.subprocess, "run", lambda command, **kwargs: commands.append(command) or Result())
+    log_collection.extract_atop_window(datetime(2026, 10, 17, 23, 59, 30), datetime(2026, 10, 18, 0, 0, 30))
+    assert [(command[2], command[4], command[6]) for command in commands] == [
+        (str(tmp_path / "atop_20261017"), "23:59", "23:59"),
+        (str(tmp_path / "atop_20261018"), "00:00", "00:01"),
+    ]
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+import log_formats
+
+
+def test_app_record_keeps_fraction_level_and_logger():
+    parser = log_formats.AppLogFormat()
+    record = parser.parse_record("2026-10-17 14:03:12,250 - ERROR - camera.driver - frame timeout\n")
+    assert record["ts"] == log_formats.to_epoch_ns(datetime(2026, 10, 17, 14, 3, 12), "250")
+    assert record["level"] == "ERROR"
+    assert record["logger"] == "camera.driver"
+    assert record["message"] == "frame timeout"
+
+
+def test_continuation_lines_are_not_records():
+    parser = log_formats.AppLogFormat()
+    assert parser.parse_record('  File "main.py", line 3, in <module>\n') is None
+    assert parser.parse_time("Traceback (most recent call last):\n") is None
+
+
+def test_bsd_syslog_year_comes_from_the_reference_time():
+    parser = log_formats.BsdSyslogFormat(datetime(2026, 1, 5))
+    assert parser.parse_time("Dec 31 23:59:58 station kernel: usb reset\n") == datetime(2025, 12, 31, 23, 59, 58)
+    assert parser.parse_time("Jan  5 08:00:00 station kernel: usb reset\n") == datetime(2026, 1, 5, 8, 0, 0)
+    assert parser.parse_time("Foo  5 08:00:00 not a month\n") is None
+
+
+def test_bsd_syslog_record_splits_tag_and_message():
+    record = log_formats.BsdSyslogFormat(datetime(2026, 10, 17)).parse_record(
+        "Oct 17 14:03:12 station systemd[1]: Started Session 4.\n")
+    assert record["logger"] == "systemd"
+    assert record["message"] == "Started Session 4."
+
+
+def test_iso_syslog_offsets_are_converted_to_local_time():
+    parser = log_formats.IsoSyslogFormat()
+    expected = datetime(2026, 10, 17, 6, 3, 12, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert parser.parse_time("2026-10-17T06:03:12.5+00:00 station app: hello\n") == expected
+    assert parser.parse_time("2026-10-17T08:03:12.5+02:00 station app: hello\n") == expected
+    assert parser.parse_time("2026-10-17T06:03:12 station app: no offset\n") == datetime(2026, 10, 17, 6, 3, 12)
+
+
+def test_detect_format_picks_the_majority_format(tmp_path):
+    log_file = tmp_path / "syslog"
+    log_file.write_text("Oct 17 14:03:12 station a: one\nOct 17 14:03:13 station a: two\n"
+                        "2026-10-17 14:03:14,000 - x - INFO - stray\n")
+    assert log_formats.detect_format(str(log_file), "app") == "bsd_syslog"
+    assert log_formats.detect_format(str(tmp_path / "missing"), "app") == "app"
@@ -0,0 +1,88 @@
+import os
+import pytest
+import log_index
+
+
+@pytest.fixture
+def index(tmp_path):
+    conn = log_index.connect(str(tmp_path / "index.db"))
+    yield conn
+    conn.close()
+
+
+def write_log(path, first, count, mode="w"):
+    with open(path, mode) as f:
+        for number in range(first, first + count):
+            f.write(f"2026-10-17 12:00:{number % 60:02d},000 - INFO - cam - frame {number} ok\n")
+            if number % 3 == 0:
+                f.write(f"  detail of frame {number}\n")
+
+
+def messages(conn):
+    return [row[0] for row in conn.execute("SELECT f.message FROM entries e JOIN entries_fts f ON f.rowid = e.id ORDER BY e.id")]
+
+
+def test_ingest_is_incremental_and_folds_continuation_lines(tmp_path, index):
+    log_file = str(tmp_path / "app.log")
+    write_log(log_file, 0, 4)
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    write_log(log_file, 4, 2, mode="a")
+    with open(log_file, "a") as f:
+        f.write("2026-10-17 12:00:59,000 - INFO - cam - half writ")
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    assert messages(index) == ["frame 0 ok\n  detail of frame 0", "frame 1 ok", "frame 2 ok",
+                               "frame 3 ok\n  detail of frame 3", "frame 4 ok", "frame 5 ok"]
+
+
+def test_interrupted_ingest_resumes_without_duplicates(tmp_path, index, monkeypatch):
+    log_file = str(tmp_path / "app.log")
+    write_log(log_file, 0, 30)
+    monkeypatch.setattr(log_index, "BATCH_SIZE", 4)
+    insert_batch = log_index.insert_batch
+    calls = []
+
+    def failing_insert(conn, batch):
+        calls.append(len(batch))
+        if len(calls) == 3:
+            raise RuntimeError("interrupted")
+        insert_batch(conn, batch)
+
+    monkeypatch.setattr(log_index, "insert_batch", failing_insert)
+    with pytest.raises(RuntimeError):
+        log_index.ingest_source(index, "app.log", log_file, "app")
+    assert len(messages(index)) == 8
+    monkeypatch.setattr(log_index, "insert_batch", insert_batch)
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    assert messages(index) == [f"frame {number} ok" + (f"\n  detail of frame {number}" if number % 3 == 0 else "")
+                               for number in range(30)]
+
+
+def test_rotation_finishes_the_old_file_then_reads_the_new_one(tmp_path, index):
+    log_file = str(tmp_path / "app.log")
+    write_log(log_file, 0, 2)
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    write_log(log_file, 2, 1, mode="a")
+    os.rename(log_file, log_file + ".1")
+    write_log(log_file, 3, 1)
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    assert messages(index) == ["frame 0 ok\n  detail of frame 0", "frame 1 ok", "frame 2 ok",
+                               "frame 3 ok\n  detail of frame 3"]
+
+
+def test_search_quotes_keywords(tmp_path, index):
+    log_file = str(tmp_path / "app.log")
+    write_log(log_file, 0, 6)
+    log_index.ingest_source(index, "app.log", log_file, "app")
+    assert [row[4] for row in log_index.search(index, "frame 4")] == ["frame 4 ok"]
+    assert log_index.search(index, 'frame" OR "x') == []
+    assert len(log_index.search(index, "detail", sources=["app.log"])) == 2
+
+
+def test_index_notice_reports_a_missing_or_stale_index(index):
+    assert log_index.index_notice(index) is not None
+    with index:
+        index.execute("INSERT INTO ingest_info (id, ingested_at) VALUES (0, strftime('%s', 'now'))")
+    assert log_index.index_notice(index) is None
+    with index:
+        index.execute("UPDATE ingest_info SET ingested_at = ingested_at - ?", (log_index.STALE_INDEX_SECONDS + 60,))
+    assert "last updated" in log_index.index_notice(index)
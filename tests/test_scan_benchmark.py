@@ -0,0 +1,26 @@
+from scan_benchmark import parse_strace_total
+
+CURRENT = """\
+% time     seconds  usecs/call     calls    errors syscall
+------ ----------- ----------- --------- --------- ----------------
+ 52.10    0.004000          10       400           getdents64
+ 47.90    0.003000           3       834        12 newfstatat
+------ ----------- ----------- --------- --------- ----------------
+100.00    0.007000           5      1234        12 total
+"""
+
+NO_ERRORS = """\
+% time     seconds  usecs/call     calls    errors syscall
+------ ----------- ----------- --------- --------- ----------------
+100.00    0.007000           5      1234           total
+"""
+
+
+def test_calls_are_read_from_the_calls_column():
+    assert parse_strace_total(CURRENT) == 1234
+    assert parse_strace_total(NO_ERRORS) == 1234
+
+
+def test_missing_summary_gives_none():
+    assert parse_strace_total("") is None
+    assert parse_strace_total("strace: ptrace(PTRACE_TRACEME, ...): Operation not permitted\n") is None
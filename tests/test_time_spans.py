@@ -0,0 +1,11 @@
+from datetime import timedelta
+import pytest
+from time_spans import parse_span
+
+
+def test_parse_span():
+    assert parse_span("45") == timedelta(seconds=45)
+    assert parse_span("5m") == timedelta(minutes=5)
+    assert parse_span(" 2d ") == timedelta(days=2)
+    with pytest.raises(ValueError):
+        parse_span("5 minutes")
@@ -0,0 +1,11 @@
+import re
+from datetime import timedelta
+
+SPAN_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_span(span):
+    # "45" (seconds), "30m", "6h" or "7d".
+    match = re.fullmatch(r"(\d+)([smhd]?)", span.strip())
+    if not match:
+        raise ValueError(f"Invalid span: {span}")
+    return timedelta(seconds=int(match.group(1)) * SPAN_UNITS[match.group(2) or "s"])